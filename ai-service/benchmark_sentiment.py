@@ -0,0 +1,128 @@
+"""
+Benchmark review sentiment scoring: parse-once engine vs the local scorer it replaced.
+
+Run from ai-service/:
+    python benchmark_sentiment.py
+    python benchmark_sentiment.py --reviews 20000 --spacy-model en_core_web_sm
+
+What is measured (reviews per second, same review texts):
+- score_review before parse-once (the baseline): the local lexicon scorer as it
+  was first added, when /analyze-review stopped calling the LLM, copied verbatim
+  below. It is not the service's original review scoring (see "Not measured").
+  It tokenizes each sentence once but re-scores every matching sentence once
+  per aspect, and gives each aspect the score of the whole sentence.
+- examples (spaCy + VADER): SentimentAnalyzer.analyze_review from
+  examples/traditional_nlp_implementation.py, when spaCy and NLTK's VADER are installed
+- parse-once: sentiment.score_reviews with the built-in sentence splitter
+- parse-once + nlp.pipe: sentiment.score_reviews with a spaCy pipeline, when spaCy is installed
+
+Not measured: the original code. Before local scoring existed, /analyze-review
+sent every review to the LLM, so its cost was one provider round trip per review.
+That is network-bound and not reproducible offline, so none of the rows above
+stands in for it.
+"""
+
+import csv
+import time
+import argparse
+from typing import Any, Callable, Dict, List
+
+from sentiment import ASPECTS, _SENTENCE_RE, _tokens, _valence, compound, load_sentence_splitter, score_reviews
+
+DEFAULT_CSV_PATH = "../src/datasets/Walmart_reviews_data.csv"
+
+
+def load_texts(path: str, count: int) -> List[str]:
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        texts = [row["Review"] for row in csv.DictReader(f) if row.get("Review")]
+    # Repeat the sample to reach `count` reviews
+    return [texts[i % len(texts)] for i in range(count)]
+
+
+def score_review_before_parse_once(text: str) -> Dict[str, Any]:
+    """sentiment.score_review as first added (before score_sentences), verbatim."""
+    sentences = [_tokens(s) for s in _SENTENCE_RE.split(text)]
+    sentences = [s for s in sentences if s]
+    overall = compound(sum(_valence(s) for s in sentences))
+
+    aspects: Dict[str, int] = {}
+    for aspect, keywords in ASPECTS.items():
+        mentions = [compound(_valence(s)) for s in sentences if any(k in s for k in keywords)]
+        if mentions:
+            aspects[aspect] = int(round((sum(mentions) / len(mentions) + 1) * 50))
+
+    return {"positive": (overall + 1) / 2, "compound": overall, "aspects": aspects}
+
+
+def examples_analyzer() -> Callable[[str], Dict[str, Any]]:
+    """The examples' SentimentAnalyzer.analyze_review, verbatim minus unrelated imports."""
+    import spacy
+    from nltk.sentiment import SentimentIntensityAnalyzer
+
+    nlp = spacy.load("en_core_web_sm")
+    vader = SentimentIntensityAnalyzer()
+    aspect_keywords = {
+        "quality": ["quality", "good", "great", "excellent", "poor", "bad", "terrible"],
+        "price": ["price", "expensive", "cheap", "cost", "value", "affordable"],
+        "service": ["service", "delivery", "shipping", "fast", "slow"],
+        "durability": ["durable", "lasting", "broke", "broken", "sturdy", "fragile"],
+    }
+
+    def analyze(text: str) -> Dict[str, Any]:
+        compound_score = vader.polarity_scores(text)["compound"]
+        aspects = {}
+        for aspect, keywords in aspect_keywords.items():
+            doc = nlp(text.lower())
+            sentences = [sent.text for sent in doc.sents if any(kw in sent.text for kw in keywords)]
+            if sentences:
+                scores = [vader.polarity_scores(sent)["compound"] for sent in sentences]
+                aspects[aspect] = int((sum(scores) / len(scores) + 1) * 50)
+        return {"positive": int((compound_score + 1) * 50), "aspects": aspects}
+
+    return analyze
+
+
+def timed(name: str, run: Callable[[], Any], count: int, baseline: float = 0.0) -> float:
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed else float("inf")
+    speedup = f"{rate / baseline:6.1f}x" if baseline else "  1.0x"
+    print(f"{name:<34} {rate:>12,.0f} reviews/s  {speedup}")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--csv", default=DEFAULT_CSV_PATH)
+    parser.add_argument("--reviews", type=int, default=5000)
+    parser.add_argument("--spacy-model", default=None, help="spaCy pipeline for nlp.pipe (default: sentencizer)")
+    args = parser.parse_args()
+
+    texts = load_texts(args.csv, args.reviews)
+    avg_len = sum(len(t) for t in texts) / len(texts)
+    print(f"{len(texts)} reviews, {avg_len:.0f} characters on average\n")
+
+    print("baseline: the first local lexicon scorer, before parse-once; speedups are against it,")
+    print("not against the original LLM-per-review scoring, which is not measured\n")
+    baseline = timed("score_review before parse-once", lambda: [score_review_before_parse_once(t) for t in texts], len(texts))
+    try:
+        analyze = examples_analyzer()
+    except (ImportError, OSError) as e:
+        print(f"{'examples (spaCy + VADER)':<34} skipped: {e}")
+    else:
+        # spaCy is slow; a slice is enough for a rate
+        sample = texts[:min(len(texts), 500)]
+        timed("examples (spaCy + VADER)", lambda: [analyze(t) for t in sample], len(sample), baseline)
+
+    timed("parse-once", lambda: score_reviews(texts), len(texts), baseline)
+    try:
+        nlp = load_sentence_splitter(args.spacy_model)
+    except (ImportError, OSError) as e:
+        print(f"{'parse-once + nlp.pipe':<34} skipped: {e}")
+    else:
+        timed("parse-once + nlp.pipe", lambda: score_reviews(texts, nlp=nlp), len(texts), baseline)
+
+
+if __name__ == "__main__":
+    main()
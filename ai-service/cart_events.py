@@ -0,0 +1,458 @@
+import os
+import json
+import time
+import heapq
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import insert, select
+
+from database import SessionLocal, utc_timestamp, utcnow
+from models import CartEvent
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: compaction then relies on os.replace alone, and two workers
+    # compacting at the same moment may briefly write an older snapshot over a newer one
+    fcntl = None
+
+# Cart event log and "frequently bought together" index.
+#
+# EventLog is the write side: requests append events to an in-memory buffer and
+# a background thread writes them to the cart_events table in batches, so an
+# ingestion request never waits on the database.
+#
+# CooccurrenceIndex is the read side. Each worker tails cart_events by id and
+# folds new events into item and pair basket counts held in memory, so every
+# worker sees events ingested by any of them. Lookups only touch the partner
+# counts of the cart's items. The counts are periodically compacted to a JSON
+# file together with the last applied event id; a restarted worker loads the
+# file and replays only the events written after it.
+#
+# Ids are assigned when a row is inserted, not when its transaction commits, so
+# on Postgres a batch can become visible after a later one. Ids skipped over by
+# the tail are kept as gaps and re-checked on every poll until they show up or
+# are older than gap_timeout (a rolled-back insert leaves a permanent hole).
+#
+# A basket is one session's cart until checkout; purchase events carrying an
+# orderId continue that cart under the order, so a checkout is not counted twice.
+# Removes are logged but do not un-count: the items were still considered together.
+
+EVENT_TYPES = ("add", "remove", "purchase")
+
+
+class EventBufferFull(Exception):
+    pass
+
+
+class EventLog:
+    """Buffered, append-only writer for cart events."""
+
+    def __init__(self, flush_interval: float = 0.5, max_batch: int = 1000, max_buffer: int = 100000):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_buffer = max_buffer
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+
+    def append(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Queue events (CartEvent column values) for the next batch; returns how many were queued."""
+        now = utcnow()
+        rows = [{**event, "created_at": event.get("created_at") or now} for event in events]
+        with self._lock:
+            if len(self._buffer) + len(rows) > self.max_buffer:
+                raise EventBufferFull(f"{len(self._buffer)} events waiting to be written")
+            self._buffer.extend(rows)
+            pending = len(self._buffer)
+        self._ensure_started()
+        if pending >= self.max_batch:
+            self._wake.set()
+        return len(rows)
+
+    def flush(self) -> int:
+        """Write everything buffered so far, max_batch rows per transaction."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        written = 0
+        for start in range(0, len(rows), self.max_batch):
+            batch = rows[start:start + self.max_batch]
+            db = SessionLocal()
+            try:
+                db.execute(insert(CartEvent), batch)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Error writing {len(batch)} cart events: {e}")
+                self.failures += 1
+                # Keep the unwritten rows, ahead of anything appended meanwhile
+                with self._lock:
+                    self._buffer[:0] = rows[start:]
+                break
+            finally:
+                db.close()
+            written += len(batch)
+            self.batches += 1
+        self.written += written
+        return written
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="cart-event-log", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self) -> None:
+        """Stop the writer thread and flush what is left."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {"buffered": buffered, "written": self.written, "batches": self.batches, "failures": self.failures}
+
+
+class CooccurrenceIndex:
+    """
+    Item and pair basket counts, maintained incrementally from the cart event log.
+
+    Partner lists are pruned: once an item has more than 2 * max_partners
+    partners, only its max_partners most frequent are kept. Pruned pairs that
+    come back start counting again, so rare pairs are undercounted; the ones
+    lookups return are not pruned.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_partners: int = 50,
+        basket_ttl: float = 86400,
+        max_open_baskets: int = 100000,
+        poll_interval: float = 1.0,
+        compact_interval: float = 300,
+        replay_chunk: int = 10000,
+        gap_timeout: float = 300,
+        max_gaps: int = 100000,
+    ):
+        self.path = path
+        self.max_partners = max_partners
+        self.basket_ttl = basket_ttl
+        self.max_open_baskets = max_open_baskets
+        self.poll_interval = poll_interval
+        self.compact_interval = compact_interval
+        self.replay_chunk = replay_chunk
+        self.gap_timeout = gap_timeout
+        self.max_gaps = max_gaps
+
+        self.baskets = 0
+        self.item_baskets: Dict[str, int] = {}
+        self.pairs: Dict[str, Dict[str, int]] = {}
+        # Baskets still receiving items: key -> [last event time (epoch seconds), items]
+        self.open: "OrderedDict[str, List[Any]]" = OrderedDict()
+        # Highest cart_events.id folded in
+        self.watermark = 0
+        # Ids below the watermark not seen yet (possibly still uncommitted) -> when first skipped
+        self.gaps: Dict[int, float] = {}
+        self.late_events = 0
+        self.compacted_watermark = 0
+        self.ready = False
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    # --- Counting ---
+
+    def _add_item(self, items: Set[str], product_id: str) -> None:
+        if product_id in items:
+            return
+        self.item_baskets[product_id] = self.item_baskets.get(product_id, 0) + 1
+        partners = self.pairs.setdefault(product_id, {})
+        for other in items:
+            partners[other] = partners.get(other, 0) + 1
+            reverse = self.pairs.setdefault(other, {})
+            reverse[product_id] = reverse.get(product_id, 0) + 1
+            if len(reverse) > 2 * self.max_partners:
+                self._prune(other)
+        if len(partners) > 2 * self.max_partners:
+            self._prune(product_id)
+        items.add(product_id)
+
+    def _prune(self, product_id: str) -> None:
+        partners = self.pairs[product_id]
+        self.pairs[product_id] = dict(heapq.nlargest(self.max_partners, partners.items(), key=lambda item: item[1]))
+
+    def _basket(self, key: str, at: float) -> Set[str]:
+        entry = self.open.get(key)
+        if entry is None:
+            entry = self.open[key] = [at, set()]
+            self.baskets += 1
+        else:
+            entry[0] = max(entry[0], at)
+            self.open.move_to_end(key)
+        return entry[1]
+
+    def _expire(self, now: float) -> None:
+        # Least recently touched first; closed baskets keep their counts
+        while self.open:
+            last_seen = next(iter(self.open.values()))[0]
+            if len(self.open) <= self.max_open_baskets and last_seen >= now - self.basket_ttl:
+                break
+            self.open.popitem(last=False)
+
+    def apply(self, event_type: str, session_id: str, product_id: str, order_id: Optional[str], at: float) -> None:
+        """Fold one event into the counts; the caller holds the lock."""
+        if event_type == "add":
+            self._add_item(self._basket(f"cart:{session_id}", at), product_id)
+        elif event_type == "purchase":
+            key = f"order:{order_id}" if order_id else f"cart:{session_id}"
+            cart_key = f"cart:{session_id}"
+            if key != cart_key and key not in self.open and cart_key in self.open:
+                # Checkout: the cart becomes the order's basket and the session starts a new cart
+                self.open[key] = self.open.pop(cart_key)
+            self._add_item(self._basket(key, at), product_id)
+        self._expire(at)
+
+    # --- Lookups ---
+
+    def together(self, product_ids: Iterable[str], k: int = 5, min_count: int = 2) -> List[Dict[str, Any]]:
+        """
+        Up to k products most often in the same basket as the given ones, best first.
+
+        A candidate's score is its summed confidence P(candidate | item) over the
+        given items; pairs seen in fewer than `min_count` baskets, or with lift
+        <= 1 (no more often together than chance), are skipped.
+        """
+        cart = list(dict.fromkeys(product_ids))
+        given = set(cart)
+        scores: Dict[str, List[float]] = {}
+        with self._lock:
+            total = self.baskets
+            for product_id in cart:
+                item_count = self.item_baskets.get(product_id)
+                if not item_count:
+                    continue
+                for other, count in self.pairs.get(product_id, {}).items():
+                    if count < min_count or other in given:
+                        continue
+                    lift = count * total / (item_count * self.item_baskets[other])
+                    if lift <= 1.0:
+                        continue
+                    entry = scores.setdefault(other, [0.0, 0.0, 0.0])
+                    entry[0] += count / item_count
+                    entry[1] = max(entry[1], count / item_count)
+                    entry[2] = max(entry[2], lift)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1][0], item[1][2]))
+        return [
+            {"productId": product_id, "score": round(score, 4), "confidence": round(confidence, 4), "lift": round(lift, 4)}
+            for product_id, (score, confidence, lift) in best
+        ]
+
+    # --- Tailing and compaction ---
+
+    def _apply_rows(self, rows) -> None:
+        for event_id, event_type, session_id, product_id, order_id, created_at in rows:
+            at = utc_timestamp(created_at) if created_at is not None else time.time()
+            self.apply(event_type, session_id, product_id, order_id, at)
+
+    def _fill_gaps(self) -> int:
+        """Fold in events that committed after the tail passed their ids; drop gaps too old to fill."""
+        now = time.time()
+        with self._lock:
+            self.gaps = {event_id: seen for event_id, seen in self.gaps.items() if now - seen < self.gap_timeout}
+            pending = sorted(self.gaps)
+        applied = 0
+        for start in range(0, len(pending), self.replay_chunk):
+            chunk = pending[start:start + self.replay_chunk]
+            db = SessionLocal()
+            try:
+                rows = db.execute(
+                    select(CartEvent.id, CartEvent.event_type, CartEvent.session_id, CartEvent.product_id,
+                           CartEvent.order_id, CartEvent.created_at)
+                    .where(CartEvent.id.in_(chunk))
+                    .order_by(CartEvent.id)
+                ).all()
+            finally:
+                db.close()
+            if not rows:
+                continue
+            with self._lock:
+                self._apply_rows(rows)
+                for row in rows:
+                    self.gaps.pop(row[0], None)
+            applied += len(rows)
+        self.late_events += applied
+        return applied
+
+    def _record_gaps(self, after: int, ids: List[int]) -> None:
+        """Remember ids between `after` and the end of `ids` that the tail skipped; the caller holds the lock."""
+        now = time.time()
+        previous = after
+        for event_id in ids:
+            # Only the newest max_gaps ids of a wide jump can still be in flight
+            for missing in range(max(previous + 1, event_id - self.max_gaps), event_id):
+                self.gaps[missing] = now
+            previous = event_id
+        if len(self.gaps) > self.max_gaps:
+            # Drop the lowest: the longest-missing ids are the likeliest rollbacks
+            self.gaps = dict(heapq.nlargest(self.max_gaps, self.gaps.items()))
+
+    def catch_up(self) -> int:
+        """Fold in events written since the watermark, and late commits below it; returns how many were applied."""
+        applied = self._fill_gaps() if self.gaps else 0
+        while True:
+            db = SessionLocal()
+            try:
+                rows = db.execute(
+                    select(CartEvent.id, CartEvent.event_type, CartEvent.session_id, CartEvent.product_id,
+                           CartEvent.order_id, CartEvent.created_at)
+                    .where(CartEvent.id > self.watermark)
+                    .order_by(CartEvent.id)
+                    .limit(self.replay_chunk)
+                ).all()
+            finally:
+                db.close()
+            if not rows:
+                return applied
+            with self._lock:
+                self._apply_rows(rows)
+                self._record_gaps(self.watermark, [row[0] for row in rows])
+                self.watermark = rows[-1][0]
+            applied += len(rows)
+            if len(rows) < self.replay_chunk:
+                return applied
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                f.readline()  # header, see compact()
+                state = json.loads(f.readline())
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable co-occurrence snapshot {self.path}: {e}")
+            return False
+        with self._lock:
+            self.watermark = self.compacted_watermark = state["watermark"]
+            self.baskets = state["baskets"]
+            self.item_baskets = state["items"]
+            self.pairs = state["pairs"]
+            self.open = OrderedDict((key, [at, set(items)]) for key, at, items in state["open"])
+            # Gaps restart their timeout: the events may have committed while no worker was running
+            self.gaps = {event_id: time.time() for event_id in state.get("gaps", [])}
+        return True
+
+    def compact(self) -> bool:
+        """
+        Write the counts and open baskets to `path`, atomically.
+
+        Every worker compacts; the first line of the file holds its watermark so
+        a worker that is behind does not overwrite a newer snapshot.
+        """
+        with self._lock:
+            watermark = self.watermark
+            if watermark <= self.compacted_watermark:
+                return False
+            body = json.dumps({
+                "watermark": watermark,
+                "baskets": self.baskets,
+                "items": self.item_baskets,
+                "pairs": self.pairs,
+                "open": [[key, at, sorted(items)] for key, (at, items) in self.open.items()],
+                "gaps": sorted(self.gaps),
+            }, separators=(",", ":"))
+        with open(f"{self.path}.lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    if json.loads(f.readline()).get("watermark", 0) >= watermark:
+                        self.compacted_watermark = watermark
+                        return False
+            except (OSError, ValueError):
+                pass
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"watermark": watermark}) + "\n" + body + "\n")
+            os.replace(tmp, self.path)
+        self.compacted_watermark = watermark
+        return True
+
+    def ensure_started(self) -> None:
+        """Start the background thread that loads the snapshot, then tails the log and compacts."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="cooccurrence-index", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        self.load()
+        last_compaction = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                self.catch_up()
+                self.ready = True
+                if time.monotonic() - last_compaction >= self.compact_interval:
+                    self.compact()
+                    last_compaction = time.monotonic()
+            except Exception as e:
+                print(f"Error updating co-occurrence index: {e}")
+            self._stopped.wait(self.poll_interval)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self.compact()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "baskets": self.baskets,
+                "openBaskets": len(self.open),
+                "items": len(self.item_baskets),
+                "pairs": sum(len(partners) for partners in self.pairs.values()) // 2,
+                "watermark": self.watermark,
+                "compactedWatermark": self.compacted_watermark,
+                "gaps": len(self.gaps),
+                "lateEvents": self.late_events,
+            }
+
+
+def create_cart_event_log() -> EventLog:
+    return EventLog(
+        flush_interval=float(os.getenv("CART_EVENT_FLUSH_INTERVAL", "0.5")),
+        max_batch=int(os.getenv("CART_EVENT_BATCH", "1000")),
+        max_buffer=int(os.getenv("CART_EVENT_BUFFER_MAX", "100000")),
+    )
+
+
+def create_cooccurrence_index() -> CooccurrenceIndex:
+    return CooccurrenceIndex(
+        path=os.getenv("COOCCURRENCE_PATH", "./cooccurrence.json"),
+        max_partners=int(os.getenv("COOCCURRENCE_MAX_PARTNERS", "50")),
+        basket_ttl=float(os.getenv("COOCCURRENCE_BASKET_TTL", "86400")),
+        poll_interval=float(os.getenv("COOCCURRENCE_POLL_INTERVAL", "1.0")),
+        compact_interval=float(os.getenv("COOCCURRENCE_COMPACT_INTERVAL", "300")),
+        gap_timeout=float(os.getenv("COOCCURRENCE_GAP_TIMEOUT", "300")),
+    )
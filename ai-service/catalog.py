@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import threading
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from database import dialect_insert, engine
+from models import CatalogVersion, Product
+from name_resolver import NameResolver
+from recipes import IngredientIndex
+from recommender import ContentRecommender
+from retrieval import ProductIndex
+
+# Versioned, in-process snapshot of the product catalog.
+#
+# Every write to the products table bumps a counter row in catalog_version in
+# the same transaction (the session hooks below cover ORM writes; raw SQL must
+# call bump_catalog_version itself). Each worker process keeps an immutable
+# snapshot and re-checks the versions at most every CATALOG_VERSION_CHECK_INTERVAL
+# seconds, so a change made by any process or script is picked up by all of
+# them without restarting.
+#
+# Writes that only touch Product.sentiment (every scored review) bump a separate
+# counter: the snapshot's rows and /products bytes are refreshed, but the derived
+# indexes, none of which read sentiment, are kept.
+
+CATALOG_VERSION_ROW = 1
+SENTIMENT_VERSION_ROW = 2
+# Product columns none of the derived indexes read
+UNINDEXED_COLUMNS = frozenset({"sentiment"})
+
+
+# The write scripts import this module only for its hooks, and may run against a
+# database created before catalog_version existed
+CatalogVersion.__table__.create(bind=engine, checkfirst=True)
+
+
+def _bump_statement(insert, row_id: int = CATALOG_VERSION_ROW):
+    stmt = insert(CatalogVersion).values(id=row_id, version=1)
+    return stmt.on_conflict_do_update(
+        index_elements=["id"],
+        set_={"version": CatalogVersion.version + 1},
+    )
+
+
+def bump_catalog_version(db: Session) -> None:
+    """Mark the catalog as changed; takes effect when the caller's transaction commits."""
+    db.execute(_bump_statement(dialect_insert(db)))
+
+
+def read_catalog_versions(db: Session) -> Tuple[int, int]:
+    """(catalog version, sentiment version); 0 for a counter never bumped."""
+    versions = dict(db.execute(select(CatalogVersion.id, CatalogVersion.version)).all())
+    return versions.get(CATALOG_VERSION_ROW) or 0, versions.get(SENTIMENT_VERSION_ROW) or 0
+
+
+def read_catalog_version(db: Session) -> int:
+    return read_catalog_versions(db)[0]
+
+
+def _changed_columns(obj: Product) -> set:
+    state = inspect(obj)
+    return {attr.key for attr in state.attrs if attr.history.has_changes()}
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_product_changes(session, flush_context, instances):
+    # Attribute history is reset by the time after_flush runs, so decide here
+    bump = None
+    for obj in session.new | session.deleted:
+        if isinstance(obj, Product):
+            bump = CATALOG_VERSION_ROW
+            break
+    if bump is None:
+        for obj in session.dirty:
+            if not isinstance(obj, Product) or not session.is_modified(obj):
+                continue
+            changed = _changed_columns(obj)
+            if changed - UNINDEXED_COLUMNS:
+                bump = CATALOG_VERSION_ROW
+                break
+            if changed:
+                bump = SENTIMENT_VERSION_ROW
+    if bump is not None:
+        session.info["catalog_bump"] = bump
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_product_flush(session, flush_context):
+    row_id = session.info.pop("catalog_bump", None)
+    if row_id is not None:
+        # session.execute would autoflush again from inside a flush; go through the connection
+        session.connection().execute(_bump_statement(dialect_insert(session), row_id))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_on_product_bulk_write(orm_execute_state):
+    # Bulk query.update()/delete() and update(Product) statements skip the flush
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        mapper.class_ is Product for mapper in orm_execute_state.all_mappers
+    ):
+        bump_catalog_version(orm_execute_state.session)
+
+
+class CatalogSnapshot:
+    """Immutable view of the catalog at one version. Treat `products` as read-only."""
+
+    def __init__(self, version: int, products: Tuple[Dict[str, Any], ...], sentiment_version: int = 0,
+                 derived_from: Optional["CatalogSnapshot"] = None):
+        self.version = version
+        self.sentiment_version = sentiment_version
+        self.products = products
+        self.by_id = {p["id"]: p for p in products}
+        # /products is served straight from these bytes
+        self.products_json = json.dumps(list(products), separators=(",", ":")).encode("utf-8")
+        # Only sentiment differs from `derived_from` (same version, same products in the same
+        # order), so its indexes, which address products by position or id, still hold
+        self.index = derived_from.index if derived_from is not None else ProductIndex.build(products)
+        self.built_at = time.time()
+        # Keyset pagination walks products in id order, per category when filtered
+        self._sorted = sorted(products, key=lambda p: p["id"])
+        self._sorted_ids = [p["id"] for p in self._sorted]
+        self._by_category: Dict[str, Tuple[List[Dict[str, Any]], List[str]]] = {}
+        for product in self._sorted:
+            rows, ids = self._by_category.setdefault(product["category"], ([], []))
+            rows.append(product)
+            ids.append(product["id"])
+        # Compressed variants of products_json, filled on first request per encoding
+        self.encoded: Dict[str, bytes] = {}
+        self._resolver: Optional[NameResolver] = None
+        self._recommender: Optional[ContentRecommender] = None
+        self._ingredients: Optional[IngredientIndex] = None
+        if derived_from is not None:
+            self._resolver = derived_from._resolver
+            self._recommender = derived_from._recommender
+            self._ingredients = derived_from._ingredients
+
+    @property
+    def resolver(self) -> NameResolver:
+        """Name -> product id index, built on first use (only the LLM endpoints need it)."""
+        if self._resolver is None:
+            self._resolver = NameResolver.build(self.products)
+        return self._resolver
+
+    @property
+    def recommender(self) -> ContentRecommender:
+        """Product neighbor table for /recommend, built on first use."""
+        if self._recommender is None:
+            self._recommender = ContentRecommender.build(self.products)
+        return self._recommender
+
+    @property
+    def ingredients(self) -> IngredientIndex:
+        """Recipe ingredient -> food product index, built on first use."""
+        if self._ingredients is None:
+            self._ingredients = IngredientIndex.build(self.products)
+        return self._ingredients
+
+    def page(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Products ordered by id, starting after the id `after` (keyset cursor).
+
+        Returns up to `limit` products and the cursor for the next page (None on the last page).
+        """
+        if category is not None:
+            rows, ids = self._by_category.get(category, ([], []))
+        else:
+            rows, ids = self._sorted, self._sorted_ids
+        start = bisect_right(ids, after) if after is not None else 0
+
+        items: List[Dict[str, Any]] = []
+        for position in range(start, len(rows)):
+            product = rows[position]
+            price = product["price"]
+            if (min_price is not None and (price is None or price < min_price)) or \
+               (max_price is not None and (price is None or price > max_price)):
+                continue
+            if limit is not None and len(items) == limit:
+                # At least one more match exists past this page
+                return items, items[-1]["id"]
+            items.append(product)
+        return items, None
+
+
+class CatalogCache:
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.refreshes = 0
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._snapshot
+            # Read the version before the rows: a write landing in between makes the
+            # snapshot newer than its version, which only costs one extra rebuild
+            version, sentiment_version = read_catalog_versions(db)
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                self._snapshot = CatalogSnapshot(version, self._load(db), sentiment_version)
+                self.rebuilds += 1
+            elif snapshot.sentiment_version != sentiment_version:
+                # Sentiment-only change: new rows and bytes, same derived indexes
+                self._snapshot = CatalogSnapshot(version, self._load(db), sentiment_version, derived_from=snapshot)
+                self.refreshes += 1
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    @staticmethod
+    def _load(db: Session) -> Tuple[Dict[str, Any], ...]:
+        # Id order keeps positions stable between reloads of the same product set
+        rows = db.execute(select(Product.__table__).order_by(Product.id)).mappings().all()
+        return tuple(dict(row) for row in rows)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "sentimentVersion": snapshot.sentiment_version if snapshot else None,
+            "products": len(snapshot.products) if snapshot else 0,
+            "bytes": len(snapshot.products_json) if snapshot else 0,
+            "rebuilds": self.rebuilds,
+            "refreshes": self.refreshes,
+        }
+
+
+catalog_cache = CatalogCache(check_interval=float(os.getenv("CATALOG_VERSION_CHECK_INTERVAL", "1")))
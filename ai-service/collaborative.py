@@ -0,0 +1,297 @@
+import os
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embeddings import top_k
+
+# Collaborative filtering over implicit feedback (cart adds and purchases).
+#
+# Users and items are embedded as rows of two factor matrices, trained offline
+# with implicit ALS (train_als, run by train_collaborative.py). Serving is pure
+# linear algebra: a user's scores for every item are one matrix-vector product
+# against the contiguous float32 item matrix, already-seen items are masked to
+# -inf, and the top k are picked with argpartition. Users not in the model
+# (e.g. a new session with a cart) are folded in from their items with the same
+# least-squares step training uses, without retraining.
+#
+# On disk a model is <path>.items.npy (item factors, memory-mapped so a
+# million-item matrix is shared between workers), <path>.npz (user factors,
+# item biases and the seen-items lists) and <path>.meta.json (ids, settings).
+
+# recommend_many scores USER_BLOCK users x ITEM_BLOCK items at a time
+USER_BLOCK = 256
+ITEM_BLOCK = 65536
+
+
+def _group(keys: np.ndarray, values: np.ndarray, weights: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CSR-style grouping: values[indptr[i]:indptr[i + 1]] (and their weights) belong to key i."""
+    order = np.argsort(keys, kind="stable")
+    indptr = np.searchsorted(keys[order], np.arange(count + 1))
+    return indptr, values[order], weights[order]
+
+
+def _solve(fixed: np.ndarray, gram: np.ndarray, rows: np.ndarray, confidence: np.ndarray, reg: float) -> np.ndarray:
+    """
+    Implicit-ALS least squares for one user (or item) against the fixed factors.
+
+    Minimises sum_i c_i (1 - x.y_i)^2 over the interacted rows plus x.y_j^2 over
+    all the others, plus reg * |x|^2. `gram` is fixed.T @ fixed, shared by every
+    solve, so the cost depends on the interaction count, not the catalog size.
+    """
+    if not len(rows):
+        return np.zeros(fixed.shape[1], dtype=np.float32)
+    y = fixed[rows].astype(np.float64)
+    a = gram + (y.T * (confidence - 1.0)) @ y + reg * np.eye(fixed.shape[1])
+    b = y.T @ confidence
+    return np.linalg.solve(a, b).astype(np.float32)
+
+
+def train_als(
+    user_rows: np.ndarray,
+    item_rows: np.ndarray,
+    counts: np.ndarray,
+    n_users: int,
+    n_items: int,
+    factors: int = 32,
+    reg: float = 0.1,
+    alpha: float = 10.0,
+    iterations: int = 10,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Implicit ALS (Hu, Koren & Volinsky) on (user, item, count) interactions.
+
+    Confidence is 1 + alpha * count. Returns (user_factors, item_factors) as
+    contiguous float32 arrays.
+    """
+    rng = np.random.default_rng(seed)
+    users = (rng.standard_normal((n_users, factors)) * 0.01).astype(np.float32)
+    items = (rng.standard_normal((n_items, factors)) * 0.01).astype(np.float32)
+    confidence = 1.0 + alpha * counts.astype(np.float64)
+    by_user = _group(user_rows, item_rows, confidence, n_users)
+    by_item = _group(item_rows, user_rows, confidence, n_items)
+
+    for _ in range(iterations):
+        for target, fixed, (indptr, rows, conf) in ((users, items, by_user), (items, users, by_item)):
+            gram = (fixed.T @ fixed).astype(np.float64)
+            for i in range(len(target)):
+                start, end = indptr[i], indptr[i + 1]
+                target[i] = _solve(fixed, gram, rows[start:end], conf[start:end], reg)
+    return users, items
+
+
+class CollaborativeModel:
+    def __init__(
+        self,
+        user_ids: List[str],
+        item_ids: List[str],
+        user_factors: np.ndarray,
+        item_factors: np.ndarray,
+        item_bias: Optional[np.ndarray] = None,
+        seen_indptr: Optional[np.ndarray] = None,
+        seen_items: Optional[np.ndarray] = None,
+        reg: float = 0.1,
+        alpha: float = 10.0,
+    ):
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.user_row = {user_id: row for row, user_id in enumerate(user_ids)}
+        self.item_row = {item_id: row for row, item_id in enumerate(item_ids)}
+        self.user_factors = np.ascontiguousarray(user_factors, dtype=np.float32)
+        # A memory-mapped float32 array is already contiguous; don't copy it into RAM
+        self.item_factors = item_factors if isinstance(item_factors, np.memmap) else np.ascontiguousarray(item_factors, dtype=np.float32)
+        self.item_bias = None if item_bias is None else np.ascontiguousarray(item_bias, dtype=np.float32)
+        # Items each user interacted with, CSR-style; masked out of their recommendations
+        if seen_indptr is None:
+            seen_indptr, seen_items = np.zeros(len(user_ids) + 1, dtype=np.int64), np.empty(0, dtype=np.int32)
+        self.seen_indptr = seen_indptr
+        self.seen_items = seen_items
+        self.reg = reg
+        self.alpha = alpha
+        self._gram: Optional[np.ndarray] = None
+
+    @classmethod
+    def train(
+        cls,
+        interactions: Sequence[Tuple[str, str, float]],
+        factors: int = 32,
+        reg: float = 0.1,
+        alpha: float = 10.0,
+        iterations: int = 10,
+    ) -> "CollaborativeModel":
+        """Train from (user id, item id, count) triples; repeated pairs are summed."""
+        user_ids = list(dict.fromkeys(u for u, _, _ in interactions))
+        item_ids = list(dict.fromkeys(i for _, i, _ in interactions))
+        user_row = {u: r for r, u in enumerate(user_ids)}
+        item_row = {i: r for r, i in enumerate(item_ids)}
+        users = np.array([user_row[u] for u, _, _ in interactions], dtype=np.int64)
+        items = np.array([item_row[i] for _, i, _ in interactions], dtype=np.int64)
+        pairs, inverse = np.unique(users * len(item_ids) + items, return_inverse=True)
+        counts = np.bincount(inverse, weights=np.array([c for _, _, c in interactions], dtype=np.float64))
+        user_rows, item_rows = pairs // len(item_ids), (pairs % len(item_ids)).astype(np.int32)
+
+        user_factors, item_factors = train_als(
+            user_rows, item_rows, counts, len(user_ids), len(item_ids), factors, reg, alpha, iterations
+        )
+        seen_indptr, seen_items, _ = _group(user_rows, item_rows, counts, len(user_ids))
+        return cls(user_ids, item_ids, user_factors, item_factors, None, seen_indptr, seen_items, reg, alpha)
+
+    # --- Scoring ---
+
+    @property
+    def gram(self) -> np.ndarray:
+        if self._gram is None:
+            self._gram = (self.item_factors.T @ self.item_factors).astype(np.float64)
+        return self._gram
+
+    def fold_in(self, item_ids: Sequence[str], counts: Optional[Sequence[float]] = None) -> Optional[np.ndarray]:
+        """Factors for a user not in the model, from the items they interacted with; None if none are known."""
+        known = [(self.item_row[i], 1.0 if counts is None else float(c))
+                 for i, c in zip(item_ids, counts or [None] * len(item_ids)) if i in self.item_row]
+        if not known:
+            return None
+        rows = np.array([r for r, _ in known], dtype=np.int64)
+        confidence = 1.0 + self.alpha * np.array([c for _, c in known])
+        return _solve(self.item_factors, self.gram, rows, confidence, self.reg)
+
+    def scores(self, user_vector: np.ndarray) -> np.ndarray:
+        """Scores of every item for one user: a single matrix-vector product."""
+        scores = self.item_factors @ user_vector
+        if self.item_bias is not None:
+            scores += self.item_bias
+        return scores
+
+    def seen(self, user_id: str) -> np.ndarray:
+        row = self.user_row.get(user_id)
+        if row is None:
+            return np.empty(0, dtype=np.int32)
+        return self.seen_items[self.seen_indptr[row]:self.seen_indptr[row + 1]]
+
+    def _top(self, scores: np.ndarray, k: int, masked: np.ndarray) -> List[Tuple[str, float]]:
+        scores[masked] = -np.inf
+        return [(self.item_ids[i], float(scores[i])) for i in top_k(scores, k) if np.isfinite(scores[i])]
+
+    def _masked_rows(self, user_id: Optional[str], exclude: Optional[Sequence[str]]) -> np.ndarray:
+        extra = [self.item_row[i] for i in (exclude or ()) if i in self.item_row]
+        return np.concatenate([self.seen(user_id) if user_id is not None else np.empty(0, dtype=np.int32),
+                               np.array(extra, dtype=np.int32)]).astype(np.int64)
+
+    def recommend(self, user_id: str, k: int = 10, exclude: Optional[Sequence[str]] = None) -> List[Tuple[str, float]]:
+        """Up to k (item id, score) pairs for a known user, best first; items they already have are skipped."""
+        row = self.user_row.get(user_id)
+        if row is None:
+            return []
+        return self._top(self.scores(self.user_factors[row]), k, self._masked_rows(user_id, exclude))
+
+    def recommend_for_items(self, item_ids: Sequence[str], k: int = 10, counts: Optional[Sequence[float]] = None) -> List[Tuple[str, float]]:
+        """recommend() for an unknown user, folded in from their items (e.g. a cart); those items are skipped."""
+        vector = self.fold_in(item_ids, counts)
+        if vector is None:
+            return []
+        return self._top(self.scores(vector), k, self._masked_rows(None, item_ids))
+
+    def recommend_many(
+        self, user_ids: Sequence[str], k: int = 10, user_block: int = USER_BLOCK, item_block: int = ITEM_BLOCK
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        recommend() for many known users at once; unknown users get an empty list.
+
+        Users are scored user_block at a time against item_block items at a time,
+        keeping a running top k per user, so memory stays bounded (64MB of scores
+        by default) however many users and items there are.
+        """
+        known = [(position, self.user_row[u]) for position, u in enumerate(user_ids) if u in self.user_row]
+        results: List[List[Tuple[str, float]]] = [[] for _ in user_ids]
+        k = min(k, len(self.item_ids))
+        if not k:
+            return results
+        for start in range(0, len(known), user_block):
+            batch = known[start:start + user_block]
+            best_ids, best_scores = self._top_many(np.array([r for _, r in batch], dtype=np.int64), k, item_block)
+            for (position, _), ids, scores in zip(batch, best_ids, best_scores):
+                results[position] = [(self.item_ids[i], float(s)) for i, s in zip(ids, scores) if np.isfinite(s)]
+        return results
+
+    def _top_many(self, rows: np.ndarray, k: int, item_block: int) -> Tuple[np.ndarray, np.ndarray]:
+        vectors = self.user_factors[rows]
+        n_items = len(self.item_ids)
+
+        # Seen items of the batch as (batch position, item row) pairs, sorted by item row
+        lengths = self.seen_indptr[rows + 1] - self.seen_indptr[rows]
+        mask_users = np.repeat(np.arange(len(rows)), lengths)
+        mask_items = np.concatenate([self.seen_items[self.seen_indptr[r]:self.seen_indptr[r + 1]] for r in rows]).astype(np.int64)
+        order = np.argsort(mask_items, kind="stable")
+        mask_users, mask_items = mask_users[order], mask_items[order]
+
+        best_ids = np.zeros((len(rows), 0), dtype=np.int64)
+        best_scores = np.zeros((len(rows), 0), dtype=np.float32)
+        for start in range(0, n_items, item_block):
+            end = min(start + item_block, n_items)
+            block = vectors @ np.asarray(self.item_factors[start:end]).T
+            if self.item_bias is not None:
+                block += self.item_bias[start:end]
+            lo, hi = np.searchsorted(mask_items, [start, end])
+            block[mask_users[lo:hi], mask_items[lo:hi] - start] = -np.inf
+
+            if best_ids.shape[1] < k:
+                candidates = np.concatenate([best_ids, np.broadcast_to(np.arange(start, end), block.shape)], axis=1)
+                candidate_scores = np.concatenate([best_scores, block], axis=1)
+            else:
+                # Only scores above a user's current k-th best can enter their top k; after
+                # the first block that is a small fraction, so gather just those
+                users, columns = np.nonzero(block > best_scores.min(axis=1)[:, None])
+                if not len(users):
+                    continue
+                counts = np.bincount(users, minlength=len(rows))
+                slots = np.arange(len(users)) - np.repeat(np.cumsum(counts) - counts, counts)
+                candidates = np.zeros((len(rows), k + counts.max()), dtype=np.int64)
+                candidate_scores = np.full(candidates.shape, -np.inf, dtype=np.float32)
+                candidates[:, :k], candidate_scores[:, :k] = best_ids, best_scores
+                candidates[users, k + slots] = columns + start
+                candidate_scores[users, k + slots] = block[users, columns]
+            if candidate_scores.shape[1] > k:
+                top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+                best_ids = np.take_along_axis(candidates, top, axis=1)
+                best_scores = np.take_along_axis(candidate_scores, top, axis=1)
+            else:
+                best_ids, best_scores = candidates, candidate_scores
+
+        order = np.argsort(-best_scores, axis=1)
+        return np.take_along_axis(best_ids, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    # --- Persistence ---
+
+    def save(self, path: str) -> None:
+        np.save(path + ".items.tmp.npy", self.item_factors)
+        arrays = {"users": self.user_factors, "seen_indptr": self.seen_indptr, "seen_items": self.seen_items}
+        if self.item_bias is not None:
+            arrays["item_bias"] = self.item_bias
+        np.savez(path + ".tmp.npz", **arrays)
+        with open(path + ".meta.tmp.json", "w") as f:
+            json.dump({"users": self.user_ids, "items": self.item_ids, "reg": self.reg, "alpha": self.alpha}, f)
+        # Meta last: readers check its mtime, so the arrays are in place when it changes
+        os.replace(path + ".items.tmp.npy", path + ".items.npy")
+        os.replace(path + ".tmp.npz", path + ".npz")
+        os.replace(path + ".meta.tmp.json", path + ".meta.json")
+
+    @classmethod
+    def load(cls, path: str) -> "CollaborativeModel":
+        with open(path + ".meta.json") as f:
+            meta = json.load(f)
+        arrays = np.load(path + ".npz")
+        return cls(
+            meta["users"],
+            meta["items"],
+            arrays["users"],
+            np.load(path + ".items.npy", mmap_mode="r"),
+            arrays["item_bias"] if "item_bias" in arrays else None,
+            arrays["seen_indptr"],
+            arrays["seen_items"],
+            meta["reg"],
+            meta["alpha"],
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"users": len(self.user_ids), "items": len(self.item_ids), "factors": int(self.item_factors.shape[1])}
@@ -1,5 +1,7 @@
 import os
+from datetime import datetime, timezone
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -27,3 +29,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def dialect_insert(db):
+    """INSERT construct with .on_conflict_do_*() for the session's backend (SQLite and Postgres both support it)."""
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+# DateTime columns are declared without a time zone and hold UTC
+def utcnow():
+    """Current time as a naive UTC datetime, for DateTime columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def utc_timestamp(value):
+    """Unix time of a naive UTC datetime read back from a DateTime column."""
+    return value.replace(tzinfo=timezone.utc).timestamp()
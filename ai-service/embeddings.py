@@ -0,0 +1,412 @@
+import os
+import json
+import zlib
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from retrieval import product_field_text, tokenize
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: writers in one process are still serialized by the thread lock,
+    # but two workers syncing at once may overwrite each other's metadata
+    fcntl = None
+
+# Local semantic product search.
+#
+# Products are encoded without any network call by signed feature hashing of
+# stemmed words, word bigrams and character trigrams (the trigrams make
+# misspellings and word variants land near each other), weighted by field and
+# L2-normalised. Vectors live in one contiguous float32 matrix memory-mapped
+# from disk, so every worker shares the OS page cache instead of holding its
+# own copy. Queries are a single matrix-vector product plus argpartition; past
+# ANN_MIN_ROWS rows an IVF index (k-means centroids + inverted lists) narrows
+# the scan to the closest clusters.
+#
+# Files, next to `path`: <path>.f32 (vectors), <path>.meta.json (row -> product
+# id and content hash), <path>.ivf.npz (ANN index), <path>.lock.
+
+EMBEDDING_FIELDS = {
+    "name": 3.0,
+    "tags": 2.0,
+    "category": 1.0,
+    "dataAiHint": 1.0,
+    "description": 1.0,
+}
+
+# Relative weight of each feature kind
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 0.5
+TRIGRAM_WEIGHT = 0.25
+
+# Products encoded per vectorized batch during sync
+ENCODE_BATCH = 4096
+
+ANN_MIN_ROWS = int(os.getenv("EMBEDDING_ANN_MIN_ROWS", "50000"))
+
+
+class HashingEncoder:
+    """Deterministic text -> unit vector encoder; needs no training data or network."""
+
+    def __init__(self, dim: int = 256, cache_size: int = 200_000):
+        self.dim = dim
+        self.cache_size = cache_size
+        # token (or bigram) -> (buckets, signed weights); catalog vocabularies repeat heavily
+        self._cache: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _hashed(self, features: List[Tuple[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        buckets, weights = [], []
+        for feature, weight in features:
+            # crc32 is stable across processes (unlike hash()); the top bit picks the sign
+            h = zlib.crc32(feature.encode("utf-8"))
+            buckets.append(h % self.dim)
+            weights.append(weight if h & 0x80000000 else -weight)
+        return np.array(buckets, dtype=np.int64), np.array(weights, dtype=np.float64)
+
+    def _term(self, key: str) -> Tuple[np.ndarray, np.ndarray]:
+        cached = self._cache.get(key)
+        if cached is None:
+            if " " in key:
+                features = [("b:" + key.replace(" ", "_"), BIGRAM_WEIGHT)]
+            else:
+                padded = f"#{key}#"
+                features = [("w:" + key, WORD_WEIGHT)]
+                features += [("c:" + padded[i:i + 3], TRIGRAM_WEIGHT) for i in range(len(padded) - 2)]
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            cached = self._cache[key] = self._hashed(features)
+        return cached
+
+    def terms(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def encode_weighted(self, docs: List[List[Tuple[str, float]]]) -> np.ndarray:
+        """docs[i] is a list of (term, field weight) pairs; returns L2-normalised float32 rows."""
+        bucket_parts, weight_parts, lengths, scales, rows = [], [], [], [], []
+        for row, terms in enumerate(docs):
+            for term, scale in terms:
+                buckets, weights = self._term(term)
+                bucket_parts.append(buckets)
+                weight_parts.append(weights)
+                lengths.append(len(buckets))
+                scales.append(scale)
+                rows.append(row)
+        if not bucket_parts:
+            return np.zeros((len(docs), self.dim), dtype=np.float32)
+        # One bincount for the whole batch instead of numpy calls per feature
+        lengths = np.array(lengths)
+        buckets = np.concatenate(bucket_parts) + np.repeat(np.array(rows) * self.dim, lengths)
+        weights = np.concatenate(weight_parts) * np.repeat(np.array(scales), lengths)
+        matrix = np.bincount(buckets, weights, minlength=len(docs) * self.dim).reshape(len(docs), self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return (matrix / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+    def encode(self, text: str) -> np.ndarray:
+        return self.encode_weighted([[(term, 1.0) for term in self.terms(text)]])[0]
+
+    def encode_products(self, products: List[Any]) -> np.ndarray:
+        docs = []
+        for product in products:
+            docs.append([
+                (term, weight)
+                for field, weight in EMBEDDING_FIELDS.items()
+                for term in self.terms(product_field_text(product, field))
+            ])
+        return self.encode_weighted(docs)
+
+
+def product_content_hash(product: Any) -> str:
+    """Changes whenever a field the encoder reads changes."""
+    text = "\x1f".join(product_field_text(product, field) for field in EMBEDDING_FIELDS)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the k highest scores, best first, without sorting everything."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class IVFIndex:
+    """Inverted-file ANN index: spherical k-means centroids and rows grouped by nearest centroid."""
+
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray, trained_rows: int):
+        self.centroids = centroids
+        self.assignments = assignments
+        # Catalog size the centroids were fitted on
+        self.trained_rows = trained_rows
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def train(cls, matrix: np.ndarray, nlist: int, iterations: int = 8, sample: int = 100_000, seed: int = 0) -> "IVFIndex":
+        rng = np.random.default_rng(seed)
+        rows = len(matrix)
+        training = np.asarray(matrix[rng.choice(rows, size=min(sample, rows), replace=False)])
+        centroids = training[rng.choice(len(training), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            nearest = np.argmax(training @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = training[nearest == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+        index = cls(centroids, np.empty(0, dtype=np.int32), rows)
+        index.assign(matrix, np.arange(rows))
+        return index
+
+    def assign(self, matrix: np.ndarray, rows: np.ndarray, block: int = 65536) -> None:
+        """(Re)assign the given rows to their nearest centroid; the index grows to len(matrix) rows."""
+        if len(self.assignments) < len(matrix):
+            grown = np.zeros(len(matrix), dtype=np.int32)
+            grown[:len(self.assignments)] = self.assignments
+            self.assignments = grown
+        for offset in range(0, len(rows), block):
+            part = rows[offset:offset + block]
+            self.assignments[part] = np.argmax(np.asarray(matrix[part]) @ self.centroids.T, axis=1)
+        self._lists = None
+
+    def members(self, cluster: int) -> np.ndarray:
+        """Rows assigned to `cluster`."""
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable").astype(np.int64)
+            offsets = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = (order, offsets)
+        order, offsets = self._lists
+        return order[offsets[cluster]:offsets[cluster + 1]]
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probes = top_k(self.centroids @ query, nprobe)
+        return np.concatenate([self.members(c) for c in probes])
+
+    def save(self, path: str) -> None:
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, centroids=self.centroids, assignments=self.assignments, trained_rows=self.trained_rows)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        data = np.load(path)
+        return cls(data["centroids"], data["assignments"], int(data["trained_rows"]))
+
+
+class EmbeddingIndex:
+    def __init__(self, path: str, dim: int = 256, nprobe: int = 8):
+        self.path = path
+        self.encoder = HashingEncoder(dim)
+        self.nprobe = nprobe
+        self._vectors_path = path + ".f32"
+        self._meta_path = path + ".meta.json"
+        self._ann_path = path + ".ivf.npz"
+        self._lock_path = path + ".lock"
+        # Guards the in-memory state (ids, matrix, alive mask, ANN index): readers
+        # take it too, since sync() grows the matrix and swaps these in place.
+        # Reentrant because _locked() refreshes while holding it.
+        self._thread_lock = threading.RLock()
+        self._reset()
+        self.refresh()
+
+    def _reset(self) -> None:
+        self.ids: List[str] = []
+        self.hashes: List[Optional[str]] = []
+        self.row_of: Dict[str, int] = {}
+        self.capacity = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._alive = np.zeros(0, dtype=bool)
+        self.ann: Optional[IVFIndex] = None
+        self._meta_mtime: Optional[float] = None
+        self._ann_mtime: Optional[float] = None
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def _open_matrix(self) -> None:
+        self._matrix = None
+        if self.capacity:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.encoder.dim))
+
+    def refresh(self) -> None:
+        """Pick up changes another process has written (cheap when nothing changed)."""
+        with self._thread_lock:
+            self._refresh()
+
+    def _refresh(self) -> None:
+        try:
+            mtime = os.path.getmtime(self._meta_path)
+        except OSError:
+            return
+        if mtime != self._meta_mtime:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            if meta["dim"] != self.encoder.dim:
+                raise ValueError(f"Embedding index {self.path} has dim {meta['dim']}, expected {self.encoder.dim}")
+            self.ids, self.hashes, self.capacity = meta["ids"], meta["hashes"], meta["capacity"]
+            self.row_of = {pid: row for row, (pid, h) in enumerate(zip(self.ids, self.hashes)) if h is not None}
+            self._alive = np.array([h is not None for h in self.hashes], dtype=bool)
+            self._open_matrix()
+            self._meta_mtime = mtime
+        try:
+            ann_mtime = os.path.getmtime(self._ann_path)
+        except OSError:
+            self.ann, self._ann_mtime = None, None
+            return
+        if ann_mtime != self._ann_mtime:
+            self.ann, self._ann_mtime = IVFIndex.load(self._ann_path), ann_mtime
+
+    @contextmanager
+    def _locked(self):
+        # Serializes writers across threads and worker processes
+        with self._thread_lock, open(self._lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self.capacity:
+            return
+        capacity = max(1024, self.capacity)
+        while capacity < rows:
+            capacity *= 2
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._matrix = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.encoder.dim * 4)
+        self.capacity = capacity
+        self._open_matrix()
+
+    def _write_rows(self, pending: List[Tuple[int, Any]]) -> None:
+        if not pending:
+            return
+        self._ensure_capacity(self.count)
+        rows = np.array([row for row, _ in pending])
+        self._matrix[rows] = self.encoder.encode_products([product for _, product in pending])
+
+    def _save_meta(self) -> None:
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.encoder.dim, "capacity": self.capacity, "ids": self.ids, "hashes": self.hashes}, f)
+        os.replace(tmp, self._meta_path)
+        self._meta_mtime = os.path.getmtime(self._meta_path)
+
+    def sync(self, products: Iterable[Any]) -> Dict[str, int]:
+        """
+        Bring the index in line with `products`: encode new or changed products, drop removed ones.
+
+        Unchanged products (same content hash) are not re-encoded, so syncing after
+        a small catalog edit costs one hash per product plus the edited rows.
+        """
+        with self._locked():
+            seen = set()
+            added = updated = 0
+            changed: List[int] = []
+            pending: List[Tuple[int, Any]] = []
+            for product in products:
+                product_id = product_field_text(product, "id")
+                seen.add(product_id)
+                content = product_content_hash(product)
+                row = self.row_of.get(product_id)
+                if row is not None and self.hashes[row] == content:
+                    continue
+                if row is None:
+                    row = self.count
+                    self.ids.append(product_id)
+                    self.hashes.append(content)
+                    self.row_of[product_id] = row
+                    added += 1
+                else:
+                    self.hashes[row] = content
+                    updated += 1
+                pending.append((row, product))
+                changed.append(row)
+                if len(pending) >= ENCODE_BATCH:
+                    self._write_rows(pending)
+                    pending = []
+            self._write_rows(pending)
+
+            removed = [pid for pid in self.row_of if pid not in seen]
+            for product_id in removed:
+                row = self.row_of.pop(product_id)
+                self.hashes[row] = None
+                self._matrix[row] = 0.0
+
+            if added or updated or removed:
+                self._matrix.flush()
+                self._alive = np.array([h is not None for h in self.hashes], dtype=bool)
+                self._update_ann(np.array(changed, dtype=np.int64))
+                self._save_meta()
+            return {"added": added, "updated": updated, "removed": len(removed), "rows": self.count}
+
+    def _update_ann(self, changed: np.ndarray) -> None:
+        matrix = self._matrix[:self.count]
+        if self.count < ANN_MIN_ROWS:
+            if self.ann is not None:
+                os.remove(self._ann_path)
+                self.ann, self._ann_mtime = None, None
+            return
+        if self.ann is None or self.count > 2 * self.ann.trained_rows:
+            # (Re)train once the catalog has doubled since the centroids were fitted
+            self.ann = IVFIndex.train(matrix, nlist=int(np.sqrt(self.count)))
+        else:
+            self.ann.assign(matrix, changed)
+        self.ann.save(self._ann_path)
+        self._ann_mtime = os.path.getmtime(self._ann_path)
+
+    def search(self, query: str, k: int = 10, exact: bool = False) -> List[Tuple[str, float]]:
+        """Top-k (product id, cosine similarity) pairs for `query`."""
+        vector = self.encoder.encode(query)
+        if not vector.any():
+            return []
+        with self._thread_lock:
+            self._refresh()
+            if not self.count:
+                return []
+            if self.ann is not None and not exact:
+                rows = self.ann.candidates(vector, self.nprobe)
+                rows = rows[self._alive[rows]]
+                scores = self._matrix[rows] @ vector
+            else:
+                rows = None
+                scores = np.where(self._alive, self._matrix[:self.count] @ vector, -np.inf)
+            best = top_k(scores, k)
+            results = []
+            for i in best:
+                score = float(scores[i])
+                if score <= 0:
+                    break
+                row = int(rows[i]) if rows is not None else int(i)
+                results.append((self.ids[row], score))
+            return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._thread_lock:
+            return {
+                "rows": self.count,
+                "products": len(self.row_of),
+                "dim": self.encoder.dim,
+                "capacity": self.capacity,
+                "ann": self.ann is not None,
+                "annLists": len(self.ann.centroids) if self.ann is not None else 0,
+            }
+
+
+def create_embedding_index() -> EmbeddingIndex:
+    """Build the index from EMBEDDING_INDEX_PATH / EMBEDDING_DIM / EMBEDDING_NPROBE."""
+    return EmbeddingIndex(
+        path=os.getenv("EMBEDDING_INDEX_PATH", "./product_embeddings"),
+        dim=int(os.getenv("EMBEDDING_DIM", "256")),
+        nprobe=int(os.getenv("EMBEDDING_NPROBE", "8")),
+    )
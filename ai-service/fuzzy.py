@@ -0,0 +1,195 @@
+import re
+from difflib import SequenceMatcher
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Indexed fuzzy string matching.
+#
+# TrigramIndex is the blocking step: strings are indexed by the character
+# trigrams of their tokens, and a lookup shortlists the strings sharing the
+# most trigrams with the query (reading the query's rarest posting lists first,
+# up to a budget) so exact scoring only runs on a few dozen candidates instead
+# of the whole list. FuzzyMatcher puts fuzzywuzzy-compatible token_sort_ratio
+# scoring on top of it; name_resolver uses the same index with its own score.
+
+_NORMALIZE_RE = re.compile(r"[^a-z0-9]+")
+
+# Postings read per lookup, rarest trigrams first; bounds lookup cost on large lists
+POSTINGS_BUDGET = 20000
+SHORTLIST = 32
+
+
+def normalize(text: str) -> str:
+    """Lowercase, non-alphanumerics to spaces, whitespace collapsed (fuzzywuzzy's full_process)."""
+    return " ".join(_NORMALIZE_RE.sub(" ", str(text).lower()).split())
+
+
+def token_sort_key(text: str) -> str:
+    return " ".join(sorted(normalize(text).split()))
+
+
+def token_trigrams(token: str) -> List[str]:
+    padded = f" {token} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def trigrams(normalized: str) -> FrozenSet[str]:
+    return frozenset(gram for token in normalized.split() for gram in token_trigrams(token))
+
+
+def token_sort_ratio(a: str, b: str) -> int:
+    """Same score as fuzzywuzzy's fuzz.token_sort_ratio (pure-Python backend), 0-100."""
+    a, b = token_sort_key(a), token_sort_key(b)
+    if not a or not b:
+        return 0
+    return int(round(100 * SequenceMatcher(None, a, b).ratio()))
+
+
+class TrigramIndex:
+    """Trigram postings over a fixed list of normalized strings; doc ids are list positions."""
+
+    def __init__(self):
+        self.gram_ids: Dict[str, int] = {}
+        self.doc_grams: List[FrozenSet[int]] = []
+        self.postings: List[np.ndarray] = []
+        self.doc_sizes = np.empty(0, dtype=np.int32)
+
+    @classmethod
+    def build(cls, keys: Iterable[str]) -> "TrigramIndex":
+        index = cls()
+        # Catalog vocabularies repeat heavily; hash each distinct token's trigrams once
+        token_cache: Dict[str, List[int]] = {}
+        flat_grams: List[int] = []
+        flat_docs: List[int] = []
+        for key in keys:
+            grams: set = set()
+            for token in key.split():
+                cached = token_cache.get(token)
+                if cached is None:
+                    cached = token_cache[token] = [
+                        index.gram_ids.setdefault(gram, len(index.gram_ids)) for gram in token_trigrams(token)
+                    ]
+                grams.update(cached)
+            flat_grams.extend(grams)
+            flat_docs.extend([len(index.doc_grams)] * len(grams))
+            index.doc_grams.append(frozenset(grams))
+
+        # Group doc ids by trigram id in one sort instead of appending per trigram
+        gram_array = np.array(flat_grams, dtype=np.int64)
+        order = np.argsort(gram_array, kind="stable")
+        doc_array = np.array(flat_docs, dtype=np.int32)[order]
+        bounds = np.searchsorted(gram_array[order], np.arange(len(index.gram_ids) + 1))
+        index.postings = [doc_array[bounds[g]:bounds[g + 1]] for g in range(len(index.gram_ids))]
+        index.doc_sizes = np.array([len(grams) for grams in index.doc_grams], dtype=np.int32)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_grams)
+
+    def query(self, normalized: str) -> Tuple[FrozenSet[int], int]:
+        """The query's known trigram ids, and its total trigram count (known or not)."""
+        grams = trigrams(normalized)
+        return frozenset(self.gram_ids[g] for g in grams if g in self.gram_ids), len(grams)
+
+    def _postings(self, grams: FrozenSet[int], budget: int) -> List[np.ndarray]:
+        lists = sorted((self.postings[g] for g in grams), key=len)
+        used, total = [], 0
+        for postings in lists:
+            if used and total + len(postings) > budget:
+                break
+            used.append(postings)
+            total += len(postings)
+        return used
+
+    def _best(self, doc_ids: np.ndarray, counts: np.ndarray, query_size: int, size: int) -> np.ndarray:
+        if len(doc_ids) <= size:
+            return doc_ids
+        # Rank by Dice overlap rather than raw shared count, so a short name that
+        # contains the whole query beats longer names that merely also contain it
+        dice = counts / (query_size + self.doc_sizes[doc_ids])
+        return doc_ids[np.argpartition(-dice, size)[:size]]
+
+    def shortlist(self, grams: FrozenSet[int], size: int = SHORTLIST, budget: int = POSTINGS_BUDGET) -> np.ndarray:
+        """Ids of up to `size` docs with the most trigram overlap with `grams`."""
+        used = self._postings(grams, budget)
+        if not used:
+            return np.empty(0, dtype=np.int32)
+        doc_ids, counts = np.unique(np.concatenate(used), return_counts=True)
+        return self._best(doc_ids, counts, len(grams), size)
+
+    def shortlist_many(self, queries: Sequence[FrozenSet[int]], size: int = SHORTLIST, budget: int = POSTINGS_BUDGET) -> List[np.ndarray]:
+        """shortlist() for several queries, counting shared trigrams for all of them in one pass."""
+        docs = len(self.doc_grams)
+        parts = [
+            postings.astype(np.int64) + q * docs
+            for q, grams in enumerate(queries)
+            for postings in self._postings(grams, budget)
+        ]
+        if not parts:
+            return [np.empty(0, dtype=np.int64) for _ in queries]
+        # (query, doc) pairs encoded as one integer so a single unique() counts them all
+        pairs, counts = np.unique(np.concatenate(parts), return_counts=True)
+        bounds = np.searchsorted(pairs, np.arange(len(queries) + 1) * docs)
+        shortlists = []
+        for q in range(len(queries)):
+            doc_ids = pairs[bounds[q]:bounds[q + 1]] - q * docs
+            shortlists.append(self._best(doc_ids, counts[bounds[q]:bounds[q + 1]], len(queries[q]), size))
+        return shortlists
+
+
+class FuzzyMatcher:
+    """
+    Indexed replacement for fuzzywuzzy's process.extract(query, choices, scorer=fuzz.token_sort_ratio).
+
+    Choice keys are normalized and token-sorted once at construction; each lookup
+    scores only the trigram shortlist, so a choice sharing no trigram with the
+    query is never returned.
+    """
+
+    def __init__(self, choices: Sequence[str], shortlist: int = 64):
+        self.choices = list(choices)
+        self.keys = [token_sort_key(choice) for choice in self.choices]
+        self.index = TrigramIndex.build(self.keys)
+        self.shortlist = shortlist
+
+    def _score(self, key: str, candidates: np.ndarray, limit: int, score_cutoff: int) -> List[Tuple[str, int]]:
+        matcher = SequenceMatcher(None)
+        # seq2 is the side difflib preprocesses, so keep the query there
+        matcher.set_seq2(key)
+        scored: List[Tuple[int, int]] = []
+        floor = score_cutoff
+        for doc_id in sorted(int(d) for d in candidates):
+            matcher.set_seq1(self.keys[doc_id])
+            # Cheap upper bounds first; skip candidates that cannot beat the current top `limit`
+            if round(100 * matcher.real_quick_ratio()) < floor or round(100 * matcher.quick_ratio()) < floor:
+                continue
+            score = int(round(100 * matcher.ratio()))
+            if score < floor:
+                continue
+            scored.append((score, doc_id))
+            if len(scored) >= limit:
+                scored.sort(key=lambda item: (-item[0], item[1]))
+                del scored[limit:]
+                floor = max(score_cutoff, scored[-1][0])
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(self.choices[doc_id], score) for score, doc_id in scored[:limit]]
+
+    def extract(self, query: str, limit: int = 3, score_cutoff: int = 0) -> List[Tuple[str, int]]:
+        """Up to `limit` (choice, score) pairs with score >= score_cutoff, best first."""
+        return self.extract_many([query], limit, score_cutoff)[0]
+
+    def extract_many(self, queries: Sequence[str], limit: int = 3, score_cutoff: int = 0) -> List[List[Tuple[str, int]]]:
+        """extract() for every query, e.g. all keywords of one recipe, with one blocking pass."""
+        keys = [token_sort_key(query) for query in queries]
+        unique_keys = list(dict.fromkeys(key for key in keys if key))
+        shortlists = self.index.shortlist_many([self.index.query(key)[0] for key in unique_keys], self.shortlist)
+        results = {
+            key: self._score(key, candidates, limit, score_cutoff)
+            for key, candidates in zip(unique_keys, shortlists)
+        }
+        return [results.get(key, []) for key in keys]
+
+    def best(self, query: str, score_cutoff: int = 0) -> Optional[Tuple[str, int]]:
+        matches = self.extract(query, 1, score_cutoff)
+        return matches[0] if matches else None
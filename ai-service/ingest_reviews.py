@@ -0,0 +1,192 @@
+"""
+Stream a review dump CSV into the reviews table.
+
+Run from ai-service/:
+    python ingest_reviews.py ../src/datasets/Walmart_reviews_data.csv
+    python ingest_reviews.py reviews.csv --product-id 1001 --chunk-size 20000 --workers 8
+
+Expected columns: name, location, Date ("Reviewed Sept. 13, 2023"), Rating,
+Review and Image_Links (a stringified Python list, or ['No Images']).
+
+The file is read in fixed-size chunks, so memory stays flat however large the
+dump is. Each chunk is scored for sentiment in a process pool and bulk-inserted
+with one executemany; reviews already in the table (same reviewer, location,
+date and text) are skipped, so re-running an import is safe.
+"""
+
+import os
+import re
+import ast
+import csv
+import sys
+import time
+import hashlib
+import argparse
+from collections import deque
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from database import SessionLocal, dialect_insert, engine
+from models import Base, Review
+from sentiment import score_reviews
+
+DEFAULT_CSV_PATH = "../src/datasets/Walmart_reviews_data.csv"
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_DATE_RE = re.compile(r"(?:Reviewed\s+)?([A-Za-z]+)\.?\s+(\d{1,2}),\s*(\d{4})")
+
+
+def parse_review_date(value: str) -> Optional[date]:
+    """Parse 'Reviewed Sept. 13, 2023' / 'Reviewed July 30, 2023' style dates."""
+    match = _DATE_RE.search(value or "")
+    if not match:
+        return None
+    month = MONTHS.get(match.group(1)[:3].lower())
+    if month is None:
+        return None
+    try:
+        return date(int(match.group(3)), month, int(match.group(2)))
+    except ValueError:
+        return None
+
+
+def parse_image_links(value: str) -> List[str]:
+    """Parse the stringified list in Image_Links, dropping the 'No Images' placeholder."""
+    value = (value or "").strip()
+    if not value:
+        return []
+    try:
+        links = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        links = [value]
+    if isinstance(links, str):
+        links = [links]
+    return [str(link) for link in links if str(link).startswith("http")]
+
+
+def parse_rating(value: str) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def content_hash(name: str, location: str, reviewed: str, text: str) -> str:
+    key = "\x1f".join(part.strip().lower() for part in (name, location, reviewed, text))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def parse_row(row: Dict[str, str], product_id: Optional[str], source: str) -> Dict[str, Any]:
+    text = (row.get("Review") or "").strip()
+    return {
+        "content_hash": content_hash(row.get("name", ""), row.get("location", ""), row.get("Date", ""), text),
+        "product_id": product_id,
+        "reviewer_name": (row.get("name") or "").strip() or None,
+        "location": (row.get("location") or "").strip() or None,
+        "reviewed_at": parse_review_date(row.get("Date", "")),
+        "rating": parse_rating(row.get("Rating")),
+        "text": text,
+        "image_links": parse_image_links(row.get("Image_Links", "")),
+        "source": source,
+    }
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[List[Dict[str, str]]]:
+    # Review text can be long; lift the csv module's default 128KB field limit
+    csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        chunk: List[Dict[str, str]] = []
+        for row in csv.DictReader(f):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def score_chunk(texts: List[str]) -> List[Dict[str, Any]]:
+    """Runs in a worker process."""
+    return score_reviews(texts)
+
+
+def insert_chunk(records: List[Dict[str, Any]]) -> int:
+    """Bulk-insert one chunk in a single executemany, skipping reviews already stored."""
+    if not records:
+        return 0
+    db = SessionLocal()
+    try:
+        insert = dialect_insert(db)
+        stmt = insert(Review).on_conflict_do_nothing(index_elements=["content_hash"]).returning(Review.id)
+        inserted = len(db.execute(stmt, records).all())
+        db.commit()
+        return inserted
+    finally:
+        db.close()
+
+
+def ingest_reviews(
+    path: str = DEFAULT_CSV_PATH,
+    product_id: Optional[str] = None,
+    chunk_size: int = 5000,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    Base.metadata.create_all(bind=engine)
+    source = path.rsplit("/", 1)[-1]
+    totals = {"rows": 0, "duplicates": 0, "inserted": 0}
+    started = time.perf_counter()
+    # Rows of the chunks inserted so far; the chunks still being scored are not counted yet
+    processed = 0
+
+    def finish(row_count: int, records: List[Dict[str, Any]], future) -> None:
+        nonlocal processed
+        for record, score in zip(records, future.result()):
+            record["sentiment_positive"] = round(score["positive"], 4)
+            record["sentiment_aspects"] = score["aspects"]
+        totals["inserted"] += insert_chunk(records)
+        processed += row_count
+        # Empty reviews, repeats within a chunk and reviews already stored all count as duplicates
+        totals["duplicates"] = processed - totals["inserted"]
+        elapsed = time.perf_counter() - started
+        print(f"  {processed} rows processed, {totals['inserted']} inserted, "
+              f"{totals['duplicates']} duplicates ({processed / elapsed:,.0f} rows/s)")
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Bound the chunks in flight so memory stays flat while workers score
+        pending: deque = deque()
+        max_pending = workers + 1
+        for rows in read_chunks(path, chunk_size):
+            totals["rows"] += len(rows)
+            records: Dict[str, Dict[str, Any]] = {}
+            for row in rows:
+                record = parse_row(row, product_id, source)
+                if record["text"] and record["content_hash"] not in records:
+                    records[record["content_hash"]] = record
+            batch = list(records.values())
+            pending.append((len(rows), batch, pool.submit(score_chunk, [r["text"] for r in batch])))
+            if len(pending) >= max_pending:
+                finish(*pending.popleft())
+        while pending:
+            finish(*pending.popleft())
+
+    elapsed = time.perf_counter() - started
+    totals["seconds"] = round(elapsed, 3)
+    totals["rowsPerSecond"] = round(totals["rows"] / elapsed) if elapsed else 0
+    print(f"Ingested {path}: {totals['rows']} rows, {totals['inserted']} new reviews, "
+          f"{totals['duplicates']} duplicates in {elapsed:.2f}s ({totals['rowsPerSecond']:,} rows/s)")
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a review CSV into the reviews table.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_CSV_PATH)
+    parser.add_argument("--product-id", help="attach every review in the file to this product")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None, help="sentiment scoring processes (default: CPU count)")
+    args = parser.parse_args()
+    ingest_reviews(args.path, args.product_id, args.chunk_size, args.workers)
@@ -2,6 +2,8 @@ import json
 import re
 from database import engine, SessionLocal
 from models import Base, Product
+# Registers the hooks that bump the catalog version on product writes
+import catalog
 
 def extract_products_from_ts(file_path):
     with open(file_path, 'r') as f:
@@ -0,0 +1,222 @@
+import re
+import json
+import math
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from retrieval import ProductIndex, stem, tokenize
+
+# Local intent engine for /detect-intent.
+# A multinomial Naive Bayes classifier (trained offline by train_intent_model.py
+# and persisted as JSON) plus deterministic parsers for price range and skin
+# type. Queries the classifier is unsure about are escalated to the LLM, and so
+# are recipes whose ingredients no recipe source knows: product search hits for
+# the query words ("pasta" -> pasta sauce) are not a recipe's ingredients.
+
+INTENT_CATEGORIES = {
+    "recipe": "Groceries",
+    "grocery": "Groceries",
+    "skincare": "Skincare",
+    "clothing": "Clothing",
+    "electronics": "Electronics",
+}
+
+SKIN_TYPES = ("oily", "dry", "sensitive", "combination")
+
+_AMOUNT = r"\$?\s*(\d+(?:\.\d+)?)\s*(k\b)?"
+_RANGE_RE = re.compile(rf"(?:between|from)\s*{_AMOUNT}\s*(?:and|to|-)\s*{_AMOUNT}|\${_AMOUNT}\s*(?:-|to)\s*{_AMOUNT}|{_AMOUNT}\s*-\s*{_AMOUNT}")
+_MAX_RE = re.compile(rf"(?:under|below|less than|cheaper than|at most|up to|max(?:imum)?|within|<)\s*{_AMOUNT}")
+_MIN_RE = re.compile(rf"(?:over|above|more than|at least|min(?:imum)?|>)\s*{_AMOUNT}")
+_WORD_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+# Unlike retrieval, words like "make", "want" or "how" carry intent, so only articles are dropped
+_FEATURE_STOP_WORDS = {"a", "an", "the", "of", "for", "to", "and", "i", "me", "my"}
+_FEATURE_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def features(text: str) -> List[str]:
+    """Unigram and bigram features over lightly stemmed tokens."""
+    tokens = [stem(t) for t in _FEATURE_TOKEN_RE.findall(text.lower()) if t not in _FEATURE_STOP_WORDS]
+    return tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def _amounts(match: re.Match) -> List[int]:
+    """Pair up (number, 'k' suffix) groups of a match into integer amounts."""
+    groups = match.groups()
+    values = []
+    for number, thousands in zip(groups[0::2], groups[1::2]):
+        if number is not None:
+            values.append(int(round(float(number) * (1000 if thousands else 1))))
+    return values
+
+
+def parse_price_range(query: str) -> Optional[Dict[str, int]]:
+    """Extract {'min', 'max'} from phrases like 'under $50', 'over 100', '$20-$50', 'between 10 and 30'."""
+    text = query.lower()
+    match = _RANGE_RE.search(text)
+    if match:
+        low, high = _amounts(match)
+        return {"min": min(low, high), "max": max(low, high)}
+    match = _MAX_RE.search(text)
+    if match:
+        return {"min": 0, "max": _amounts(match)[0]}
+    match = _MIN_RE.search(text)
+    if match:
+        return {"min": _amounts(match)[0], "max": 1_000_000}
+    return None
+
+
+def parse_skin_type(query: str) -> Optional[str]:
+    text = query.lower()
+    for skin_type in SKIN_TYPES:
+        if re.search(rf"\b{skin_type}\b", text):
+            return skin_type
+    if re.search(r"\bacne\b|\bgreasy\b", text):
+        return "oily"
+    return None
+
+
+def extract_keywords(query: str) -> List[str]:
+    """Query words minus stop words and price numbers, in order, deduplicated."""
+    stop = {"under", "below", "over", "above", "than", "less", "more", "between", "dollars", "dollar", "rs"}
+    seen = []
+    for word in _WORD_RE.findall(query.lower()):
+        if word[0].isdigit() or word in stop or not tokenize(word):
+            continue
+        if word not in seen:
+            seen.append(word)
+    return seen
+
+
+class NaiveBayesIntentClassifier:
+    """Multinomial Naive Bayes over bag-of-ngrams with Laplace smoothing."""
+
+    def __init__(self, alpha: float = 0.5):
+        self.alpha = alpha
+        self.labels: List[str] = []
+        self.log_priors: Dict[str, float] = {}
+        self.log_likelihoods: Dict[str, Dict[str, float]] = {}
+        self.log_unseen: Dict[str, float] = {}
+
+    def train(self, examples: Iterable[Tuple[str, str]]) -> "NaiveBayesIntentClassifier":
+        doc_counts: Counter = Counter()
+        term_counts: Dict[str, Counter] = defaultdict(Counter)
+        for query, label in examples:
+            doc_counts[label] += 1
+            term_counts[label].update(features(query))
+
+        vocabulary = set()
+        for counts in term_counts.values():
+            vocabulary.update(counts)
+        total_docs = sum(doc_counts.values())
+
+        self.labels = sorted(doc_counts)
+        for label in self.labels:
+            denom = sum(term_counts[label].values()) + self.alpha * len(vocabulary)
+            self.log_priors[label] = math.log(doc_counts[label] / total_docs)
+            self.log_likelihoods[label] = {
+                term: math.log((count + self.alpha) / denom) for term, count in term_counts[label].items()
+            }
+            self.log_unseen[label] = math.log(self.alpha / denom)
+        return self
+
+    def predict(self, query: str) -> Tuple[str, float]:
+        """Return (label, probability). Queries with no known terms fall back to the priors."""
+        terms = [t for t in features(query) if any(t in ll for ll in self.log_likelihoods.values())]
+        scores = {}
+        for label in self.labels:
+            likelihoods = self.log_likelihoods[label]
+            unseen = self.log_unseen[label]
+            scores[label] = self.log_priors[label] + sum(likelihoods.get(t, unseen) for t in terms)
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        total = sum(math.exp(score - top) for score in scores.values())
+        return best, 1.0 / total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "alpha": self.alpha,
+            "labels": self.labels,
+            "log_priors": self.log_priors,
+            "log_likelihoods": self.log_likelihoods,
+            "log_unseen": self.log_unseen,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NaiveBayesIntentClassifier":
+        model = cls(alpha=data["alpha"])
+        model.labels = data["labels"]
+        model.log_priors = data["log_priors"]
+        model.log_likelihoods = data["log_likelihoods"]
+        model.log_unseen = data["log_unseen"]
+        return model
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "NaiveBayesIntentClassifier":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+class IntentEngine:
+    """
+    Answers intent queries locally when the classifier is confident enough.
+
+    `detect()` returns a DetectIntentResponse-shaped dict, or None when the
+    query should be escalated to the LLM. Recipe ingredients come from
+    `recipe_ingredients(query)` (e.g. the stored recipe for the dish), which
+    returns None for dishes it doesn't know.
+    """
+
+    def __init__(self, classifier: NaiveBayesIntentClassifier, threshold: float = 0.8, max_hits: int = 8):
+        self.classifier = classifier
+        self.threshold = threshold
+        self.max_hits = max_hits
+        self._stats = {"local": 0, "escalated": 0}
+
+    def detect(
+        self,
+        query: str,
+        index: Optional[ProductIndex] = None,
+        recipe_ingredients: Optional[Callable[[str], Optional[List[str]]]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        intent, confidence = self.classifier.predict(query)
+        if confidence < self.threshold:
+            self._stats["escalated"] += 1
+            return None
+
+        ingredients: List[str] = []
+        if intent == "recipe":
+            ingredients = (recipe_ingredients(query) if recipe_ingredients is not None else None) or []
+            if not ingredients:
+                # Only the LLM can say what an unknown dish needs
+                self._stats["escalated"] += 1
+                return None
+
+        category = INTENT_CATEGORIES.get(intent)
+        hits = index.search(query, k=self.max_hits) if index is not None and intent in ("product", "grocery") else []
+        if hits:
+            # Let the catalog decide between e.g. Groceries / Pantry / Produce
+            category = Counter(index.categories[doc_id] for doc_id, _ in hits).most_common(1)[0][0] or category
+
+        self._stats["local"] += 1
+        return {
+            "type": intent,
+            "keywords": extract_keywords(query),
+            "ingredients": ingredients,
+            "priceRange": parse_price_range(query),
+            "skinType": parse_skin_type(query) if intent == "skincare" else None,
+            "category": category,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        total = self._stats["local"] + self._stats["escalated"]
+        return {
+            "threshold": self.threshold,
+            **self._stats,
+            "localFraction": round(self._stats["local"] / total, 4) if total else 0.0,
+        }
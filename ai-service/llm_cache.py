@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Response cache for deterministic LLM endpoints.
+# Two tiers: a size-bounded in-memory LRU in front of a SQLite table on disk, so
+# popular queries survive restarts and are shared by every worker on the host.
+# Async handlers use aget/aset: memory hits are answered inline and disk I/O runs
+# in a worker thread, so cache traffic never blocks the event loop. Disk hits
+# only note their access time; the last_access updates are written in a batch
+# with the next write.
+
+# Seconds a cached response stays valid (override with LLM_CACHE_TTL_<ENDPOINT>)
+DEFAULT_TTLS = {
+    "ai_search": 24 * 3600,
+    "intent_detection": 6 * 3600,
+    "recommendations": 3600,
+    # Same default as RECIPE_TTL_DAYS; generated recipes normally live in recipes.RecipeStore
+    "recipe_details": 30 * 24 * 3600,
+}
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share a key."""
+    return " ".join(str(text).lower().split())
+
+
+class LLMCache:
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 2048,
+        max_disk_entries: int = 50_000,
+        enabled: bool = True,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.enabled = enabled
+        # key -> (expires_at, value, endpoint)
+        self._memory: "OrderedDict[str, tuple[float, Any, str]]" = OrderedDict()
+        # _lock guards the memory tier and stats; _disk_lock the SQLite connection
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._writes_since_prune = 0
+        # key -> last access time, written with the next set()
+        self._touched: Dict[str, float] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        if enabled and path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(endpoint: str, payload: Any, model: str, prompt_version: str) -> str:
+        raw = json.dumps([endpoint, payload, model, prompt_version], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def ttl(self, endpoint: str) -> float:
+        default = DEFAULT_TTLS.get(endpoint, 3600)
+        try:
+            return float(os.getenv(f"LLM_CACHE_TTL_{endpoint.upper()}", default))
+        except ValueError:
+            return float(default)
+
+    def _count(self, endpoint: str, field: str) -> None:
+        counters = self._stats.setdefault(
+            endpoint, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+        )
+        counters[field] += 1
+
+    def _get_memory(self, endpoint: str, key: str, now: float) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._count(endpoint, "memory_hits")
+                    return value
+                del self._memory[key]
+        return None
+
+    def get(self, endpoint: str, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None on a miss or expiry. May read SQLite; see aget."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        value = self._get_memory(endpoint, key, now)
+        if value is not None:
+            return value
+
+        if self._conn is not None:
+            with self._disk_lock:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._touched[key] = now
+                elif row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+            if row is not None and row[1] > now:
+                value = json.loads(row[0])
+                with self._lock:
+                    self._remember(endpoint, key, row[1], value)
+                    self._count(endpoint, "disk_hits")
+                return value
+
+        with self._lock:
+            self._count(endpoint, "misses")
+        return None
+
+    async def aget(self, endpoint: str, key: str) -> Optional[Any]:
+        """get() for async handlers: memory hits inline, the disk lookup in a worker thread."""
+        if not self.enabled:
+            return None
+        value = self._get_memory(endpoint, key, time.time())
+        if value is not None or self._conn is None:
+            if value is None:
+                with self._lock:
+                    self._count(endpoint, "misses")
+            return value
+        return await asyncio.to_thread(self.get, endpoint, key)
+
+    def set(self, endpoint: str, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        expires_at = now + self.ttl(endpoint)
+        with self._lock:
+            self._remember(endpoint, key, expires_at, value)
+            self._count(endpoint, "sets")
+        if self._conn is not None:
+            self._write(key, endpoint, json.dumps(value), expires_at, now)
+
+    async def aset(self, endpoint: str, key: str, value: Any) -> None:
+        """set() for async handlers: the memory tier is updated inline, the disk write in a worker thread."""
+        if not self.enabled:
+            return
+        now = time.time()
+        expires_at = now + self.ttl(endpoint)
+        with self._lock:
+            self._remember(endpoint, key, expires_at, value)
+            self._count(endpoint, "sets")
+        if self._conn is not None:
+            await asyncio.to_thread(self._write, key, endpoint, json.dumps(value), expires_at, now)
+
+    def _write(self, key: str, endpoint: str, value: str, expires_at: float, now: float) -> None:
+        with self._disk_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, endpoint, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, endpoint, value, expires_at, now),
+            )
+            if self._touched:
+                touched, self._touched = self._touched, {}
+                self._conn.executemany(
+                    "UPDATE llm_cache SET last_access = ? WHERE key = ?",
+                    [(at, k) for k, at in touched.items()],
+                )
+            self._conn.commit()
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= 100:
+                self._prune_disk(now)
+
+    def _remember(self, endpoint: str, key: str, expires_at: float, value: Any) -> None:
+        # Caller holds _lock
+        self._memory[key] = (expires_at, value, endpoint)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            # Counted against the endpoint whose entry was pushed out
+            _, (_, _, evicted_endpoint) = self._memory.popitem(last=False)
+            self._count(evicted_endpoint, "evictions")
+
+    def _prune_disk(self, now: float) -> None:
+        # Caller holds _disk_lock. Drop expired rows, then the least recently used overflow.
+        self._writes_since_prune = 0
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+        self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self._conn is not None:
+            with self._disk_lock:
+                self._touched.clear()
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {name: dict(counters) for name, counters in self._stats.items()}
+        totals = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        for counters in endpoints.values():
+            for field in totals:
+                totals[field] += counters[field]
+        lookups = totals["memory_hits"] + totals["disk_hits"] + totals["misses"]
+        hits = totals["memory_hits"] + totals["disk_hits"]
+        return {
+            "enabled": self.enabled,
+            "memoryEntries": len(self._memory),
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+            **totals,
+            "endpoints": endpoints,
+        }
+
+
+def create_llm_cache() -> LLMCache:
+    """Build the cache from LLM_CACHE_* environment settings."""
+    return LLMCache(
+        path=os.getenv("LLM_CACHE_PATH", "./llm_cache.db"),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048")),
+        max_disk_entries=int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", "50000")),
+        enabled=os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no"),
+    )
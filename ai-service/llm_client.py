@@ -0,0 +1,115 @@
+import os
+import httpx
+from openai import AsyncOpenAI
+
+# Shared async LLM client for the ai-service.
+# All endpoints reuse one pooled HTTP transport so keep-alive connections to the
+# provider are shared across requests instead of being opened per call.
+
+DEFAULT_MODEL = "openai/gpt-4o-mini"
+
+# Selectable with LLM_PROVIDER. "local" is the deterministic stand-in served by
+# stub_llm_server.py, for load tests and benchmarks without provider spend.
+PROVIDERS = {
+    "openrouter": {
+        "base_url": "https://openrouter.ai/api/v1",
+        "api_key_env": "OPEN_AI_API_KEY",
+        "model": DEFAULT_MODEL,
+    },
+    "openai": {
+        "base_url": "https://api.openai.com/v1",
+        "api_key_env": "OPENAI_API_KEY",
+        "model": "gpt-4o-mini",
+    },
+    "local": {
+        "base_url": "http://127.0.0.1:8100/v1",
+        "api_key_env": None,
+        "model": "local/stub",
+    },
+}
+
+# Per-endpoint request deadlines in seconds (override with LLM_TIMEOUT_<ENDPOINT>)
+DEFAULT_TIMEOUTS = {
+    "product_qa": 30.0,
+    "follow_up_questions": 15.0,
+    "analyze_review": 15.0,
+    "ai_search": 10.0,
+    "recommendations": 10.0,
+    "intent_detection": 10.0,
+    "recipe_details": 30.0,
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def get_timeout(endpoint: str) -> float:
+    """Deadline for a single provider call made on behalf of `endpoint`."""
+    default = DEFAULT_TIMEOUTS.get(endpoint, _env_float("LLM_TIMEOUT", 30.0))
+    return _env_float(f"LLM_TIMEOUT_{endpoint.upper()}", default)
+
+
+def get_provider_config() -> dict:
+    """
+    Resolve the active provider from the environment.
+
+    - LLM_PROVIDER: one of PROVIDERS (default: openrouter)
+    - LLM_BASE_URL: override the provider's base URL
+    - LLM_MODEL: override the provider's default model
+    Call after .env has been loaded.
+    """
+    name = os.getenv("LLM_PROVIDER", "openrouter").lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM_PROVIDER '{name}'. Expected one of: {', '.join(PROVIDERS)}")
+    provider = PROVIDERS[name]
+    api_key_env = provider["api_key_env"]
+    return {
+        "name": name,
+        "base_url": os.getenv("LLM_BASE_URL", provider["base_url"]),
+        "model": os.getenv("LLM_MODEL", provider["model"]),
+        "api_key_env": api_key_env,
+        # The local stand-in ignores the key, but the SDK insists on one
+        "api_key": os.getenv(api_key_env) if api_key_env else "local-stub",
+    }
+
+
+def create_llm_client(provider: dict) -> AsyncOpenAI:
+    """
+    Build the AsyncOpenAI client for `provider` backed by a shared httpx connection pool.
+
+    Pool settings are read from the environment:
+    - LLM_MAX_CONNECTIONS: max concurrent connections to the provider
+    - LLM_MAX_KEEPALIVE_CONNECTIONS: idle connections kept open for reuse
+    - LLM_KEEPALIVE_EXPIRY: seconds an idle connection stays in the pool
+    - LLM_CONNECT_TIMEOUT / LLM_TIMEOUT: default connect and total timeouts
+    - LLM_MAX_RETRIES: SDK-level retries (default 0; resilience.py owns retries)
+    """
+    limits = httpx.Limits(
+        max_connections=_env_int("LLM_MAX_CONNECTIONS", 100),
+        max_keepalive_connections=_env_int("LLM_MAX_KEEPALIVE_CONNECTIONS", 20),
+        keepalive_expiry=_env_float("LLM_KEEPALIVE_EXPIRY", 30.0),
+    )
+    timeout = httpx.Timeout(
+        _env_float("LLM_TIMEOUT", 30.0),
+        connect=_env_float("LLM_CONNECT_TIMEOUT", 5.0),
+    )
+    http_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    return AsyncOpenAI(
+        base_url=provider["base_url"],
+        api_key=provider["api_key"],
+        http_client=http_client,
+        timeout=timeout,
+        max_retries=_env_int("LLM_MAX_RETRIES", 0),
+    )
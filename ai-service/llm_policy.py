@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, Optional
+
+from llm_client import get_timeout
+from temperature_config import MAX_TOKENS, TEMPERATURE_CONFIG
+
+# Per-endpoint LLM call policy: model, output-token cap, temperature and deadline.
+#
+# Built-in defaults come from temperature_config.py and the per-endpoint timeouts
+# in llm_client.py. An optional JSON file (LLM_POLICY_PATH) layers on top and is
+# re-read whenever it changes, so policies can be tuned without a restart:
+#
+#     {
+#         "defaults": {"model": "openai/gpt-4o-mini"},
+#         "endpoints": {
+#             "intent_detection": {"model": "openai/gpt-4.1-nano", "max_tokens": 120, "timeout": 5},
+#             "recipe_details": {"temperature": 0.7}
+#         }
+#     }
+#
+# LLM_MODEL_<ENDPOINT> in the environment overrides the model for one endpoint.
+
+POLICY_FIELDS = ("model", "max_tokens", "temperature", "timeout")
+
+
+def validate_policy(endpoint: str, policy: Dict[str, Any]) -> Dict[str, Any]:
+    """Check one policy block from the config file; raises ValueError on bad values."""
+    unknown = set(policy) - set(POLICY_FIELDS)
+    if unknown:
+        raise ValueError(f"{endpoint}: unknown policy fields {sorted(unknown)}")
+    if "model" in policy and not (isinstance(policy["model"], str) and policy["model"]):
+        raise ValueError(f"{endpoint}: model must be a non-empty string")
+    if policy.get("max_tokens") is not None and (not isinstance(policy["max_tokens"], int) or policy["max_tokens"] <= 0):
+        raise ValueError(f"{endpoint}: max_tokens must be a positive integer or null")
+    if "temperature" in policy and not (isinstance(policy["temperature"], (int, float)) and 0 <= policy["temperature"] <= 2):
+        raise ValueError(f"{endpoint}: temperature must be between 0 and 2")
+    if "timeout" in policy and not (isinstance(policy["timeout"], (int, float)) and policy["timeout"] > 0):
+        raise ValueError(f"{endpoint}: timeout must be a positive number of seconds")
+    return dict(policy)
+
+
+class LLMPolicy:
+    def __init__(self, default_model: str, path: Optional[str] = None, reload_interval: float = 2.0):
+        self.default_model = default_model
+        self.path = path
+        self.reload_interval = reload_interval
+        self._file_defaults: Dict[str, Any] = {}
+        self._file_endpoints: Dict[str, Dict[str, Any]] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._maybe_reload(force=True)
+
+    def _maybe_reload(self, force: bool = False) -> None:
+        if not self.path:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                # File removed (or never created): fall back to built-in defaults
+                if self._mtime is not None:
+                    self._file_defaults, self._file_endpoints, self._mtime = {}, {}, None
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+                defaults = validate_policy("defaults", data.get("defaults", {}))
+                endpoints = {name: validate_policy(name, block) for name, block in data.get("endpoints", {}).items()}
+            except (OSError, ValueError, AttributeError) as e:
+                # Keep serving the last good policy
+                self.last_error = str(e)
+                self._mtime = mtime
+                print(f"Error loading LLM policy from {self.path}: {e}")
+                return
+            self._file_defaults, self._file_endpoints, self._mtime = defaults, endpoints, mtime
+            self.last_error = None
+            self.reloads += 1
+
+    def get(self, endpoint: str) -> Dict[str, Any]:
+        """Effective {model, max_tokens, temperature, timeout} for `endpoint`."""
+        self._maybe_reload()
+        policy = {
+            "model": self.default_model,
+            "max_tokens": MAX_TOKENS.get(endpoint),
+            "temperature": TEMPERATURE_CONFIG.get(endpoint),
+            "timeout": get_timeout(endpoint),
+        }
+        policy.update(self._file_defaults)
+        policy.update(self._file_endpoints.get(endpoint, {}))
+        policy["model"] = os.getenv(f"LLM_MODEL_{endpoint.upper()}", policy["model"])
+        return policy
+
+    def request_params(self, endpoint: str) -> Dict[str, Any]:
+        """Keyword arguments for chat.completions.create, omitting unset fields."""
+        policy = self.get(endpoint)
+        params = {"model": policy["model"], "timeout": policy["timeout"]}
+        if policy["max_tokens"] is not None:
+            params["max_tokens"] = policy["max_tokens"]
+        if policy["temperature"] is not None:
+            params["temperature"] = policy["temperature"]
+        return params
+
+    def snapshot(self) -> Dict[str, Any]:
+        endpoints = sorted(set(TEMPERATURE_CONFIG) | set(MAX_TOKENS) | set(self._file_endpoints))
+        return {
+            "path": self.path,
+            "loaded": self._mtime is not None,
+            "reloads": self.reloads,
+            "lastError": self.last_error,
+            "endpoints": {name: self.get(name) for name in endpoints},
+        }
+
+
+def create_llm_policy(default_model: str) -> LLMPolicy:
+    """Build the policy from LLM_POLICY_PATH / LLM_POLICY_RELOAD_INTERVAL."""
+    return LLMPolicy(
+        default_model=default_model,
+        path=os.getenv("LLM_POLICY_PATH", "./llm_policy.json"),
+        reload_interval=float(os.getenv("LLM_POLICY_RELOAD_INTERVAL", "2")),
+    )
@@ -1,11 +1,26 @@
 import os
 import json
-from typing import List, Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, Depends
+import time
+import asyncio
+import threading
+import gzip
+import hashlib
+from typing import List, Dict, Any, Literal, Optional
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv, find_dotenv
-from openai import OpenAI
+from fastapi.concurrency import run_in_threadpool
+from llm_client import create_llm_client, get_provider_config
+from llm_policy import create_llm_policy
+from llm_cache import create_llm_cache, normalize_text
+from singleflight import SingleFlight
+from resilience import CircuitOpenError, create_resilient_caller
+from streaming import JSONStringFieldStreamer, sse_event
+import metrics
+from metrics import FALLBACKS, LLM_CALLS, LLM_COST, LLM_PHASE_SECONDS, LLM_TOKENS, REQUEST_SECONDS, Timer
+from temperature_config import calculate_request_cost
 
 # Load .env from current or parent dirs (so ShopSmart/.env works too)
 env_path = find_dotenv(filename=".env", usecwd=True)
@@ -20,14 +35,158 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the frontend read pagination and caching headers on /products
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
-OPENAI_API_KEY = os.getenv("OPEN_AI_API_KEY")
-if not OPENAI_API_KEY:
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    metrics.request_started_at.set([started])
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        route=route.path if route is not None else "unmatched",
+        method=request.method,
+        status=response.status_code,
+    )
+    return response
+
+# LLM_PROVIDER selects openrouter (default), openai, or the local stand-in (stub_llm_server.py)
+provider = get_provider_config()
+if not provider["api_key"]:
     # Fallback for development if env var is missing, though it should be there
-    print("Warning: OPEN_AI_API_KEY not found in environment variables.")
+    print(f"Warning: {provider['api_key_env']} not found in environment variables.")
+
+DEFAULT_MODEL = provider["model"]
+client = create_llm_client(provider)
+llm_cache = create_llm_cache()
+# Identical concurrent requests share one provider call
+inflight = SingleFlight()
+# Deadlines, retries, circuit breaking and hedging around every provider call
+resilience = create_resilient_caller(provider["name"])
+# Per-endpoint model, max_tokens, temperature and deadline; hot-reloaded from LLM_POLICY_PATH
+llm_policy = create_llm_policy(DEFAULT_MODEL)
+
+# Bump an endpoint's version whenever its prompt changes so stale cached answers are not reused
+PROMPT_VERSIONS = {
+    "ai_search": "v1",
+    "recommendations": "v2",
+    "intent_detection": "v1",
+    "recipe_details": "v1",
+}
+
+def cache_key(endpoint: str, payload: Any) -> str:
+    return llm_cache.make_key(endpoint, payload, llm_policy.get(endpoint)["model"], PROMPT_VERSIONS[endpoint])
+
+def fallback_reason(error: Exception) -> str:
+    return "circuit_open" if isinstance(error, CircuitOpenError) else "error"
+
+async def create_completion(endpoint: str, messages: List[Dict[str, str]], hedge: Optional[bool] = None, **params) -> Any:
+    """Single entry point for provider calls: endpoint policy, resilience, and latency/token/cost instrumentation."""
+    # Per-call params (e.g. a raised max_tokens on a truncation retry) override the endpoint policy
+    request = {**llm_policy.request_params(endpoint), **params}
+    model = request["model"]
+    started = metrics.request_started_at.get()
+    if started:
+        # Time from request arrival to the first provider call of this request: parsing,
+        # cache lookups, retrieval and message building
+        LLM_PHASE_SECONDS.observe(time.perf_counter() - started.pop(), endpoint=endpoint, phase="pre_call")
+
+    try:
+        with Timer(LLM_PHASE_SECONDS, endpoint=endpoint, phase="provider_wait"):
+            resp = await resilience.call(
+                endpoint,
+                lambda: client.chat.completions.create(messages=messages, **request),
+                hedge=hedge,
+                timeout=request["timeout"],
+            )
+    except Exception as e:
+        LLM_CALLS.inc(endpoint=endpoint, model=model, outcome=fallback_reason(e))
+        raise
+    LLM_CALLS.inc(endpoint=endpoint, model=model, outcome="ok")
+
+    usage = getattr(resp, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, endpoint=endpoint, model=model, kind="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, endpoint=endpoint, model=model, kind="completion")
+        LLM_COST.inc(calculate_request_cost(usage.prompt_tokens or 0, usage.completion_tokens or 0, model), endpoint=endpoint)
+    return resp
+
+def parse_json(endpoint: str, content: Optional[str]) -> Any:
+    with Timer(LLM_PHASE_SECONDS, endpoint=endpoint, phase="parse"):
+        return json.loads(content or "{}")
+
+# A JSON answer cut off at max_tokens is unparseable, so a truncated call is retried once with a raised cap
+JSON_RETRY_TOKEN_FACTOR = int(os.getenv("JSON_RETRY_TOKEN_FACTOR", "4"))
+JSON_MAX_TOKENS_CEILING = int(os.getenv("JSON_MAX_TOKENS_CEILING", "4096"))
+
+def json_retry_max_tokens(endpoint: str) -> Optional[int]:
+    cap = llm_policy.get(endpoint)["max_tokens"]
+    return min(cap * JSON_RETRY_TOKEN_FACTOR, JSON_MAX_TOKENS_CEILING) if cap else None
+
+async def create_json_completion(endpoint: str, messages: List[Dict[str, str]], **params) -> Any:
+    """JSON-mode completion; a response truncated by max_tokens (finish_reason "length") is retried with a raised cap."""
+    resp = await create_completion(endpoint, messages, response_format={"type": "json_object"}, **params)
+    if getattr(resp.choices[0], "finish_reason", None) != "length":
+        return resp
+    retry_cap = json_retry_max_tokens(endpoint)
+    if not retry_cap or retry_cap <= params.get("max_tokens", llm_policy.get(endpoint)["max_tokens"]):
+        return resp
+    LLM_CALLS.inc(endpoint=endpoint, model=llm_policy.get(endpoint)["model"], outcome="truncated")
+    print(f"{endpoint}: JSON response truncated at max_tokens, retrying with max_tokens={retry_cap}")
+    return await create_completion(endpoint, messages, response_format={"type": "json_object"}, **{**params, "max_tokens": retry_cap})
+
+async def complete_json(endpoint: str, messages: List[Dict[str, str]], key: Optional[str] = None) -> Any:
+    """Run a JSON-mode completion and parse it. Concurrent calls with the same `key` share one provider call."""
+    async def call():
+        resp = await create_json_completion(endpoint, messages)
+        return parse_json(endpoint, resp.choices[0].message.content)
+
+    if key is None:
+        return await call()
+    return await inflight.do(endpoint, key, call)
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await client.close()
+
+@app.get("/metrics")
+def get_metrics():
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/llm/stats")
+def llm_stats():
+    return resilience.stats()
+
+@app.get("/llm/policy")
+def get_llm_policy():
+    return llm_policy.snapshot()
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {**llm_cache.stats(), "coalescing": inflight.stats()}
 
-client = OpenAI(base_url="https://openrouter.ai/api/v1", api_key=OPENAI_API_KEY)
+def collect_llm_metrics():
+    """Scrape-time samples from the cache, coalescing and breaker stats."""
+    samples = []
+    for endpoint, counters in llm_cache.stats()["endpoints"].items():
+        for tier in ("memory", "disk"):
+            samples.append(("ai_service_cache_hits_total", "counter", "LLM cache hits by endpoint and tier.",
+                            {"endpoint": endpoint, "tier": tier}, counters[f"{tier}_hits"]))
+        samples.append(("ai_service_cache_misses_total", "counter", "LLM cache misses by endpoint.",
+                        {"endpoint": endpoint}, counters["misses"]))
+    for endpoint, counters in inflight.stats()["endpoints"].items():
+        samples.append(("ai_service_coalesced_requests_total", "counter",
+                        "Requests that joined an in-flight identical provider call.",
+                        {"endpoint": endpoint}, counters["coalesced"]))
+    for name, breaker in resilience.breakers.items():
+        samples.append(("ai_service_circuit_open", "gauge", "1 while the provider circuit is open or half-open.",
+                        {"provider": name}, 0 if breaker.state == "closed" else 1))
+    return samples
+
+metrics.registry.add_collector(collect_llm_metrics)
 
 # --- Product QA ---
 
@@ -42,25 +201,23 @@ class ProductQAResponse(BaseModel):
     followUpQuestions: List[str] | None = None
     suggestedProduct: Optional[str] = None
 
-@app.post("/product-qa", response_model=ProductQAResponse)
-async def product_qa(request: ProductQARequest):
-    try:
-        # Format history for the prompt
-        history_text = ""
-        if request.history:
-            history_text = "\nPrevious Conversation:\n" + "\n".join(
-                [f"{msg['role'].capitalize()}: {msg['content']}" for msg in request.history]
-            )
+def build_product_qa_messages(request: ProductQARequest) -> List[Dict[str, str]]:
+    # Format history for the prompt
+    history_text = ""
+    if request.history:
+        history_text = "\nPrevious Conversation:\n" + "\n".join(
+            [f"{msg['role'].capitalize()}: {msg['content']}" for msg in request.history]
+        )
 
-        # Extract product details safely
-        p_name = request.product.get('name', 'Unknown Product')
-        p_desc = request.product.get('description', '')
-        p_price = request.product.get('price', 0)
-        p_cat = request.product.get('category', 'General')
-        p_long_desc = request.product.get('longDescription', '')
-        p_sentiment = json.dumps(request.product.get('sentiment', {}))
+    # Extract product details safely
+    p_name = request.product.get('name', 'Unknown Product')
+    p_desc = request.product.get('description', '')
+    p_price = request.product.get('price', 0)
+    p_cat = request.product.get('category', 'General')
+    p_long_desc = request.product.get('longDescription', '')
+    p_sentiment = json.dumps(request.product.get('sentiment', {}))
 
-        prompt = f"""You are a helpful shopping assistant for WalSmart.
+    prompt = f"""You are a helpful shopping assistant for WalSmart.
 Product: {p_name}
 Description: {p_desc}
 Price: ${p_price}
@@ -88,6 +245,7 @@ CRITICAL: IRRELEVANT QUESTIONS
 - If the question IS relevant, return JSON with:
   - "answer": Your helpful answer.
   - "suggestedProduct": null
+- Always put the "answer" key first.
 
 Example Irrelevant JSON:
 {{
@@ -96,95 +254,306 @@ Example Irrelevant JSON:
 }}
 """
 
-        messages = [
-            {"role": "system", "content": "You are a helpful AI shopping assistant. You MUST return JSON."},
-            {"role": "user", "content": prompt},
-        ]
-        
-        resp = client.chat.completions.create(
-            model="openai/gpt-4o-mini",
-            response_format={"type": "json_object"},
-            messages=messages,
-        )
-        content = resp.choices[0].message.content or "{}"
-        result = json.loads(content)
+    return [
+        {"role": "system", "content": "You are a helpful AI shopping assistant. You MUST return JSON."},
+        {"role": "user", "content": prompt},
+    ]
+
+# Follow-ups are generated speculatively alongside the answer; this caps how long
+# the response waits for them once the answer itself is ready.
+FOLLOW_UP_DEADLINE = float(os.getenv("QA_FOLLOW_UP_DEADLINE", "1.5"))
+
+async def generate_follow_up_questions(request: ProductQARequest) -> List[str]:
+    """Generate 2-3 follow-up questions from the product and question alone, so it can run in parallel with the answer."""
+    p_name = request.product.get('name', 'Unknown Product')
+    p_desc = request.product.get('description', '')
+    p_cat = request.product.get('category', 'General')
+    fu_messages = [
+        {"role": "system", "content": "Generate 2-3 concise follow-up questions a shopper might ask next about THIS product after asking the question provided."},
+        {"role": "user", "content": (
+            f"Product: {p_name}\nDescription: {p_desc}\nCategory: {p_cat}\nQuestion: {request.query}\n"
+            "Return ONLY a JSON object with key 'questions' as an array of strings."
+        )},
+    ]
+    try:
+        fu_resp = await create_json_completion("follow_up_questions", fu_messages)
+        followups = parse_json("follow_up_questions", fu_resp.choices[0].message.content)
+        if isinstance(followups, dict):
+            followups = followups.get("questions") or []
+        if not isinstance(followups, list):
+            followups = []
+        followups = [str(q) for q in followups][:3]
+    except Exception as e:
+        FALLBACKS.inc(endpoint="follow_up_questions", reason=fallback_reason(e))
+        followups = []
+    return followups
+
+async def collect_follow_up_questions(task: asyncio.Task, suggested_product: Optional[str]) -> List[str]:
+    """Resolve the speculative follow-up task: discard it for irrelevant questions, otherwise wait up to the deadline."""
+    if suggested_product:
+        task.cancel()
+        return []
+    try:
+        return await asyncio.wait_for(task, timeout=FOLLOW_UP_DEADLINE)
+    except asyncio.TimeoutError:
+        return []
+
+@app.post("/product-qa", response_model=ProductQAResponse)
+async def product_qa(request: ProductQARequest):
+    followup_task = asyncio.create_task(generate_follow_up_questions(request))
+    try:
+        messages = build_product_qa_messages(request)
+
+        resp = await create_json_completion("product_qa", messages)
+        result = parse_json("product_qa", resp.choices[0].message.content)
         
         answer = result.get("answer", "I'm sorry, I couldn't process that.")
         suggested_product = result.get("suggestedProduct")
 
-        # Generate contextual follow-up questions (2-3) ONLY if relevant
-        followups = []
-        if not suggested_product:
-            fu_messages = [
-                {"role": "system", "content": "Generate 2-3 concise follow-up questions a shopper might ask next about THIS product based on the answer provided."},
-                {"role": "user", "content": (
-                    f"Product: {p_name}\nQuestion: {request.query}\nAnswer: {answer}\n"
-                    "Return ONLY a JSON array of strings."
-                )},
-            ]
-            try:
-                fu_resp = client.chat.completions.create(
-                    model="openai/gpt-4o-mini",
-                    response_format={"type": "json_array"},
-                    messages=fu_messages,
-                )
-                followups = json.loads(fu_resp.choices[0].message.content or "[]")
-                if not isinstance(followups, list):
-                    followups = []
-            except Exception:
-                followups = []
+        # Follow-up questions (2-3) are only returned for relevant questions
+        followups = await collect_follow_up_questions(followup_task, suggested_product)
 
         return ProductQAResponse(answer=answer, confidence=0.9, followUpQuestions=followups, suggestedProduct=suggested_product)
     except Exception as e:
         print(f"Error in product_qa: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        followup_task.cancel()
+
+@app.post("/product-qa/stream")
+async def product_qa_stream(request: ProductQARequest):
+    """
+    Streaming variant of /product-qa (Server-Sent Events).
+
+    Events, in order:
+    - token: {"text": ...} answer text as it is generated
+    - answer: {"answer": ..., "confidence": ...} the complete answer
+    - suggestedProduct: {"suggestedProduct": ...}
+    - followUpQuestions: {"followUpQuestions": [...]}
+    - done: {}
+    An `error` event replaces the remaining events if the provider call fails.
+    """
+    messages = build_product_qa_messages(request)
+
+    async def events():
+        followup_task = asyncio.create_task(generate_follow_up_questions(request))
+        try:
+            # Streamed tokens can't be retried after a truncation, so the stream runs with the raised JSON cap
+            retry_cap = json_retry_max_tokens("product_qa")
+            stream = await create_completion(
+                "product_qa", messages, hedge=False, response_format={"type": "json_object"}, stream=True,
+                **({"max_tokens": retry_cap} if retry_cap else {}),
+            )
+            streamer = JSONStringFieldStreamer("answer")
+            content_parts = []
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if not delta:
+                    continue
+                content_parts.append(delta)
+                text = streamer.feed(delta)
+                if text:
+                    yield sse_event("token", {"text": text})
+
+            result = parse_json("product_qa", "".join(content_parts))
+            answer = result.get("answer", "I'm sorry, I couldn't process that.")
+            suggested_product = result.get("suggestedProduct")
+            yield sse_event("answer", {"answer": answer, "confidence": 0.9})
+            yield sse_event("suggestedProduct", {"suggestedProduct": suggested_product})
+
+            followups = await collect_follow_up_questions(followup_task, suggested_product)
+            yield sse_event("followUpQuestions", {"followUpQuestions": followups})
+            yield sse_event("done", {})
+        except Exception as e:
+            print(f"Error in product_qa_stream: {e}")
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            followup_task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Disable proxy buffering (nginx/ngrok) so tokens are flushed immediately
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # --- Review Analysis ---
 
+# Reviews are scored locally and merged into per-product running totals (sentiment.py).
+# A product's existing percentages count as this many reviews when its totals are first created.
+SENTIMENT_PRIOR_WEIGHT = float(os.getenv("SENTIMENT_PRIOR_WEIGHT", "20"))
+
 class AnalyzeReviewRequest(BaseModel):
     reviewText: str
-    currentSentiment: Dict[str, Any]
+    productId: Optional[str] = None
+    # Only used when productId is not given (or unknown)
+    currentSentiment: Dict[str, Any] = {}
 
 class AnalyzeReviewResponse(BaseModel):
     positive: int
     negative: int
     aspects: Dict[str, int]
+    reviewCount: Optional[int] = None
+
+def record_product_reviews(product_id: str, review_texts: List[str]):
+    """Score reviews for one product and fold them into its aggregates in one transaction."""
+    db = SessionLocal()
+    try:
+        product = db.get(models.Product, product_id)
+        if product is None:
+            return None, None
+        scores = [score_review(text) for text in review_texts]
+        sentiment = record_reviews(db, product, scores, SENTIMENT_PRIOR_WEIGHT)
+        db.commit()
+        return scores, sentiment
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
 
 @app.post("/analyze-review", response_model=AnalyzeReviewResponse)
 async def analyze_review(request: AnalyzeReviewRequest):
     try:
-        prompt = f"""Analyze this new user review and update the product's sentiment scores.
-Current Sentiment: {json.dumps(request.currentSentiment)}
-New Review: "{request.reviewText}"
-
-Return the UPDATED sentiment scores based on this new review.
-- Adjust 'positive' and 'negative' percentages (must sum to 100).
-- Update relevant aspect scores (0-100) if mentioned in the review.
-- Return ONLY a JSON object with keys: 'positive', 'negative', 'aspects'.
-"""
-        messages = [
-            {"role": "system", "content": "You are a sentiment analysis AI."},
-            {"role": "user", "content": prompt},
-        ]
-
-        resp = client.chat.completions.create(
-            model="openai/gpt-4o-mini",
-            response_format={"type": "json_object"},
-            messages=messages,
-        )
-        
-        content = resp.choices[0].message.content or "{}"
-        result = json.loads(content)
-        
-        return AnalyzeReviewResponse(
-            positive=result.get('positive', 50),
-            negative=result.get('negative', 50),
-            aspects=result.get('aspects', {})
-        )
+        if request.productId:
+            _, sentiment = await run_in_threadpool(record_product_reviews, request.productId, [request.reviewText])
+            if sentiment is not None:
+                return AnalyzeReviewResponse(**sentiment)
+        sentiment = merge_into(request.currentSentiment, score_review(request.reviewText), SENTIMENT_PRIOR_WEIGHT)
+        return AnalyzeReviewResponse(**sentiment)
     except Exception as e:
         print(f"Error in analyze_review: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Products scored concurrently by one batch request, and the largest batch accepted
+REVIEW_BATCH_CONCURRENCY = int(os.getenv("REVIEW_BATCH_CONCURRENCY", "4"))
+REVIEW_BATCH_MAX = int(os.getenv("REVIEW_BATCH_MAX", "10000"))
+
+class BatchReview(BaseModel):
+    productId: str
+    reviewText: str
+
+class AnalyzeReviewsBatchRequest(BaseModel):
+    reviews: List[BatchReview]
+
+@app.post("/analyze-reviews/batch")
+async def analyze_reviews_batch(request: AnalyzeReviewsBatchRequest):
+    """
+    Score many reviews and fold them into product aggregates, one transaction per product.
+
+    Streams NDJSON: a "review" line per review (with its index in the request), a
+    "product" line with each product's updated sentiment, "error" lines for
+    products that could not be updated, and a final "done" line.
+    """
+    if len(request.reviews) > REVIEW_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {REVIEW_BATCH_MAX} reviews per batch")
+
+    by_product: Dict[str, List[int]] = {}
+    for index, review in enumerate(request.reviews):
+        by_product.setdefault(review.productId, []).append(index)
+
+    semaphore = asyncio.Semaphore(REVIEW_BATCH_CONCURRENCY)
+
+    async def process(product_id: str, indexes: List[int]):
+        async with semaphore:
+            texts = [request.reviews[i].reviewText for i in indexes]
+            try:
+                scores, sentiment = await run_in_threadpool(record_product_reviews, product_id, texts)
+            except Exception as e:
+                print(f"Error in analyze_reviews_batch for product {product_id}: {e}")
+                return product_id, indexes, None, None, str(e)
+            if scores is None:
+                return product_id, indexes, None, None, "Product not found"
+            return product_id, indexes, scores, sentiment, None
+
+    async def lines():
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(process(pid, idx)) for pid, idx in by_product.items()]
+        scored = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                product_id, indexes, scores, sentiment, error = await next_done
+                if error is not None:
+                    yield json.dumps({"type": "error", "productId": product_id, "indexes": indexes, "detail": error}) + "\n"
+                    continue
+                chunk = []
+                for index, score in zip(indexes, scores):
+                    positive = int(round(100 * score["positive"]))
+                    chunk.append(json.dumps({
+                        "type": "review",
+                        "index": index,
+                        "productId": product_id,
+                        "positive": positive,
+                        "negative": 100 - positive,
+                        "aspects": score["aspects"],
+                    }))
+                chunk.append(json.dumps({"type": "product", "productId": product_id, "sentiment": sentiment}))
+                scored += len(indexes)
+                yield "\n".join(chunk) + "\n"
+            yield json.dumps({
+                "type": "done",
+                "reviews": scored,
+                "products": len(by_product),
+                "seconds": round(time.perf_counter() - started, 3),
+            }) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+# --- Product name resolution ---
+
+# LLM endpoints answer with free-text product names; these resolve them to
+# catalog ids server-side so clients don't match names against the catalog.
+NAME_MATCH_MIN_SCORE = float(os.getenv("NAME_MATCH_MIN_SCORE", "0.6"))
+
+def current_catalog():
+    """The catalog snapshot, for handlers that don't otherwise need a DB session."""
+    db = SessionLocal()
+    try:
+        return catalog_cache.get(db)
+    finally:
+        db.close()
+
+def resolve_product_ids(names: List[str], ingredients: bool = False) -> List[Optional[str]]:
+    """
+    Catalog id per name, or None. With `ingredients`, names that aren't product
+    names ("2 cups rice") fall back to the recipe ingredient index.
+    """
+    snapshot = current_catalog()
+    ids = []
+    for name in names:
+        match = snapshot.resolver.resolve(name, NAME_MATCH_MIN_SCORE)
+        product_id = match[0] if match else None
+        if product_id is None and ingredients:
+            product_id = snapshot.ingredients.resolve(parse_ingredient_line(name)["ingredient"])
+        ids.append(product_id)
+    return ids
+
+async def with_product_ids(result, names_field: str, ingredients: bool = False):
+    result.productIds = await run_in_threadpool(resolve_product_ids, getattr(result, names_field), ingredients)
+    return result
+
+class ResolveNamesRequest(BaseModel):
+    names: List[str]
+    k: int = 1
+
+@app.post("/resolve-names")
+def resolve_names(req: ResolveNamesRequest):
+    """Ranked catalog matches for each name, with scores in [0, 1]."""
+    snapshot = current_catalog()
+    k = max(1, min(req.k, 20))
+    return {"results": [
+        {"name": name, "matches": [
+            {"productId": product_id, "name": snapshot.by_id[product_id]["name"], "score": round(score, 4)}
+            for product_id, score in snapshot.resolver.match(name, k)
+        ]}
+        for name in req.names[:100]
+    ]}
+
 # --- AI Search ---
 
 class AISearchRequest(BaseModel):
@@ -192,9 +561,15 @@ class AISearchRequest(BaseModel):
 
 class AISearchResponse(BaseModel):
     productNames: list[str]
+    # productIds[i] is the catalog product productNames[i] resolved to, or None
+    productIds: list[Optional[str]] = []
 
 @app.post("/ai-search", response_model=AISearchResponse)
-def ai_search(req: AISearchRequest):
+async def ai_search(req: AISearchRequest):
+    key = cache_key("ai_search", normalize_text(req.query))
+    cached = await llm_cache.aget("ai_search", key)
+    if cached is not None:
+        return await with_product_ids(AISearchResponse(**cached), "productNames")
     try:
         messages = [
             {"role": "system", "content": (
@@ -203,73 +578,489 @@ def ai_search(req: AISearchRequest):
             )},
             {"role": "user", "content": req.query},
         ]
-        resp = client.chat.completions.create(
-            model="openai/gpt-4o-mini",
-            response_format={"type": "json_object"},
-            messages=messages,
-        )
-        content = resp.choices[0].message.content or "{}"
-        obj = json.loads(content)
+        obj = await complete_json("ai_search", messages, key=key)
         names = obj.get("productNames") or obj.get("products") or []
         if not isinstance(names, list):
             names = []
         names = [str(x)[:100] for x in names][:6]
-        return AISearchResponse(productNames=names)
+        result = AISearchResponse(productNames=names)
+        # Cache the names only; ids are resolved against the current catalog
+        await llm_cache.aset("ai_search", key, result.model_dump(exclude={"productIds"}))
+        return await with_product_ids(result, "productNames")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- Recommendations ---
 
+# Recommendations come from the catalog's precomputed neighbor table; the LLM is
+# only used, when asked, to re-rank those candidates.
+RECOMMEND_LLM_RERANK = os.getenv("RECOMMEND_LLM_RERANK", "false").lower() == "true"
+RECOMMEND_RERANK_CANDIDATES = int(os.getenv("RECOMMEND_RERANK_CANDIDATES", "15"))
+
 class RecommendRequest(BaseModel):
     cart: list[dict]
+    limit: int = 5
+    # Re-rank the candidates with the LLM; defaults to RECOMMEND_LLM_RERANK
+    rerank: Optional[bool] = None
 
 class RecommendResponse(BaseModel):
     productNames: list[str]
+    # productIds[i] is the catalog product productNames[i] refers to
+    productIds: list[Optional[str]] = []
+    # "content" (neighbor table) or "llm" (neighbor candidates re-ranked by the LLM)
+    source: str = "content"
 
-@app.post("/recommend", response_model=RecommendResponse)
-def recommend(req: RecommendRequest):
-    try:
-        cart_desc = ", ".join(
-            [f"{(i.get('name') or i.get('productName') or 'item')} ({i.get('category','')})" for i in req.cart]
-        ) or "no items"
+def recommend_candidates(cart: List[dict], k: int):
+    snapshot = current_catalog()
+    cart_ids = []
+    for item in cart:
+        product_id = str(item.get("id") or item.get("productId") or "")
+        if product_id not in snapshot.by_id:
+            # Clients that only know the name
+            match = snapshot.resolver.resolve(item.get("name") or item.get("productName") or "", NAME_MATCH_MIN_SCORE)
+            product_id = match[0] if match else None
+        if product_id:
+            cart_ids.append(product_id)
+    candidates = [snapshot.by_id[product_id] for product_id, _ in snapshot.recommender.recommend(cart_ids, k)]
+    return [snapshot.by_id[product_id] for product_id in cart_ids], candidates
+
+async def rerank_recommendations(cart: List[dict], candidates: List[dict], limit: int) -> List[dict]:
+    cart_desc = ", ".join(f"{p['name']} ({p.get('category') or ''})" for p in cart)
+    candidate_names = [p["name"] for p in candidates]
+    key = cache_key("recommendations", [sorted(normalize_text(p["id"]) for p in cart), candidate_names, limit])
+    cached = await llm_cache.aget("recommendations", key)
+    if cached is not None:
+        names = cached["productNames"]
+    else:
+        numbered = "\n".join(f"{i + 1}. {name}" for i, name in enumerate(candidate_names))
         prompt = (
-            "Suggest up to 5 complementary products (names or keywords) for the user's cart. "
-            "Return ONLY a JSON object {\n  'productNames': [strings]\n}. Keep names short.\n"
-            f"Cart: {cart_desc}"
+            f"Pick up to {limit} products from the candidate list that best complement the user's cart, best first. "
+            "Use the candidate names exactly as written. "
+            "Return ONLY a JSON object {\n  'productNames': [strings]\n}.\n"
+            f"Cart: {cart_desc}\nCandidates:\n{numbered}"
         )
         messages = [
             {"role": "system", "content": "You recommend relevant retail products succinctly."},
             {"role": "user", "content": prompt},
         ]
-        resp = client.chat.completions.create(
-            model="openai/gpt-4o-mini",
-            response_format={"type": "json_object"},
-            messages=messages,
-        )
-        content = resp.choices[0].message.content or "{}"
-        obj = json.loads(content)
+        obj = await complete_json("recommendations", messages, key=key)
         names = obj.get("productNames") or []
         if not isinstance(names, list):
             names = []
-        names = [str(x)[:100] for x in names][:5]
-        return RecommendResponse(productNames=names)
+        names = [str(x)[:100] for x in names]
+        await llm_cache.aset("recommendations", key, {"productNames": names})
+
+    # Keep only names that are among the candidates, in the LLM's order
+    by_name = {normalize_text(p["name"]): p for p in candidates}
+    ranked = []
+    for name in names:
+        product = by_name.get(normalize_text(name))
+        if product is not None and product not in ranked:
+            ranked.append(product)
+    return ranked[:limit]
+
+@app.post("/recommend", response_model=RecommendResponse)
+async def recommend(req: RecommendRequest):
+    limit = max(1, min(req.limit, 20))
+    rerank = RECOMMEND_LLM_RERANK if req.rerank is None else req.rerank
+    try:
+        k = max(limit, RECOMMEND_RERANK_CANDIDATES) if rerank else limit
+        # The first call after a catalog change builds the neighbor table
+        cart, candidates = await run_in_threadpool(recommend_candidates, req.cart, k)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    source = "content"
+    if rerank and cart and candidates:
+        try:
+            ranked = await rerank_recommendations(cart, candidates, limit)
+            if ranked:
+                candidates, source = ranked, "llm"
+        except Exception as e:
+            print(f"Error re-ranking recommendations: {e}")
+            FALLBACKS.inc(endpoint="recommendations", reason=fallback_reason(e))
+    candidates = candidates[:limit]
+    return RecommendResponse(
+        productNames=[p["name"] for p in candidates],
+        productIds=[p["id"] for p in candidates],
+        source=source,
+    )
+
 # --- Intent Detection ---
 
 from sqlalchemy.orm import Session
-from database import get_db, engine
+from database import get_db, engine, SessionLocal
 import models
+from catalog import catalog_cache
+from search import ensure_search_index, search_products
+from embeddings import create_embedding_index
+from cart_events import EventBufferFull, create_cart_event_log, create_cooccurrence_index
+from collaborative import CollaborativeModel
+from recipes import canonical_dish, create_recipe_store, parse_ingredient_line
+from sentiment import merge_into, record_reviews, score_review
+from intent_engine import IntentEngine, NaiveBayesIntentClassifier
 
 models.Base.metadata.create_all(bind=engine)
+# FTS5 (SQLite) or tsvector (Postgres) index for /search; None means use the in-memory index
+search_backend = ensure_search_index(engine)
 
-# ... (existing imports)
+try:
+    import brotli  # optional; gzip is used when it is not installed
+except ImportError:
+    brotli = None
+
+PRODUCT_FIELDS = [column.name for column in models.Product.__table__.columns]
+PRODUCTS_MAX_LIMIT = int(os.getenv("PRODUCTS_MAX_LIMIT", "200"))
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 512
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    offered = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return None
+
+def encode_body(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
 
 @app.get("/products")
-def get_products(db: Session = Depends(get_db)):
-    products = db.query(models.Product).all()
-    return products
+def get_products(
+    request: Request,
+    category: Optional[str] = None,
+    minPrice: Optional[float] = None,
+    maxPrice: Optional[float] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Catalog listing served from the in-process snapshot.
+
+    Without parameters this is the full catalog, as before. `category`, `minPrice`
+    and `maxPrice` filter; `fields=id,name,price` projects; `limit` pages in id
+    order and the next page is requested with `after=<X-Next-Cursor>`. Responses
+    carry a strong ETag (304 on If-None-Match) and are gzip/brotli compressed.
+    """
+    snapshot = catalog_cache.get(db)
+
+    projection = None
+    if fields:
+        projection = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in projection if f not in PRODUCT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if limit is not None and not 1 <= limit <= PRODUCTS_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {PRODUCTS_MAX_LIMIT}")
+
+    full_catalog = [category, minPrice, maxPrice, projection, limit, after] == [None] * 6
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if full_catalog:
+        body = snapshot.products_json
+    else:
+        items, next_cursor = snapshot.page(category, minPrice, maxPrice, after, limit)
+        if projection is not None:
+            items = [{f: item[f] for f in projection} for item in items]
+        body = json.dumps(items, separators=(",", ":")).encode("utf-8")
+        if next_cursor is not None:
+            headers["X-Next-Cursor"] = next_cursor
+
+    # Small bodies go out uncompressed, and then share the identity ETag
+    if len(body) < COMPRESS_MIN_BYTES:
+        encoding = None
+    else:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+
+    # The snapshot versions pin the content, so versions + query identify the body exactly
+    query_key = json.dumps([category, minPrice, maxPrice, projection, limit, after])
+    tag = hashlib.sha1(f"{snapshot.version}:{snapshot.sentiment_version}:{query_key}".encode("utf-8")).hexdigest()[:20]
+    etag = f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+    headers["ETag"] = etag
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        if full_catalog:
+            # The full catalog is compressed once per snapshot and encoding
+            if encoding not in snapshot.encoded:
+                snapshot.encoded[encoding] = encode_body(body, encoding)
+            body = snapshot.encoded[encoding]
+        else:
+            body = encode_body(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/catalog/stats")
+def catalog_stats():
+    return catalog_cache.stats()
+
+@app.get("/search")
+def search(
+    q: str,
+    category: Optional[str] = None,
+    minPrice: Optional[float] = None,
+    maxPrice: Optional[float] = None,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+):
+    """Full-text product search: prefix matching, BM25 ranking, category and price filters. No LLM."""
+    limit = max(1, min(limit, PRODUCTS_MAX_LIMIT))
+    snapshot = catalog_cache.get(db)
+    if search_backend is not None:
+        ranked = search_products(db, search_backend, q, category, minPrice, maxPrice, limit)
+    else:
+        def matches(product):
+            price = product["price"]
+            return (category is None or product["category"] == category) and \
+                (minPrice is None or (price is not None and price >= minPrice)) and \
+                (maxPrice is None or (price is not None and price <= maxPrice))
+        hits = snapshot.index.search(q, k=len(snapshot.products))
+        ranked = [(snapshot.products[doc_id]["id"], score) for doc_id, score in hits
+                  if matches(snapshot.products[doc_id])][:limit]
+
+    results = []
+    for product_id, score in ranked:
+        product = snapshot.by_id.get(product_id)
+        if product is None:
+            # Written after this worker's snapshot was taken
+            product = db.get(models.Product, product_id)
+            if product is None:
+                continue
+            product = {c: getattr(product, c) for c in PRODUCT_FIELDS}
+        results.append({**product, "score": round(score, 4)})
+    return {"query": q, "products": results}
+
+# Local embedding index (no network); synced to the catalog snapshot when its version changes
+semantic_index = create_embedding_index()
+# Hashed features collide a little; similarities below this are noise, not matches
+SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", "0.15"))
+_semantic_synced_version: Optional[int] = None
+_semantic_sync_lock = threading.Lock()
+
+
+def semantic_index_for(snapshot):
+    global _semantic_synced_version
+    if _semantic_synced_version != snapshot.version:
+        with _semantic_sync_lock:
+            if _semantic_synced_version != snapshot.version:
+                semantic_index.sync(snapshot.products)
+                _semantic_synced_version = snapshot.version
+    return semantic_index
+
+
+@app.get("/semantic-search")
+def semantic_search(
+    q: str,
+    category: Optional[str] = None,
+    minPrice: Optional[float] = None,
+    maxPrice: Optional[float] = None,
+    limit: int = 20,
+    exact: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Semantic product search over local embeddings: tolerant of typos and word variants. No LLM."""
+    limit = max(1, min(limit, PRODUCTS_MAX_LIMIT))
+    snapshot = catalog_cache.get(db)
+    index = semantic_index_for(snapshot)
+    filtered = category is not None or minPrice is not None or maxPrice is not None
+    # Over-fetch when filtering so enough hits survive the filters
+    hits = index.search(q, k=limit * 10 if filtered else limit, exact=exact)
+
+    results = []
+    for product_id, score in hits:
+        product = snapshot.by_id.get(product_id)
+        if product is None or score < SEMANTIC_MIN_SCORE:
+            continue
+        price = product["price"]
+        if (category is not None and product["category"] != category) or \
+           (minPrice is not None and (price is None or price < minPrice)) or \
+           (maxPrice is not None and (price is None or price > maxPrice)):
+            continue
+        results.append({**product, "score": round(score, 4)})
+        if len(results) == limit:
+            break
+    return {"query": q, "products": results}
+
+
+@app.get("/semantic-search/stats")
+def semantic_search_stats():
+    return {**semantic_index.stats(), "catalogVersion": _semantic_synced_version}
+
+# --- Cart events and frequently bought together ---
+
+# Events are buffered and written in batches; the co-occurrence index tails the table
+cart_event_log = create_cart_event_log()
+cooccurrence_index = create_cooccurrence_index()
+CART_EVENTS_MAX = int(os.getenv("CART_EVENTS_MAX", "1000"))
+# Pairs seen together in fewer baskets than this are not recommended
+COOCCURRENCE_MIN_COUNT = int(os.getenv("COOCCURRENCE_MIN_COUNT", "2"))
+
+
+class CartEventItem(BaseModel):
+    sessionId: str
+    type: Literal["add", "remove", "purchase"]
+    productId: str
+    quantity: int = 1
+    orderId: Optional[str] = None
+
+
+class CartEventsRequest(BaseModel):
+    events: List[CartEventItem]
+
+
+@app.post("/events/cart", status_code=202)
+async def record_cart_events(req: CartEventsRequest):
+    """Append cart events to the log. Accepted events are written within CART_EVENT_FLUSH_INTERVAL seconds."""
+    if len(req.events) > CART_EVENTS_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {CART_EVENTS_MAX} events per request")
+    try:
+        accepted = cart_event_log.append(
+            {
+                "session_id": e.sessionId,
+                "event_type": e.type,
+                "product_id": e.productId,
+                "quantity": e.quantity,
+                "order_id": e.orderId,
+            }
+            for e in req.events
+        )
+    except EventBufferFull as e:
+        raise HTTPException(status_code=503, detail=f"Event log is backed up: {e}")
+    cooccurrence_index.ensure_started()
+    return {"accepted": accepted}
+
+
+@app.get("/frequently-bought-together")
+def frequently_bought_together(productIds: str, limit: int = 5, db: Session = Depends(get_db)):
+    """Products most often in the same basket as `productIds` (comma-separated), from the in-memory index."""
+    cooccurrence_index.ensure_started()
+    ids = [p.strip() for p in productIds.split(",") if p.strip()]
+    limit = max(1, min(limit, PRODUCTS_MAX_LIMIT))
+    # Over-fetch a little: products deleted since they were bought are dropped below
+    hits = cooccurrence_index.together(ids, k=limit + 5, min_count=COOCCURRENCE_MIN_COUNT)
+    snapshot = catalog_cache.get(db)
+    results = []
+    for hit in hits:
+        product = snapshot.by_id.get(hit["productId"])
+        if product is None:
+            continue
+        results.append({**product, **{k: v for k, v in hit.items() if k != "productId"}})
+        if len(results) == limit:
+            break
+    return {"productIds": ids, "products": results}
+
+
+@app.get("/events/stats")
+def cart_event_stats():
+    return {"log": cart_event_log.stats(), "cooccurrence": cooccurrence_index.stats()}
+
+
+@app.on_event("shutdown")
+def stop_cart_events():
+    cart_event_log.stop()
+    cooccurrence_index.stop()
+
+# --- Collaborative filtering ---
+
+# Trained offline from the cart event log with `python train_collaborative.py`;
+# workers reload it when the files change
+COLLABORATIVE_MODEL_PATH = os.getenv("COLLABORATIVE_MODEL_PATH", "./collaborative_model")
+COLLABORATIVE_CHECK_INTERVAL = float(os.getenv("COLLABORATIVE_CHECK_INTERVAL", "30"))
+COLLABORATIVE_BATCH_MAX = int(os.getenv("COLLABORATIVE_BATCH_MAX", "1000"))
+_collaborative_model: Optional[CollaborativeModel] = None
+_collaborative_mtime: Optional[float] = None
+_collaborative_checked = 0.0
+_collaborative_lock = threading.Lock()
+
+
+def collaborative_model() -> Optional[CollaborativeModel]:
+    global _collaborative_model, _collaborative_mtime, _collaborative_checked
+    if time.monotonic() - _collaborative_checked < COLLABORATIVE_CHECK_INTERVAL:
+        return _collaborative_model
+    with _collaborative_lock:
+        _collaborative_checked = time.monotonic()
+        try:
+            mtime = os.path.getmtime(COLLABORATIVE_MODEL_PATH + ".meta.json")
+        except OSError:
+            mtime = None
+        if mtime != _collaborative_mtime:
+            try:
+                _collaborative_model = CollaborativeModel.load(COLLABORATIVE_MODEL_PATH) if mtime else None
+                _collaborative_mtime = mtime
+            except Exception as e:
+                print(f"Error loading collaborative model from {COLLABORATIVE_MODEL_PATH}: {e}")
+    return _collaborative_model
+
+
+def require_collaborative_model() -> CollaborativeModel:
+    model = collaborative_model()
+    if model is None:
+        raise HTTPException(status_code=503, detail="Collaborative model not trained; run train_collaborative.py")
+    return model
+
+
+def catalog_hits(snapshot, hits, limit: int) -> List[dict]:
+    # Implicit-feedback scores estimate preference in [0, 1]; <= 0 is no signal.
+    # Products deleted since the model was trained are skipped.
+    results = []
+    for product_id, score in hits:
+        product = snapshot.by_id.get(product_id)
+        if product is not None and score > 0:
+            results.append({**product, "score": round(score, 4)})
+            if len(results) == limit:
+                break
+    return results
+
+
+class CollaborativeRequest(BaseModel):
+    # A session the model was trained on; otherwise productIds are folded in as a new user
+    sessionId: Optional[str] = None
+    productIds: List[str] = []
+    limit: int = 10
+
+
+class CollaborativeBatchRequest(BaseModel):
+    sessionIds: List[str]
+    limit: int = 10
+
+
+@app.post("/recommend/collaborative")
+def recommend_collaborative(req: CollaborativeRequest, db: Session = Depends(get_db)):
+    """Collaborative-filtering recommendations; items the session already has, and productIds, are excluded."""
+    model = require_collaborative_model()
+    limit = max(1, min(req.limit, PRODUCTS_MAX_LIMIT))
+    # Over-fetch a little for products deleted since training
+    if req.sessionId is not None and req.sessionId in model.user_row:
+        hits, source = model.recommend(req.sessionId, limit + 5, exclude=req.productIds), "user"
+    else:
+        hits, source = model.recommend_for_items(req.productIds, limit + 5), "fold-in"
+    return {"products": catalog_hits(catalog_cache.get(db), hits, limit), "source": source}
+
+
+@app.post("/recommend/collaborative/batch")
+def recommend_collaborative_batch(req: CollaborativeBatchRequest, db: Session = Depends(get_db)):
+    """recommend_collaborative for many known sessions at once (e.g. for campaigns); unknown sessions get []."""
+    if len(req.sessionIds) > COLLABORATIVE_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {COLLABORATIVE_BATCH_MAX} sessions per batch")
+    model = require_collaborative_model()
+    limit = max(1, min(req.limit, PRODUCTS_MAX_LIMIT))
+    snapshot = catalog_cache.get(db)
+    results = model.recommend_many(req.sessionIds, limit + 5)
+    return {"results": {session_id: catalog_hits(snapshot, hits, limit) for session_id, hits in zip(req.sessionIds, results)}}
+
+
+@app.get("/recommend/collaborative/stats")
+def collaborative_stats():
+    model = collaborative_model()
+    return {"trained": model is not None, **(model.stats() if model is not None else {})}
 
 class DetectIntentRequest(BaseModel):
     query: str
@@ -283,22 +1074,68 @@ class DetectIntentResponse(BaseModel):
     priceRange: Optional[Dict[str, int]] = None
     skinType: Optional[str] = None
     category: Optional[str] = None 
+    # productIds[i] is the catalog product ingredients[i] resolved to, or None
+    productIds: List[Optional[str]] = []
+
+# Number of retrieved candidate products included in the intent prompt
+INTENT_CANDIDATES_K = int(os.getenv("INTENT_CANDIDATES_K", "40"))
+
+# Local classifier answers confident queries; the rest are escalated to the LLM.
+# Retrain with `python train_intent_model.py`.
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "./intent_model.json")
+try:
+    intent_engine = IntentEngine(
+        NaiveBayesIntentClassifier.load(INTENT_MODEL_PATH),
+        threshold=float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8")),
+    )
+except FileNotFoundError:
+    print(f"Warning: intent model not found at {INTENT_MODEL_PATH}; every /detect-intent call will use the LLM.")
+    intent_engine = None
+
+@app.get("/intent/stats")
+def intent_stats():
+    if intent_engine is None:
+        return {"enabled": False}
+    return {"enabled": True, **intent_engine.stats()}
 
-# ... (DetectIntentResponse definition)
+def collect_intent_metrics():
+    if intent_engine is None:
+        return []
+    stats = intent_engine.stats()
+    return [
+        ("ai_service_intent_decisions_total", "counter", "/detect-intent queries answered locally or escalated to the LLM.",
+         {"path": path}, stats[path])
+        for path in ("local", "escalated")
+    ]
+
+metrics.registry.add_collector(collect_intent_metrics)
 
 @app.post("/detect-intent", response_model=DetectIntentResponse)
-def detect_intent(req: DetectIntentRequest, db: Session = Depends(get_db)):
+async def detect_intent(req: DetectIntentRequest, db: Session = Depends(get_db)):
     try:
-        # Fetch available products from DB
-        products = db.query(models.Product).all()
-        product_names = [p.name for p in products]
-        
+        # Shortlist the most relevant catalog products locally instead of sending the whole catalog
+        index = (await run_in_threadpool(catalog_cache.get, db)).index
+
+        if intent_engine is not None:
+            local = await run_in_threadpool(intent_engine.detect, req.query, index, stored_recipe_ingredients)
+            if local is not None:
+                intent = DetectIntentResponse(**local)
+                return await with_product_ids(intent, "ingredients", ingredients=intent.type == "recipe")
+
+        product_names = index.top_names(req.query, k=INTENT_CANDIDATES_K)
+
         products_context = ""
         if product_names:
-            # Limit to 500 to avoid token limits, prioritize by relevance if possible (future improvement)
-            products_list = "\n".join(product_names[:500]) 
+            products_list = "\n".join(product_names)
             products_context = f"\nAVAILABLE PRODUCTS:\n{products_list}\n"
 
+        # The catalog shapes the answer, so a catalog change must miss the cache
+        key = cache_key("intent_detection", [normalize_text(req.query), hashlib.sha1(products_context.encode()).hexdigest()])
+        cached = await llm_cache.aget("intent_detection", key)
+        if cached is not None:
+            intent = DetectIntentResponse(**cached)
+            return await with_product_ids(intent, "ingredients", ingredients=intent.type == "recipe")
+
         prompt = f"""Analyze the user's shopping query and extract structured intent.
 Query: "{req.query}"
 {products_context}
@@ -328,15 +1165,9 @@ Example JSON:
             {"role": "system", "content": "You are a smart shopping intent analyzer."},
             {"role": "user", "content": prompt},
         ]
-        resp = client.chat.completions.create(
-            model="openai/gpt-4o-mini",
-            response_format={"type": "json_object"},
-            messages=messages,
-        )
-        content = resp.choices[0].message.content or "{}"
-        obj = json.loads(content)
+        obj = await complete_json("intent_detection", messages, key=key)
         
-        return DetectIntentResponse(
+        result = DetectIntentResponse(
             type=obj.get("type", "product"),
             keywords=obj.get("keywords", []),
             ingredients=obj.get("ingredients", []),
@@ -344,8 +1175,11 @@ Example JSON:
             skinType=obj.get("skinType"),
             category=obj.get("category")
         )
+        await llm_cache.aset("intent_detection", key, result.model_dump(exclude={"productIds"}))
+        return await with_product_ids(result, "ingredients", ingredients=result.type == "recipe")
     except Exception as e:
         print(f"Error in detect_intent: {e}")
+        FALLBACKS.inc(endpoint="intent_detection", reason=fallback_reason(e))
         # Fallback to basic product search
         return DetectIntentResponse(type="product", keywords=req.query.split(), ingredients=[])
 
@@ -354,6 +1188,15 @@ Example JSON:
 class RecipeDetailsRequest(BaseModel):
     query: str
 
+class RecipeIngredient(BaseModel):
+    line: str
+    quantity: Optional[float] = None
+    unit: Optional[str] = None
+    ingredient: str
+    note: Optional[str] = None
+    # Catalog product the ingredient resolved to, or None
+    productId: Optional[str] = None
+
 class RecipeDetailsResponse(BaseModel):
     name: str
     ingredients: List[str]
@@ -361,9 +1204,38 @@ class RecipeDetailsResponse(BaseModel):
     prepTime: str
     servings: int
     description: str
+    # ingredients parsed and resolved to products, in the same order
+    shoppingList: List[RecipeIngredient] = []
+
+# Recipes are generated once per canonical dish name and kept for RECIPE_TTL_DAYS;
+# shopping lists are resolved against the current catalog on every response
+recipe_store = create_recipe_store()
+
+def with_shopping_list(recipe: Dict[str, Any]) -> RecipeDetailsResponse:
+    shopping_list = current_catalog().ingredients.shopping_list(recipe["ingredients"])
+    return RecipeDetailsResponse(**recipe, shoppingList=shopping_list)
+
+def stored_recipe_ingredients(query: str) -> Optional[List[str]]:
+    """Ingredient names of the stored recipe for the query's dish, or None if it hasn't been generated yet."""
+    stored = recipe_store.get(canonical_dish(query), PROMPT_VERSIONS["recipe_details"])
+    if stored is None:
+        return None
+    names = [parse_ingredient_line(line)["ingredient"] for line in stored["ingredients"]]
+    return [name for name in dict.fromkeys(names) if name]
+
+@app.get("/recipe-details/stats")
+def recipe_stats():
+    return recipe_store.stats()
 
 @app.post("/recipe-details", response_model=RecipeDetailsResponse)
-def get_recipe_details(req: RecipeDetailsRequest):
+async def get_recipe_details(req: RecipeDetailsRequest):
+    dish = canonical_dish(req.query)
+    prompt_version = PROMPT_VERSIONS["recipe_details"]
+    stored = await run_in_threadpool(recipe_store.get, dish, prompt_version)
+    if stored is not None:
+        return await run_in_threadpool(with_shopping_list, stored)
+    # Concurrent requests for the same dish share one generation
+    key = cache_key("recipe_details", dish)
     try:
         prompt = f"""Generate a detailed recipe for: "{req.query}"
 
@@ -407,24 +1279,21 @@ Example JSON:
             {"role": "system", "content": "You are a professional chef providing detailed recipes. Return ONLY valid JSON."},
             {"role": "user", "content": prompt},
         ]
-        resp = client.chat.completions.create(
-            model="openai/gpt-4o-mini",
-            response_format={"type": "json_object"},
-            messages=messages,
-        )
-        content = resp.choices[0].message.content or "{}"
-        obj = json.loads(content)
+        obj = await complete_json("recipe_details", messages, key=key)
         
-        return RecipeDetailsResponse(
+        recipe = RecipeDetailsResponse(
             name=obj.get("name", "Recipe"),
             ingredients=obj.get("ingredients", []),
             steps=obj.get("steps", []),
             prepTime=obj.get("prepTime", "30 minutes"),
             servings=obj.get("servings", 4),
             description=obj.get("description", "A delicious homemade recipe")
-        )
+        ).model_dump(exclude={"shoppingList"})
+        await run_in_threadpool(recipe_store.put, dish, recipe, prompt_version)
+        return await run_in_threadpool(with_shopping_list, recipe)
     except Exception as e:
         print(f"Error in get_recipe_details: {e}")
+        FALLBACKS.inc(endpoint="recipe_details", reason=fallback_reason(e))
         # Fallback response
         return RecipeDetailsResponse(
             name=req.query.title(),
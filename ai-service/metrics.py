@@ -0,0 +1,156 @@
+import time
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Minimal Prometheus-style metrics (text exposition format 0.0.4).
+# Counters and histograms are kept in-process; `render()` produces the body
+# served on GET /metrics. Collectors let other components (cache, breaker)
+# contribute samples computed at scrape time.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Set by the request middleware to [arrival time]; the first LLM call of the request
+# pops it to record the pre_call phase. A list because tasks started with
+# create_task copy the context but share the list, so it is recorded only once.
+request_started_at: ContextVar[Optional[List[float]]] = ContextVar("request_started_at", default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # label key -> ([per-bucket counts..., +Inf count], sum)
+        self._values: Dict[LabelKey, Tuple[List[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class Timer:
+    """Context manager that observes elapsed seconds into a histogram."""
+
+    def __init__(self, histogram: Histogram, **labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.elapsed = time.perf_counter() - self._start
+        self.histogram.observe(self.elapsed, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        metric = Counter(name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, str, str, Dict[str, str], float]]]) -> None:
+        """Register a callable returning (name, type, help, labels, value) samples at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        # Group collector samples by metric name; the exposition format wants each family contiguous
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        for collector in self._collectors:
+            for name, metric_type, help_text, labels, value in collector():
+                family = families.setdefault(name, (metric_type, help_text, []))
+                family[2].append(f"{name}{_format_labels(_label_key(labels))} {_format_value(value)}")
+        for name, (metric_type, help_text, samples) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "ai_service_request_duration_seconds", "End-to-end HTTP request latency by route and status."
+)
+LLM_PHASE_SECONDS = registry.histogram(
+    "ai_service_llm_phase_seconds", "Time spent per LLM call phase (pre_call, provider_wait, parse)."
+)
+LLM_CALLS = registry.counter("ai_service_llm_calls_total", "Provider calls by endpoint, model and outcome.")
+LLM_TOKENS = registry.counter("ai_service_llm_tokens_total", "Tokens consumed by endpoint, model and kind (prompt, completion).")
+LLM_COST = registry.counter("ai_service_llm_cost_usd_total", "Estimated provider spend in USD by endpoint.")
+FALLBACKS = registry.counter("ai_service_fallbacks_total", "Responses served from a fallback path, by endpoint and reason.")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, JSON
+from sqlalchemy import Column, Integer, String, Float, JSON, ForeignKey, Date, DateTime
 from database import Base
 
 class Product(Base):
@@ -14,3 +14,76 @@ class Product(Base):
     sentiment = Column(JSON)
     dataAiHint = Column(String)
     tags = Column(JSON)
+
+class ProductSentimentAggregate(Base):
+    """Running sentiment totals for a product, updated in place as reviews arrive."""
+    __tablename__ = "product_sentiment_aggregates"
+
+    product_id = Column(String, ForeignKey("products.id"), primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    # Pseudo-reviews standing in for the product's seeded sentiment
+    prior_weight = Column(Float, nullable=False, default=0)
+    # Sum of per-review positive fractions (0-1), prior included
+    positive_sum = Column(Float, nullable=False, default=0)
+
+class ProductAspectAggregate(Base):
+    """Running per-aspect totals: `score_sum` is 0-100 scores summed over `count` (weighted) mentions."""
+    __tablename__ = "product_aspect_aggregates"
+
+    product_id = Column(String, ForeignKey("products.id"), primary_key=True)
+    aspect = Column(String, primary_key=True)
+    count = Column(Float, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0)
+
+class Review(Base):
+    """Customer review imported from a review dump (see ingest_reviews.py)."""
+    __tablename__ = "reviews"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Hash of reviewer, location, date and text; duplicates are skipped on import
+    content_hash = Column(String, unique=True, nullable=False)
+    product_id = Column(String, ForeignKey("products.id"), index=True, nullable=True)
+    reviewer_name = Column(String)
+    location = Column(String)
+    reviewed_at = Column(Date, index=True)
+    rating = Column(Integer)
+    text = Column(String)
+    image_links = Column(JSON)
+    sentiment_positive = Column(Float)
+    sentiment_aspects = Column(JSON)
+    source = Column(String)
+
+class CatalogVersion(Base):
+    """Counters bumped whenever products change: row 1 for the catalog, row 2 for sentiment-only writes (see catalog.py)."""
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class CartEvent(Base):
+    """Append-only log of cart activity; written in batches by cart_events.EventLog."""
+    __tablename__ = "cart_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String, index=True, nullable=False)
+    # Set on purchase events; the order is the basket for co-occurrence
+    order_id = Column(String, nullable=True)
+    product_id = Column(String, nullable=False)
+    event_type = Column(String, nullable=False)  # add, remove or purchase
+    quantity = Column(Integer, default=1)
+    created_at = Column(DateTime, nullable=False)  # UTC
+
+class Recipe(Base):
+    """Generated recipes by canonical dish name (see recipes.RecipeStore)."""
+    __tablename__ = "recipes"
+
+    dish_key = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    description = Column(String)
+    ingredients = Column(JSON)  # ingredient lines as generated, e.g. "2 cups Sushi Rice"
+    steps = Column(JSON)
+    prep_time = Column(String)
+    servings = Column(Integer)
+    # PROMPT_VERSIONS["recipe_details"] the recipe was generated with
+    prompt_version = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)  # UTC
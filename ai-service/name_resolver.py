@@ -0,0 +1,80 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from fuzzy import TrigramIndex, normalize as normalize_name
+from retrieval import product_field_text
+
+# Resolves free-text product names (as returned by the LLM endpoints) to product
+# ids, so clients don't have to match names against the catalog themselves.
+#
+# Each product's name and its tags phrase are indexed in a fuzzy.TrigramIndex;
+# a lookup shortlists the phrases sharing the most trigrams with the name and
+# re-scores the shortlist exactly. Exact normalized names are answered from a dict.
+
+# Tag phrases are a weaker signal than the product's own name
+TAG_WEIGHT = 0.9
+
+
+def match_score(shared: int, query_size: int, doc_size: int) -> float:
+    """
+    Mean of coverage (share of the query's trigrams found in the doc) and Dice.
+
+    Coverage lets a short LLM name ("Sushi Rice") fully match a longer catalog
+    name ("Sushi Rice (5 lb)"); Dice prefers the tighter of two covering names.
+    """
+    if not query_size or not doc_size:
+        return 0.0
+    return 0.5 * shared / query_size + shared / (query_size + doc_size)
+
+
+class NameResolver:
+    def __init__(self, ids: List[str], phrases: List[Tuple[int, float]], index: TrigramIndex, exact: Dict[str, str]):
+        self.ids = ids
+        # (product position, weight) per indexed phrase, aligned with the index's doc ids
+        self.phrases = phrases
+        self.index = index
+        self.exact = exact
+
+    @classmethod
+    def build(cls, products: List[Any]) -> "NameResolver":
+        ids, phrases, keys, exact = [], [], [], {}
+        for position, product in enumerate(products):
+            product_id = product_field_text(product, "id")
+            ids.append(product_id)
+            name = normalize_name(product_field_text(product, "name"))
+            exact.setdefault(name, product_id)
+            phrases.append((position, 1.0))
+            keys.append(name)
+            tags = normalize_name(product_field_text(product, "tags"))
+            if tags:
+                phrases.append((position, TAG_WEIGHT))
+                keys.append(tags)
+        return cls(ids, phrases, TrigramIndex.build(keys), exact)
+
+    def match(self, name: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Up to k (product id, score) pairs for `name`, best first; scores are in [0, 1]."""
+        normalized = normalize_name(name)
+        query, query_size = self.index.query(normalized)
+        if not query:
+            return []
+        best: Dict[int, float] = {}
+        for doc_id in self.index.shortlist(query):
+            position, weight = self.phrases[doc_id]
+            grams = self.index.doc_grams[doc_id]
+            score = weight * match_score(len(query & grams), query_size, len(grams))
+            if score > best.get(position, 0.0):
+                best[position] = score
+        exact = self.exact.get(normalized)
+        ranked = sorted(((self.ids[p], s) for p, s in best.items()), key=lambda item: -item[1])
+        if exact is not None:
+            ranked = [(exact, 1.0)] + [item for item in ranked if item[0] != exact]
+        return ranked[:k]
+
+    def resolve(self, name: str, min_score: float = 0.6) -> Optional[Tuple[str, float]]:
+        """Best (product id, score) for `name`, or None when nothing scores at least `min_score`."""
+        exact = self.exact.get(normalize_name(name))
+        if exact is not None:
+            return exact, 1.0
+        matches = self.match(name, k=1)
+        if matches and matches[0][1] >= min_score:
+            return matches[0]
+        return None
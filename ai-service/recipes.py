@@ -0,0 +1,340 @@
+import re
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from database import SessionLocal, dialect_insert, utc_timestamp, utcnow
+from fuzzy import normalize
+from models import Recipe
+from retrieval import product_field_text
+
+# Recipe store and recipe-to-product resolution.
+#
+# Generated recipes are stored under a canonical dish name ("How to make sushi
+# rolls?" and "sushi roll recipe" are both "sushi roll") in the recipes table,
+# with an in-memory LRU in front, so a dish is generated once and every later
+# view is a dictionary lookup. Ingredient lines ("2 cups Sushi Rice") are parsed
+# into quantity, unit and ingredient, and each ingredient is resolved to a
+# product through an IngredientIndex over the food catalog's names and tags.
+
+# Words that say how the dish was asked for, not which dish it is
+DISH_FILLER = {
+    "how", "to", "make", "cook", "prepare", "recipe", "recipes", "for", "i", "want", "a", "an", "the",
+    "ingredients", "ingredient", "homemade", "home", "at", "easy", "simple", "quick", "best", "some",
+    "do", "need", "what", "tonight", "please", "me", "my", "with", "of",
+}
+
+_FRACTIONS = {"½": 0.5, "⅓": 1 / 3, "⅔": 2 / 3, "¼": 0.25, "¾": 0.75, "⅛": 0.125}
+_WORD_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "dozen": 12, "half": 0.5,
+}
+
+# Canonical unit -> spellings
+UNITS = {
+    "cup": ("cup", "cups", "c"),
+    "tbsp": ("tbsp", "tbsps", "tbs", "tablespoon", "tablespoons"),
+    "tsp": ("tsp", "tsps", "teaspoon", "teaspoons"),
+    "g": ("g", "gm", "gms", "gram", "grams"),
+    "kg": ("kg", "kgs", "kilogram", "kilograms"),
+    "ml": ("ml", "milliliter", "milliliters", "millilitre", "millilitres"),
+    "l": ("l", "liter", "liters", "litre", "litres"),
+    "oz": ("oz", "ounce", "ounces"),
+    "lb": ("lb", "lbs", "pound", "pounds"),
+    "clove": ("clove", "cloves"),
+    "sheet": ("sheet", "sheets"),
+    "piece": ("piece", "pieces", "pc", "pcs"),
+    "can": ("can", "cans", "tin", "tins"),
+    "packet": ("packet", "packets", "pack", "packs", "package", "packages"),
+    "pinch": ("pinch", "pinches"),
+    "dash": ("dash", "dashes"),
+    "bunch": ("bunch", "bunches"),
+    "sprig": ("sprig", "sprigs"),
+    "slice": ("slice", "slices"),
+    "stalk": ("stalk", "stalks"),
+    "handful": ("handful", "handfuls"),
+    "inch": ("inch", "inches"),
+}
+_UNIT_OF = {spelling: unit for unit, spellings in UNITS.items() for spelling in spellings}
+
+_NUMBER = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?[½⅓⅔¼¾⅛]?|[½⅓⅔¼¾⅛]"
+_QUANTITY_RE = re.compile(rf"^({_NUMBER})(?:\s*(?:-|–|to)\s*({_NUMBER}))?\s*")
+_ATTACHED_UNIT_RE = re.compile(r"^([a-z]+)\b\.?\s*")
+_PARENS_RE = re.compile(r"\s*\(([^)]*)\)")
+_TRAILING_NOTE_RE = re.compile(r"\b(to taste|as needed|as required|for garnish(?:ing)?|for serving|optional)\b.*$", re.IGNORECASE)
+
+# Only these categories are searched for recipe ingredients
+FOOD_CATEGORIES = {"Groceries", "Pantry", "Produce"}
+
+# Preparation words that don't identify an ingredient
+INGREDIENT_STOPWORDS = {
+    "fresh", "chopped", "minced", "sliced", "diced", "grated", "ground", "whole", "large", "small",
+    "medium", "finely", "roughly", "thinly", "cooked", "uncooked", "raw", "dried", "and", "or", "of",
+    "for", "the", "a", "your", "choice", "some", "premium", "grade", "pack", "ct", "pc", "lb", "oz",
+}
+
+
+def stem(word: str) -> str:
+    """Crude plural folding, applied to both sides of every comparison (chilies/chili, tomatoes/tomato)."""
+    if len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "i"
+    if word.endswith("y"):
+        return word[:-1] + "i"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def canonical_dish(query: str) -> str:
+    """Store key for a dish: normalized, filler words dropped, plurals folded."""
+    words = [stem(w) for w in normalize(query).split() if w not in DISH_FILLER]
+    return " ".join(words) or normalize(query)
+
+
+def _number(text: str) -> float:
+    text = text.strip()
+    if " " in text:
+        whole, fraction = text.split(None, 1)
+        return float(whole) + _number(fraction)
+    if "/" in text:
+        numerator, denominator = text.split("/")
+        return float(numerator) / float(denominator) if float(denominator) else 0.0
+    if text[-1] in _FRACTIONS:
+        return (float(text[:-1]) if len(text) > 1 else 0.0) + _FRACTIONS[text[-1]]
+    return float(text)
+
+
+def parse_ingredient_line(line: str) -> Dict[str, Any]:
+    """
+    Split "2 cups Sushi Rice" into quantity 2.0, unit "cup" and ingredient "Sushi Rice".
+
+    Handles fractions ("1 1/2", "½"), ranges (the upper bound is kept: it is what
+    to buy), number words ("a pinch of salt"), attached units ("200g") and
+    parenthesised or trailing notes ("4 sheets Nori (seaweed)", "Salt to taste"),
+    which go to `note`. Missing parts are None.
+    """
+    text = " ".join(str(line).strip().lstrip("-*•").split())
+    notes = [note.strip() for note in _PARENS_RE.findall(text) if note.strip()]
+    text = _PARENS_RE.sub("", text)
+    if "," in text:
+        text, trailing = text.split(",", 1)
+        notes.append(trailing.strip())
+    trailing_note = _TRAILING_NOTE_RE.search(text)
+    if trailing_note and trailing_note.start() > 0:
+        notes.append(trailing_note.group(0).strip())
+        text = text[:trailing_note.start()]
+    text = text.strip()
+
+    quantity: Optional[float] = None
+    match = _QUANTITY_RE.match(text)
+    if match:
+        quantity = _number(match.group(2) or match.group(1))
+        text = text[match.end():]
+    else:
+        first, _, rest = text.partition(" ")
+        if first.lower() in _WORD_NUMBERS and rest:
+            quantity = float(_WORD_NUMBERS[first.lower()])
+            text = rest
+
+    unit: Optional[str] = None
+    match = _ATTACHED_UNIT_RE.match(text.lower())
+    if match and match.group(1) in _UNIT_OF and (quantity is not None or match.group(1) in ("pinch", "dash", "handful")):
+        unit = _UNIT_OF[match.group(1)]
+        text = text[match.end():]
+        if text.lower().startswith("of "):
+            text = text[3:]
+
+    ingredient = text.strip(" .;:") or str(line).strip()
+    return {
+        "line": str(line),
+        "quantity": quantity,
+        "unit": unit,
+        "ingredient": ingredient,
+        "note": "; ".join(notes) or None,
+    }
+
+
+def ingredient_terms(text: str) -> List[str]:
+    return [stem(w) for w in normalize(text).split() if w not in INGREDIENT_STOPWORDS and not w.isdigit()]
+
+
+class IngredientIndex:
+    """
+    Ingredient -> product id over the food catalog.
+
+    Every food product is indexed under the stemmed words of its name and its
+    tags ("soy-sauce" is "soy sauce"; an "ingredient: rice" tag counts as "rice").
+    An ingredient resolves to the product covering most of its words. Name
+    matches count more than tag matches, and tighter names win ties. A product
+    that only covers some of the words must at least match the last word, the
+    head noun ("rice" in "sushi rice", "vinegar" in "rice vinegar").
+    """
+
+    def __init__(self, ids: List[str], name_terms: List[Set[str]], all_terms: List[Set[str]], postings: Dict[str, List[int]]):
+        self.ids = ids
+        self.name_terms = name_terms
+        self.all_terms = all_terms
+        self.postings = postings
+        self._resolved: Dict[str, Optional[Tuple[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, products: List[Any]) -> "IngredientIndex":
+        ids, name_terms, all_terms, postings = [], [], [], {}
+        for product in products:
+            if product_field_text(product, "category") not in FOOD_CATEGORIES:
+                continue
+            tags = product.get("tags") if isinstance(product, dict) else getattr(product, "tags", None)
+            tag_text = " ".join(str(tag).split(":", 1)[-1] for tag in (tags or []))
+            names = set(ingredient_terms(product_field_text(product, "name")))
+            terms = names | set(ingredient_terms(tag_text))
+            position = len(ids)
+            ids.append(product_field_text(product, "id"))
+            name_terms.append(names)
+            all_terms.append(terms)
+            for term in terms:
+                postings.setdefault(term, []).append(position)
+        return cls(ids, name_terms, all_terms, postings)
+
+    def match(self, ingredient: str) -> Optional[Tuple[str, float]]:
+        """Best (product id, score in [0, 1]) for an ingredient, or None if no food product covers its head noun."""
+        terms = list(dict.fromkeys(ingredient_terms(ingredient)))
+        if not terms:
+            return None
+        wanted = set(terms)
+        head = terms[-1]
+        best: Optional[Tuple[float, int]] = None
+        for position in {p for term in terms for p in self.postings.get(term, ())}:
+            covered = wanted & self.all_terms[position]
+            if len(covered) < len(wanted) and head not in covered:
+                continue
+            in_name = wanted & self.name_terms[position]
+            coverage = len(covered) / len(wanted)
+            score = (
+                0.7 * coverage
+                + 0.2 * len(in_name) / len(wanted)
+                + 0.1 * 2 * len(in_name) / (len(wanted) + len(self.name_terms[position]))
+            )
+            if best is None or score > best[0] or (score == best[0] and self.ids[position] < self.ids[best[1]]):
+                best = (score, position)
+        return (self.ids[best[1]], round(best[0], 4)) if best else None
+
+    def resolve(self, ingredient: str) -> Optional[str]:
+        """match() memoized per ingredient; a snapshot's index is immutable, so results never go stale."""
+        key = normalize(ingredient)
+        with self._lock:
+            if key in self._resolved:
+                match = self._resolved[key]
+                return match[0] if match else None
+        match = self.match(ingredient)
+        with self._lock:
+            self._resolved[key] = match
+        return match[0] if match else None
+
+    def shopping_list(self, lines: List[str]) -> List[Dict[str, Any]]:
+        """Parsed ingredient lines, each with the productId it resolved to (None when unmatched)."""
+        items = []
+        for line in lines:
+            item = parse_ingredient_line(line)
+            item["productId"] = self.resolve(item["ingredient"])
+            items.append(item)
+        return items
+
+
+class RecipeStore:
+    """
+    Generated recipes by canonical dish name: an in-memory LRU over the recipes table.
+
+    Entries older than `ttl` seconds, or generated by another prompt version,
+    are treated as missing so the caller regenerates them.
+    """
+
+    def __init__(self, ttl: float = 30 * 24 * 3600, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "db": 0}
+        self.misses = 0
+
+    def _fresh(self, created_at: float, version: str, prompt_version: str) -> bool:
+        return version == prompt_version and time.time() - created_at < self.ttl
+
+    def _remember(self, dish_key: str, created_at: float, version: str, recipe: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[dish_key] = (created_at, version, recipe)
+            self._memory.move_to_end(dish_key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, dish_key: str, prompt_version: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(dish_key)
+            if entry is not None:
+                self._memory.move_to_end(dish_key)
+        if entry is not None and self._fresh(entry[0], entry[1], prompt_version):
+            self.hits["memory"] += 1
+            return entry[2]
+
+        db = SessionLocal()
+        try:
+            row = db.get(Recipe, dish_key)
+        finally:
+            db.close()
+        if row is not None and self._fresh(utc_timestamp(row.created_at), row.prompt_version, prompt_version):
+            recipe = {
+                "name": row.name,
+                "description": row.description,
+                "ingredients": row.ingredients,
+                "steps": row.steps,
+                "prepTime": row.prep_time,
+                "servings": row.servings,
+            }
+            self._remember(dish_key, utc_timestamp(row.created_at), row.prompt_version, recipe)
+            self.hits["db"] += 1
+            return recipe
+        self.misses += 1
+        return None
+
+    def put(self, dish_key: str, recipe: Dict[str, Any], prompt_version: str) -> None:
+        now = utcnow()
+        values = {
+            "dish_key": dish_key,
+            "name": recipe["name"],
+            "description": recipe["description"],
+            "ingredients": recipe["ingredients"],
+            "steps": recipe["steps"],
+            "prep_time": recipe["prepTime"],
+            "servings": recipe["servings"],
+            "prompt_version": prompt_version,
+            "created_at": now,
+        }
+        db = SessionLocal()
+        try:
+            stmt = dialect_insert(db)(Recipe).values(**values)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["dish_key"],
+                set_={k: v for k, v in values.items() if k != "dish_key"},
+            ))
+            db.commit()
+        finally:
+            db.close()
+        self._remember(dish_key, utc_timestamp(now), prompt_version, recipe)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cached = len(self._memory)
+        return {"cached": cached, "hits": dict(self.hits), "misses": self.misses}
+
+
+def create_recipe_store() -> RecipeStore:
+    return RecipeStore(
+        ttl=float(os.getenv("RECIPE_TTL_DAYS", "30")) * 24 * 3600,
+        max_entries=int(os.getenv("RECIPE_CACHE_SIZE", "1024")),
+    )
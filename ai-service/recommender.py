@@ -0,0 +1,129 @@
+import math
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings import EMBEDDING_FIELDS, HashingEncoder, IVFIndex, top_k
+from retrieval import product_field_text
+
+# Content-based cart recommendations served from memory.
+#
+# Built once per catalog snapshot: every product becomes a hashed TF-IDF vector
+# over its name, tags, category, image hint and description, and the matrix is
+# multiplied against itself block by block to keep each product's top-N most
+# similar products (the neighbor table). A cart is answered from the neighbor
+# rows of its items alone: candidates are scored by their summed similarity to
+# the cart, so nothing proportional to the catalog runs per request.
+#
+# Neighbors less similar than this are hashing noise, not relatedness
+MIN_SIMILARITY = 0.12
+
+# Up to EXACT_NEIGHBORS_MAX products the neighbor table is exact (all pairs).
+# Past that, products are clustered (embeddings.IVFIndex) and each cluster is
+# only compared with its NEIGHBOR_PROBES nearest clusters, which keeps the build
+# roughly linear in catalog size.
+EXACT_NEIGHBORS_MAX = 20000
+NEIGHBOR_PROBES = 8
+
+
+class ContentRecommender:
+    def __init__(self, ids: List[str], neighbors: np.ndarray, similarities: np.ndarray):
+        self.ids = ids
+        self.row_of = {product_id: row for row, product_id in enumerate(ids)}
+        # neighbors[i] are the rows most similar to row i, best first; similarities[i] their cosines
+        self.neighbors = neighbors
+        self.similarities = similarities
+
+    @staticmethod
+    def feature_matrix(products: List[Any], dim: int = 512) -> np.ndarray:
+        """L2-normalised hashed TF-IDF rows, one per product."""
+        encoder = HashingEncoder(dim)
+        docs = [
+            [(term, weight) for field, weight in EMBEDDING_FIELDS.items()
+             for term in encoder.terms(product_field_text(product, field))]
+            for product in products
+        ]
+        df = Counter(term for doc in docs for term in {t for t, _ in doc})
+        idf = {term: math.log((1 + len(docs)) / (1 + count)) + 1.0 for term, count in df.items()}
+        return encoder.encode_weighted([[(term, weight * idf[term]) for term, weight in doc] for doc in docs])
+
+    @classmethod
+    def build(cls, products: List[Any], neighbors: int = 20, dim: int = 512, block: int = 1024) -> "ContentRecommender":
+        ids = [product_field_text(product, "id") for product in products]
+        matrix = cls.feature_matrix(products, dim)
+        count = len(ids)
+        n = min(neighbors, max(count - 1, 0))
+        table = np.zeros((count, n), dtype=np.int32)
+        sims = np.zeros((count, n), dtype=np.float32)
+        if not n:
+            return cls(ids, table, sims)
+
+        def fill(rows: np.ndarray, candidates: np.ndarray) -> None:
+            scores = matrix[rows] @ matrix[candidates].T
+            # A product is not its own neighbor
+            scores[candidates[None, :] == rows[:, None]] = -np.inf
+            if len(candidates) <= n:
+                # Fewer candidates than slots: pad with the row itself at similarity 0
+                pad = n - len(candidates)
+                top = np.tile(np.arange(len(candidates)), (len(rows), 1))
+                top_scores = np.take_along_axis(scores, top, axis=1)
+                top_ids = np.concatenate([candidates[top], np.repeat(rows[:, None], pad, axis=1)], axis=1)
+                top_scores = np.concatenate([top_scores, np.zeros((len(rows), pad))], axis=1)
+            else:
+                top = np.argpartition(-scores, n, axis=1)[:, :n]
+                top_scores = np.take_along_axis(scores, top, axis=1)
+                top_ids = candidates[top]
+            top_scores = np.where(np.isfinite(top_scores), top_scores, 0.0)
+            order = np.argsort(-top_scores, axis=1)
+            table[rows] = np.take_along_axis(top_ids, order, axis=1)
+            sims[rows] = np.take_along_axis(top_scores, order, axis=1)
+
+        if count <= EXACT_NEIGHBORS_MAX:
+            everything = np.arange(count)
+            for start in range(0, count, block):
+                fill(everything[start:start + block], everything)
+        else:
+            ivf = IVFIndex.train(matrix, nlist=int(np.sqrt(count)))
+            for cluster in range(len(ivf.centroids)):
+                members = ivf.members(cluster)
+                if not len(members):
+                    continue
+                probes = top_k(ivf.centroids @ ivf.centroids[cluster], NEIGHBOR_PROBES)
+                candidates = np.concatenate([ivf.members(c) for c in probes])
+                for start in range(0, len(members), block):
+                    fill(members[start:start + block], candidates)
+        return cls(ids, table, sims)
+
+    def recommend(self, cart_ids: Iterable[str], k: int = 5, exclude: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Up to k (product id, score) pairs for a cart, best first.
+
+        A product's score is its summed similarity to the cart items it neighbors,
+        so products related to several items in the cart rank first. Cart items and
+        `exclude` are never returned; ids not in the catalog are ignored.
+        """
+        rows = [self.row_of[product_id] for product_id in cart_ids if product_id in self.row_of]
+        if not rows or not self.neighbors.shape[1]:
+            return []
+        candidates, inverse = np.unique(self.neighbors[rows].ravel(), return_inverse=True)
+        similarities = self.similarities[rows].ravel()
+        scores = np.bincount(inverse, weights=np.where(similarities >= MIN_SIMILARITY, similarities, 0.0))
+        skip = set(rows) | {self.row_of[p] for p in (exclude or ()) if p in self.row_of}
+        scores[np.isin(candidates, list(skip))] = -np.inf
+        scores[scores <= 0] = -np.inf
+        if k < len(scores):
+            top = np.argpartition(-scores, k)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+        return [(self.ids[candidates[i]], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def similar(self, product_id: str, k: int = 5) -> List[Tuple[str, float]]:
+        row = self.row_of.get(product_id)
+        if row is None:
+            return []
+        return [(self.ids[n], float(s)) for n, s in zip(self.neighbors[row][:k], self.similarities[row][:k]) if s >= MIN_SIMILARITY]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"products": len(self.ids), "neighbors": int(self.neighbors.shape[1])}
@@ -0,0 +1,258 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import openai
+
+from llm_client import get_timeout
+
+# Resilience wrapper for provider calls: per-endpoint deadlines, bounded retries
+# with jittered backoff, a circuit breaker that fails fast while the provider is
+# unhealthy, and optional request hedging.
+
+# Errors that say something about provider health and are worth retrying.
+# Bad requests, auth errors and JSON parse errors are raised immediately.
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while its circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed: calls flow; `failure_threshold` consecutive failures open it.
+    open: calls are rejected until `recovery_timeout` seconds have passed.
+    half_open: one trial call is let through; success closes, failure re-opens.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = "half_open"
+            self._trial_in_flight = False
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Free the half-open trial slot after a call that says nothing about provider health."""
+        self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutiveFailures": self.consecutive_failures,
+            "timesOpened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyWindow:
+    """Sliding window of recent successful call latencies, used to size hedge delays."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self._samples) < 20:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class ResilientCaller:
+    def __init__(
+        self,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        hedge_endpoints: Optional[set] = None,
+        hedge_percentile: float = 0.95,
+        hedge_min_delay: float = 0.05,
+        provider: str = "default",
+    ):
+        self.provider = provider
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.hedge_endpoints = hedge_endpoints or set()
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyWindow] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self.breakers:
+            self.breakers[provider] = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+        return self.breakers[provider]
+
+    def _count(self, endpoint: str, field: str) -> None:
+        counters = self._stats.setdefault(
+            endpoint,
+            {"calls": 0, "failures": 0, "retries": 0, "shortCircuited": 0,
+             "hedgesFired": 0, "hedgeWins": 0, "primaryWins": 0},
+        )
+        counters[field] += 1
+
+    async def call(
+        self,
+        endpoint: str,
+        make_call: Callable[[], Awaitable[Any]],
+        provider: Optional[str] = None,
+        hedge: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Run `make_call()` under the endpoint's deadline with retries and the provider's breaker.
+
+        `make_call` must return a fresh awaitable each time it is invoked. `timeout`
+        overrides the endpoint's default deadline (see llm_client.get_timeout).
+        """
+        provider = provider or self.provider
+        breaker = self.breaker(provider)
+        self._count(endpoint, "calls")
+        if hedge is None:
+            hedge = endpoint in self.hedge_endpoints
+
+        deadline = time.monotonic() + (timeout if timeout is not None else get_timeout(endpoint))
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self._count(endpoint, "shortCircuited")
+                raise CircuitOpenError(f"LLM provider '{provider}' circuit is open")
+
+            remaining = deadline - time.monotonic()
+            started = time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                attempt_call = self._hedged(endpoint, make_call) if hedge else make_call()
+                result = await asyncio.wait_for(attempt_call, timeout=remaining)
+            except RETRYABLE_ERRORS:
+                breaker.record_failure()
+                self._count(endpoint, "failures")
+                attempt += 1
+                # Full jitter: sleep a random fraction of the capped exponential backoff
+                backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                if attempt > self.max_retries or time.monotonic() + backoff >= deadline:
+                    raise
+                self._count(endpoint, "retries")
+                await asyncio.sleep(backoff)
+                continue
+            except BaseException:
+                # Not a provider health problem; release a half-open trial slot without judging
+                breaker.release_trial()
+                raise
+
+            breaker.record_success()
+            self._latency.setdefault(endpoint, LatencyWindow()).add(time.monotonic() - started)
+            return result
+
+    async def _hedged(self, endpoint: str, make_call: Callable[[], Awaitable[Any]]) -> Any:
+        """Start a second identical request if the first has not finished by the endpoint's p95 latency."""
+        window = self._latency.get(endpoint)
+        delay = window.percentile(self.hedge_percentile) if window else None
+        primary = asyncio.ensure_future(make_call())
+        tasks = [primary]
+        # Whatever ends this call (result, error or an outer cancellation/deadline)
+        # must not leave a request running upstream
+        try:
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait({primary}, timeout=max(delay, self.hedge_min_delay))
+            if done:
+                return primary.result()
+
+            self._count(endpoint, "hedgesFired")
+            tasks.append(asyncio.ensure_future(make_call()))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._count(endpoint, "primaryWins" if task is primary else "hedgeWins")
+                        return task.result()
+            # Both failed: surface the primary's error
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, counters in self._stats.items():
+            window = self._latency.get(endpoint)
+            p95 = window.percentile(0.95) if window else None
+            hedges = counters["hedgesFired"]
+            endpoints[endpoint] = {
+                **counters,
+                "p95Seconds": round(p95, 4) if p95 is not None else None,
+                "hedgeWinRate": round(counters["hedgeWins"] / hedges, 4) if hedges else 0.0,
+            }
+        return {
+            "breakers": {name: breaker.snapshot() for name, breaker in self.breakers.items()},
+            "endpoints": endpoints,
+        }
+
+
+def create_resilient_caller(provider: str = "default") -> ResilientCaller:
+    """Build the caller for `provider` from LLM_* environment settings."""
+    hedge_endpoints = {e.strip() for e in os.getenv("LLM_HEDGE_ENDPOINTS", "").split(",") if e.strip()}
+    return ResilientCaller(
+        max_retries=int(os.getenv("LLM_RETRIES", "2")),
+        backoff_base=float(os.getenv("LLM_BACKOFF_BASE", "0.2")),
+        backoff_max=float(os.getenv("LLM_BACKOFF_MAX", "2.0")),
+        failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+        recovery_timeout=float(os.getenv("LLM_BREAKER_RECOVERY", "30")),
+        hedge_endpoints=hedge_endpoints,
+        hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),
+        provider=provider,
+    )
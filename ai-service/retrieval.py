@@ -0,0 +1,106 @@
+import re
+import math
+import heapq
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Local BM25 retrieval over the product catalog.
+# Used to shortlist candidate products for LLM prompts instead of pasting the
+# whole catalog in. Pure Python, no network access.
+
+# Field weights: a term in the product name counts more than one in the hint text
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "tags": 2.0,
+    "category": 1.0,
+    "dataAiHint": 1.0,
+}
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "best", "buy", "by", "can", "for", "from", "get",
+    "good", "how", "i", "in", "is", "it", "make", "me", "my", "need", "of", "on", "or", "show",
+    "some", "that", "the", "this", "to", "under", "want", "what", "with", "you",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def stem(token: str) -> str:
+    """Very light plural stripping so 'tomatoes'/'tomato' and 'shoes'/'shoe' meet."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith("oes"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(t) for t in _TOKEN_RE.findall(str(text).lower()) if t not in STOP_WORDS]
+
+
+def product_field_text(product: Any, field: str) -> str:
+    value = product.get(field) if isinstance(product, dict) else getattr(product, field, None)
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value)
+
+
+class ProductIndex:
+    """BM25F-style inverted index over name, tags, category and dataAiHint."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.names: List[str] = []
+        self.ids: List[str] = []
+        self.categories: List[str] = []
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._doc_len: List[float] = []
+        self._avg_len = 0.0
+
+    @classmethod
+    def build(cls, products: Iterable[Any]) -> "ProductIndex":
+        index = cls()
+        postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for doc_id, product in enumerate(products):
+            index.names.append(product_field_text(product, "name"))
+            index.ids.append(product_field_text(product, "id"))
+            index.categories.append(product_field_text(product, "category"))
+            weighted_tf: Dict[str, float] = defaultdict(float)
+            length = 0.0
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in tokenize(product_field_text(product, field)):
+                    weighted_tf[term] += weight
+                    length += weight
+            for term, tf in weighted_tf.items():
+                postings[term].append((doc_id, tf))
+            index._doc_len.append(length)
+        index._postings = dict(postings)
+        index._avg_len = (sum(index._doc_len) / len(index._doc_len)) if index._doc_len else 0.0
+        return index
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def search(self, query: str, k: int = 40) -> List[Tuple[int, float]]:
+        """Return up to k (doc_id, score) pairs, best first. Docs matching no query term are omitted."""
+        n_docs = len(self.names)
+        if not n_docs:
+            return []
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / self._avg_len)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def top_names(self, query: str, k: int = 40) -> List[str]:
+        return [self.names[doc_id] for doc_id, _ in self.search(query, k)]
@@ -0,0 +1,180 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Full-text product search for GET /search.
+#
+# SQLite: an FTS5 external-content table ranked with bm25() using per-column
+# weights. Its content table is products_search, a copy of the searchable
+# columns keyed by an INTEGER PRIMARY KEY. products itself has a string primary
+# key, so its implicit rowid may be renumbered by VACUUM, which would silently
+# point every FTS entry at the wrong product; an INTEGER PRIMARY KEY is stable.
+# Triggers on products keep products_search current, and triggers on
+# products_search keep the FTS index current.
+# Postgres: a generated, weighted tsvector column with a GIN index, ranked with
+# ts_rank_cd().
+# Both are maintained by the database itself, so every write path (ORM, scripts,
+# raw SQL) keeps the index current.
+
+# name, description, longDescription, tags, dataAiHint
+BM25_WEIGHTS = (10.0, 2.0, 1.0, 5.0, 3.0)
+
+_SEARCH_COLUMNS = "name, description, longDescription, tags, dataAiHint"
+
+
+def _columns(prefix: str) -> str:
+    return ", ".join(f"{prefix}.{c.strip()}" for c in _SEARCH_COLUMNS.split(","))
+
+
+_SQLITE_SETUP = [
+    f"""CREATE TABLE IF NOT EXISTS products_search (
+        rowid INTEGER PRIMARY KEY,
+        product_id TEXT NOT NULL UNIQUE,
+        {_SEARCH_COLUMNS}
+    )""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        {_SEARCH_COLUMNS},
+        content='products_search', content_rowid='rowid',
+        tokenize='porter unicode61', prefix='2 3'
+    )""",
+    # products -> products_search; sentiment and price writes don't touch the index
+    f"""CREATE TRIGGER IF NOT EXISTS products_search_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_search(product_id, {_SEARCH_COLUMNS}) VALUES (new.id, {_columns("new")});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_search_ad AFTER DELETE ON products BEGIN
+        DELETE FROM products_search WHERE product_id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_search_au AFTER UPDATE OF id, {_SEARCH_COLUMNS} ON products BEGIN
+        UPDATE products_search SET product_id = new.id, name = new.name, description = new.description,
+            longDescription = new.longDescription, tags = new.tags, dataAiHint = new.dataAiHint
+        WHERE product_id = old.id;
+    END""",
+    # products_search -> products_fts
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products_search BEGIN
+        INSERT INTO products_fts(rowid, {_SEARCH_COLUMNS}) VALUES (new.rowid, {_columns("new")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products_search BEGIN
+        INSERT INTO products_fts(products_fts, rowid, {_SEARCH_COLUMNS})
+        VALUES ('delete', old.rowid, {_columns("old")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products_search BEGIN
+        INSERT INTO products_fts(products_fts, rowid, {_SEARCH_COLUMNS})
+        VALUES ('delete', old.rowid, {_columns("old")});
+        INSERT INTO products_fts(rowid, {_SEARCH_COLUMNS}) VALUES (new.rowid, {_columns("new")});
+    END""",
+]
+
+_POSTGRES_SETUP = [
+    """ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(tags::text, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce("dataAiHint", '') || ' ' || coalesce(description, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce("longDescription", '')), 'D')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+]
+
+_TERM_RE = re.compile(r"[a-z0-9]+")
+
+
+def search_terms(query: str) -> List[str]:
+    return _TERM_RE.findall(query.lower())[:16]
+
+
+def ensure_search_index(engine: Engine) -> Optional[str]:
+    """
+    Create the full-text index for the engine's backend if needed.
+
+    Returns the backend in use ("fts5" or "tsvector"), or None when full-text
+    search is unavailable and callers should fall back to the in-memory index.
+    """
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                created = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_search'")
+                ).first() is None
+                for statement in _SQLITE_SETUP:
+                    conn.execute(text(statement))
+                if created:
+                    # Index the rows that existed before the triggers did
+                    conn.execute(text(
+                        f"INSERT INTO products_search(product_id, {_SEARCH_COLUMNS}) "
+                        f"SELECT id, {_SEARCH_COLUMNS} FROM products"
+                    ))
+                    conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+                return "fts5"
+            if dialect == "postgresql":
+                for statement in _POSTGRES_SETUP:
+                    conn.execute(text(statement))
+                return "tsvector"
+    except Exception as e:
+        print(f"Warning: full-text search index unavailable ({e}); /search will use the in-memory index.")
+    return None
+
+
+def _filters(category: Optional[str], min_price: Optional[float], max_price: Optional[float]) -> Tuple[str, Dict[str, Any]]:
+    clauses, params = [], {}
+    if category is not None:
+        clauses.append("p.category = :category")
+        params["category"] = category
+    if min_price is not None:
+        clauses.append("p.price >= :min_price")
+        params["min_price"] = min_price
+    if max_price is not None:
+        clauses.append("p.price <= :max_price")
+        params["max_price"] = max_price
+    return "".join(f" AND {c}" for c in clauses), params
+
+
+def _search_sqlite(db: Session, terms: List[str], operator: str, where: str, params: Dict[str, Any], limit: int):
+    # Quote every term (no FTS5 syntax from user input) and prefix-match it
+    match = f" {operator} ".join(f'"{term}"*' for term in terms)
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    sql = text(
+        f"SELECT p.id, -bm25(products_fts, {weights}) AS score "
+        f"FROM products_fts JOIN products_search s ON s.rowid = products_fts.rowid "
+        f"JOIN products p ON p.id = s.product_id "
+        f"WHERE products_fts MATCH :match{where} ORDER BY score DESC LIMIT :limit"
+    )
+    return db.execute(sql, {**params, "match": match, "limit": limit}).all()
+
+
+def _search_postgres(db: Session, terms: List[str], operator: str, where: str, params: Dict[str, Any], limit: int):
+    tsquery = f" {'&' if operator == 'AND' else '|'} ".join(f"{term}:*" for term in terms)
+    sql = text(
+        f"SELECT p.id, ts_rank_cd(p.search_vector, q) AS score "
+        f"FROM products p, to_tsquery('english', :tsquery) q "
+        f"WHERE p.search_vector @@ q{where} ORDER BY score DESC LIMIT :limit"
+    )
+    return db.execute(sql, {**params, "tsquery": tsquery, "limit": limit}).all()
+
+
+def search_products(
+    db: Session,
+    backend: str,
+    query: str,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = 20,
+) -> List[Tuple[str, float]]:
+    """
+    Ranked (product id, score) pairs for `query`; higher scores are better.
+
+    Every term must match (as a prefix) when possible; if nothing matches all of
+    them, products matching any term are returned instead.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    where, params = _filters(category, min_price, max_price)
+    run = _search_sqlite if backend == "fts5" else _search_postgres
+    rows = run(db, terms, "AND", where, params, limit)
+    if not rows and len(terms) > 1:
+        rows = run(db, terms, "OR", where, params, limit)
+    return [(row[0], float(row[1])) for row in rows]
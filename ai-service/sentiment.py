@@ -0,0 +1,286 @@
+import re
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from database import dialect_insert
+from models import Product, ProductAspectAggregate, ProductSentimentAggregate
+
+# Local review sentiment for /analyze-review and review imports.
+# A small VADER-style lexicon scorer (valence words, negation, intensifiers,
+# "but" contrast) rates each review, and per-product running totals are kept
+# in the database so a new review is merged with one atomic UPDATE instead of
+# asking the LLM to re-estimate percentages from the previous ones.
+
+LEXICON = {
+    # positive
+    "good": 1.9, "great": 3.1, "excellent": 3.2, "amazing": 2.8, "awesome": 3.1, "love": 3.2, "loved": 2.9,
+    "loves": 2.7, "like": 1.5, "liked": 1.8, "nice": 1.8, "perfect": 2.7, "best": 3.2, "fantastic": 2.6,
+    "wonderful": 2.7, "happy": 2.7, "satisfied": 1.8, "recommend": 1.5, "recommended": 1.6, "worth": 0.9,
+    "fresh": 1.3, "delicious": 2.7, "tasty": 2.2, "yummy": 2.4, "comfortable": 1.9, "comfy": 2.0,
+    "soft": 1.0, "sturdy": 1.6, "durable": 1.6, "reliable": 1.6, "fast": 1.0, "quick": 1.0, "easy": 1.9,
+    "beautiful": 2.9, "pretty": 2.2, "lovely": 2.8, "fine": 0.8, "solid": 1.4, "affordable": 1.5,
+    "cheap": 0.4, "value": 1.0, "fits": 0.8, "fit": 0.6, "favorite": 2.0, "impressed": 2.1, "pleased": 1.9,
+    "smooth": 1.2, "works": 1.0, "worked": 1.0, "helpful": 1.7, "well": 1.1, "flavorful": 2.2, "aromatic": 1.4,
+    "crispy": 1.2, "juicy": 1.4, "bargain": 1.6, "superb": 3.0, "outstanding": 3.0, "quality": 0.6,
+    # negative
+    "bad": -2.5, "terrible": -2.1, "awful": -2.0, "horrible": -2.5, "poor": -2.1, "worst": -3.1,
+    "hate": -2.7, "hated": -3.2, "disappointed": -1.9, "disappointing": -2.2, "broke": -1.7, "broken": -2.1,
+    "cheaply": -1.2, "flimsy": -1.7, "fragile": -1.2, "stale": -1.9, "rotten": -2.5, "spoiled": -2.0,
+    "expired": -1.8, "bland": -1.4, "tasteless": -1.8, "overpriced": -1.9, "expensive": -0.9, "slow": -1.2,
+    "late": -1.0, "damaged": -2.0, "defective": -2.1, "useless": -2.2, "waste": -2.1, "return": -0.8,
+    "returned": -1.1, "refund": -1.2, "uncomfortable": -1.8, "tight": -0.6, "itchy": -1.4, "smelly": -1.6,
+    "leak": -1.5, "leaked": -1.7, "leaks": -1.5, "wrong": -2.1, "missing": -1.2, "problem": -1.7,
+    "problems": -1.7, "issue": -1.0, "issues": -1.0, "never": -0.4, "dirty": -1.9, "soggy": -1.4,
+    "worse": -2.1, "meh": -0.7, "mediocre": -1.6, "sticky": -0.7, "burnt": -1.5, "faded": -1.1,
+}
+
+NEGATIONS = {"not", "no", "never", "nothing", "without", "hardly", "barely", "isnt", "wasnt", "dont",
+             "doesnt", "didnt", "cant", "couldnt", "wont", "wouldnt", "arent", "werent", "aint", "nor"}
+
+INTENSIFIERS = {"very": 0.293, "really": 0.293, "extremely": 0.293, "super": 0.293, "so": 0.293,
+                "incredibly": 0.293, "absolutely": 0.293, "totally": 0.293, "highly": 0.293, "quite": 0.15,
+                "pretty": 0.15, "slightly": -0.293, "somewhat": -0.293, "kinda": -0.293, "barely": -0.293}
+
+# Aspect -> keywords that mark a sentence as talking about it (names match product sentiment aspects)
+ASPECTS = {
+    "quality": ["quality", "build", "material", "made", "craftsmanship", "well-made"],
+    "value": ["price", "value", "cost", "money", "worth", "expensive", "cheap", "affordable", "overpriced", "bargain"],
+    "service": ["service", "delivery", "shipping", "shipped", "arrived", "packaging", "packed", "seller"],
+    "durability": ["durable", "durability", "lasting", "lasted", "broke", "broken", "sturdy", "fragile", "flimsy"],
+    "flavor": ["flavor", "flavour", "taste", "tastes", "tasty", "delicious", "bland", "spicy", "sweet"],
+    "freshness": ["fresh", "freshness", "stale", "expired", "rotten", "spoiled", "ripe"],
+    "comfort": ["comfort", "comfortable", "comfy", "uncomfortable", "soft", "itchy"],
+    "fit": ["fit", "fits", "fitting", "size", "sizing", "tight", "loose"],
+}
+
+# keyword -> aspects it signals; one dict lookup per token matches every aspect lexicon at once
+ASPECT_INDEX: Dict[str, Tuple[str, ...]] = {}
+for _aspect, _keywords in ASPECTS.items():
+    for _keyword in _keywords:
+        ASPECT_INDEX[_keyword] = ASPECT_INDEX.get(_keyword, ()) + (_aspect,)
+
+# Words that start a clause contrasting with the previous one; aspects are scored per clause
+CONTRASTIVE = {"but", "however", "though", "although", "yet", "whereas"}
+
+NEGATION_SCALAR = -0.74
+NORMALIZATION_ALPHA = 15
+
+_SENTENCE_RE = re.compile(r"[.!?\n]+")
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?(?:-[a-z]+)?")
+
+
+def _tokens(text: str) -> List[str]:
+    return [t.replace("'", "") for t in _TOKEN_RE.findall(text.lower())]
+
+
+def _valence(tokens: List[str]) -> float:
+    """Summed valence of a token list with negation, intensifier and "but" handling."""
+    total = 0.0
+    but_index = tokens.index("but") if "but" in tokens else -1
+    for i, token in enumerate(tokens):
+        value = LEXICON.get(token)
+        if value is None or (token in INTENSIFIERS and i + 1 < len(tokens) and tokens[i + 1] in LEXICON):
+            continue
+        window = tokens[max(0, i - 3):i]
+        for word in window:
+            boost = INTENSIFIERS.get(word)
+            if boost is not None:
+                value += boost if value > 0 else -boost
+        if any(word in NEGATIONS for word in window):
+            value *= NEGATION_SCALAR
+        # Contrast: the clause after "but" dominates the one before it
+        if but_index >= 0:
+            value *= 0.5 if i < but_index else 1.5
+        total += value
+    return total
+
+
+def _clauses(tokens: List[str]) -> List[List[str]]:
+    """Split a sentence's tokens at contrastive conjunctions."""
+    clauses: List[List[str]] = [[]]
+    for token in tokens:
+        if token in CONTRASTIVE:
+            clauses.append([])
+        else:
+            clauses[-1].append(token)
+    return [clause for clause in clauses if clause]
+
+
+def compound(total: float) -> float:
+    """Squash a summed valence into [-1, 1]."""
+    return total / math.sqrt(total * total + NORMALIZATION_ALPHA) if total else 0.0
+
+
+def score_sentences(sentences: Iterable[str]) -> Dict[str, Any]:
+    """
+    Score a review given its sentences.
+
+    Each sentence is tokenized and scored once. Aspects are scored per clause
+    (split at "but", "however", ...), so one sentence can rate two aspects in
+    opposite directions; a clause without sentiment words takes the sentence's score.
+    """
+    overall = 0.0
+    mentions: Dict[str, List[float]] = {}
+    for sentence in sentences:
+        tokens = _tokens(sentence)
+        if not tokens:
+            continue
+        valence = _valence(tokens)
+        overall += valence
+        clauses = _clauses(tokens)
+        for clause in clauses:
+            found = set()
+            for token in clause:
+                found.update(ASPECT_INDEX.get(token, ()))
+            if found:
+                # Only sentences with a contrast are scored again, clause by clause
+                clause_valence = _valence(clause) if len(clauses) > 1 else valence
+                clause_score = compound(clause_valence or valence)
+                for aspect in found:
+                    mentions.setdefault(aspect, []).append(clause_score)
+
+    overall = compound(overall)
+    aspects = {
+        aspect: int(round((sum(scores) / len(scores) + 1) * 50))
+        for aspect, scores in mentions.items()
+    }
+    return {"positive": (overall + 1) / 2, "compound": overall, "aspects": aspects}
+
+
+def score_review(text: str) -> Dict[str, Any]:
+    """
+    Score one review locally.
+
+    Returns {"positive": 0-1 fraction, "compound": -1..1, "aspects": {aspect: 0-100}}
+    where aspects only include those the review mentions. For example
+    "Great taste but poor packaging." rates flavor 81 and service 26.
+    """
+    return score_sentences(_SENTENCE_RE.split(text))
+
+
+def score_reviews(texts: Iterable[str], nlp: Any = None, batch_size: int = 256) -> List[Dict[str, Any]]:
+    """
+    Score a batch of reviews.
+
+    With a spaCy pipeline (see load_sentence_splitter) sentences come from
+    `nlp.pipe`, which segments the whole batch in one streaming pass; otherwise
+    the built-in punctuation splitter is used.
+    """
+    if nlp is None:
+        return [score_review(text) for text in texts]
+    return [score_sentences(sent.text for sent in doc.sents) for doc in nlp.pipe(texts, batch_size=batch_size)]
+
+
+def load_sentence_splitter(model: Optional[str] = None) -> Any:
+    """
+    Optional spaCy sentence segmenter for score_reviews.
+
+    `model` names an installed pipeline (e.g. en_core_web_sm; components other than
+    the parser are disabled); without one a rule-based sentencizer is used.
+    Requires spaCy; raises ImportError if it is not installed.
+    """
+    import spacy
+
+    if model:
+        return spacy.load(model, exclude=["ner", "lemmatizer", "textcat"])
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
+def seed_aggregates(db: Session, product: Product, prior_weight: float) -> None:
+    """
+    Create the product's aggregate rows from its stored sentiment if they do not exist yet.
+
+    The existing percentages count as `prior_weight` reviews so the first new
+    review nudges them rather than replacing them.
+    """
+    insert = dialect_insert(db)
+    sentiment = product.sentiment or {}
+    positive = float(sentiment.get("positive", 50)) / 100
+    db.execute(
+        insert(ProductSentimentAggregate)
+        .values(product_id=product.id, review_count=0, prior_weight=prior_weight,
+                positive_sum=positive * prior_weight)
+        .on_conflict_do_nothing(index_elements=["product_id"])
+    )
+    for aspect, score in (sentiment.get("aspects") or {}).items():
+        db.execute(
+            insert(ProductAspectAggregate)
+            .values(product_id=product.id, aspect=aspect, count=prior_weight, score_sum=float(score) * prior_weight)
+            .on_conflict_do_nothing(index_elements=["product_id", "aspect"])
+        )
+
+
+def record_reviews(db: Session, product: Product, scores: Iterable[Dict[str, Any]], prior_weight: float = 20.0) -> Dict[str, Any]:
+    """
+    Merge scored reviews into the product's aggregates and refresh `Product.sentiment`.
+
+    Counters are incremented in SQL (`x = x + :delta`), so concurrent writers never
+    overwrite each other; the caller commits. Returns the recomputed sentiment.
+    """
+    scores = list(scores)
+    seed_aggregates(db, product, prior_weight)
+
+    positive = sum(s["positive"] for s in scores)
+    db.execute(
+        update(ProductSentimentAggregate)
+        .where(ProductSentimentAggregate.product_id == product.id)
+        .values(
+            review_count=ProductSentimentAggregate.review_count + len(scores),
+            positive_sum=ProductSentimentAggregate.positive_sum + positive,
+        )
+    )
+
+    aspect_totals: Dict[str, List[float]] = {}
+    for s in scores:
+        for aspect, value in s["aspects"].items():
+            totals = aspect_totals.setdefault(aspect, [0.0, 0.0])
+            totals[0] += 1
+            totals[1] += value
+    insert = dialect_insert(db)
+    for aspect, (count, score_sum) in aspect_totals.items():
+        stmt = insert(ProductAspectAggregate).values(
+            product_id=product.id, aspect=aspect, count=count, score_sum=score_sum
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["product_id", "aspect"],
+            set_={
+                "count": ProductAspectAggregate.count + stmt.excluded.count,
+                "score_sum": ProductAspectAggregate.score_sum + stmt.excluded.score_sum,
+            },
+        ))
+
+    sentiment = current_sentiment(db, product.id)
+    # Keep the denormalized column served by /products in step with the aggregates
+    product.sentiment = {k: sentiment[k] for k in ("positive", "negative", "aspects")}
+    return sentiment
+
+
+def current_sentiment(db: Session, product_id: str) -> Optional[Dict[str, Any]]:
+    """Percentages derived from the stored aggregates."""
+    totals = db.get(ProductSentimentAggregate, product_id, populate_existing=True)
+    if totals is None:
+        return None
+    weight = totals.prior_weight + totals.review_count
+    positive = int(round(100 * totals.positive_sum / weight)) if weight else 50
+    aspects = {
+        row.aspect: int(round(row.score_sum / row.count))
+        for row in db.query(ProductAspectAggregate).filter(ProductAspectAggregate.product_id == product_id)
+        if row.count
+    }
+    return {"positive": positive, "negative": 100 - positive, "aspects": aspects, "reviewCount": totals.review_count}
+
+
+def merge_into(sentiment: Dict[str, Any], score: Dict[str, Any], prior_weight: float = 20.0) -> Dict[str, Any]:
+    """Stateless merge of one scored review into client-supplied percentages (no stored product)."""
+    positive = float(sentiment.get("positive", 50))
+    merged = int(round((positive * prior_weight + 100 * score["positive"]) / (prior_weight + 1)))
+    aspects = dict(sentiment.get("aspects") or {})
+    for aspect, value in score["aspects"].items():
+        previous = aspects.get(aspect)
+        aspects[aspect] = value if previous is None else int(round((previous * prior_weight + value) / (prior_weight + 1)))
+    return {"positive": merged, "negative": 100 - merged, "aspects": aspects}
@@ -0,0 +1,51 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one in-flight task.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task and receive the same result (or error).
+    The task is shielded, so a disconnecting client does not cancel the call
+    for everyone else waiting on it.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, group: str, field: str) -> None:
+        counters = self._stats.setdefault(group, {"originated": 0, "coalesced": 0})
+        counters[field] += 1
+
+    async def do(self, group: str, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight_key = f"{group}:{key}"
+        task = self._inflight.get(flight_key)
+        if task is not None:
+            self._count(group, "coalesced")
+            return await asyncio.shield(task)
+
+        self._count(group, "originated")
+        task = asyncio.ensure_future(fn())
+        self._inflight[flight_key] = task
+        task.add_done_callback(lambda t: self._finish(flight_key, t))
+        return await asyncio.shield(task)
+
+    def _finish(self, flight_key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(flight_key, None)
+        # Mark the error as retrieved in case every waiter went away before it finished
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = {group: dict(counters) for group, counters in self._stats.items()}
+        originated = sum(c["originated"] for c in endpoints.values())
+        coalesced = sum(c["coalesced"] for c in endpoints.values())
+        return {
+            "inFlight": len(self._inflight),
+            "originated": originated,
+            "coalesced": coalesced,
+            "endpoints": endpoints,
+        }
@@ -0,0 +1,90 @@
+import json
+from typing import Any
+
+# Helpers for streaming LLM output to clients as Server-Sent Events.
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one SSE frame. `data` is JSON-encoded so newlines never break framing."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class JSONStringFieldStreamer:
+    """
+    Incrementally extract one top-level string field from a streamed JSON object.
+
+    The model returns `{"answer": "...", "suggestedProduct": ...}` token by token.
+    Feeding each chunk to `feed()` returns the newly decoded characters of the
+    target field, so they can be forwarded before the object is complete.
+    """
+
+    def __init__(self, field: str):
+        self._marker = f'"{field}"'
+        self._buffer = ""
+        self._pos = 0           # scan position in the buffer
+        self._state = "search"  # search -> colon -> open -> value -> done
+        self._pending_escape = ""
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> str:
+        self._buffer += chunk
+        out = []
+        buf = self._buffer
+        while self._pos < len(buf) and self._state != "done":
+            if self._state == "search":
+                idx = buf.find(self._marker, self._pos)
+                if idx < 0:
+                    # Keep enough tail to match a marker split across chunks
+                    self._pos = max(self._pos, len(buf) - len(self._marker) + 1)
+                    break
+                self._pos = idx + len(self._marker)
+                self._state = "colon"
+            elif self._state in ("colon", "open"):
+                ch = buf[self._pos]
+                self._pos += 1
+                if ch.isspace():
+                    continue
+                if self._state == "colon" and ch == ":":
+                    self._state = "open"
+                elif self._state == "open" and ch == '"':
+                    self._state = "value"
+                else:
+                    # Not a string value (or the marker was a value elsewhere); keep looking
+                    self._state = "search"
+            else:
+                ch = buf[self._pos]
+                if self._pending_escape:
+                    self._pending_escape += ch
+                    self._pos += 1
+                    decoded = self._decode_escape()
+                    if decoded is not None:
+                        out.append(decoded)
+                    continue
+                self._pos += 1
+                if ch == "\\":
+                    self._pending_escape = "\\"
+                elif ch == '"':
+                    self._state = "done"
+                else:
+                    out.append(ch)
+        return "".join(out)
+
+    def _decode_escape(self) -> str | None:
+        seq = self._pending_escape
+        if len(seq) < 2:
+            return None
+        if seq[1] == "u":
+            if len(seq) < 6:
+                return None
+            self._pending_escape = ""
+            try:
+                return chr(int(seq[2:6], 16))
+            except ValueError:
+                return ""
+        self._pending_escape = ""
+        return _ESCAPES.get(seq[1], seq[1])
@@ -0,0 +1,223 @@
+"""
+Local stand-in for the chat-completions API, for load testing and benchmarking
+the ai-service without provider spend or rate limits.
+
+Run it next to the service:
+    uvicorn stub_llm_server:app --port 8100
+    LLM_PROVIDER=local uvicorn main:app --port 8000
+
+It recognises each ai-service prompt and returns schema-valid JSON for it
+(streaming supported). Responses are deterministic per prompt. Behaviour is
+configured through the environment:
+
+- STUB_LATENCY: latency distribution in ms, one of
+    fixed:<ms> | uniform:<lo>,<hi> | normal:<mean>,<stddev> | lognormal:<median>,<sigma>
+  (default lognormal:600,0.5). STUB_LATENCY_<ENDPOINT> overrides it per endpoint.
+- STUB_ERROR_RATE: fraction of requests that fail (default 0)
+- STUB_ERROR_STATUS: HTTP status used for failures (default 503)
+- STUB_SEED: seed for the latency/error random generator
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI()
+rng = random.Random(os.getenv("STUB_SEED"))
+
+# System-prompt fragments that identify which ai-service endpoint sent a request
+ENDPOINT_SIGNATURES = [
+    ("follow_up_questions", "follow-up questions"),
+    ("product_qa", "AI shopping assistant"),
+    ("analyze_review", "sentiment analysis AI"),
+    ("ai_search", "Extract relevant product names"),
+    ("recommendations", "recommend relevant retail products"),
+    ("intent_detection", "shopping intent analyzer"),
+    ("recipe_details", "professional chef"),
+]
+
+INTENT_TYPES = ["recipe", "skincare", "clothing", "electronics", "grocery", "product"]
+CATEGORIES = ["Groceries", "Skincare", "Clothing", "Electronics", "Pantry", "Produce"]
+
+
+def detect_endpoint(messages: List[Dict[str, Any]]) -> str:
+    system = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+    for endpoint, signature in ENDPOINT_SIGNATURES:
+        if signature in system:
+            return endpoint
+    return "unknown"
+
+
+def _user_text(messages: List[Dict[str, Any]]) -> str:
+    return " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "user")
+
+
+def _query(user_text: str) -> str:
+    match = re.search(r'(?:Query|User Question|Question|recipe for):?\s*"?([^"\n]+)"?', user_text)
+    return (match.group(1) if match else user_text).strip()[:200]
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in re.findall(r"[a-zA-Z]+", text.lower()) if len(w) > 2]
+
+
+def build_content(endpoint: str, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Schema-valid JSON body for the endpoint; deterministic for a given prompt."""
+    user_text = _user_text(messages)
+    query = _query(user_text)
+    words = _words(query) or ["item"]
+    digest = int(hashlib.sha1(user_text.encode("utf-8")).hexdigest(), 16)
+
+    if endpoint == "product_qa":
+        return {
+            "answer": f"**Good question!** Here is what we know about {query}:\n- It is a popular choice\n- Customers rate it highly",
+            "suggestedProduct": None,
+        }
+    if endpoint == "follow_up_questions":
+        return {"questions": ["Is it good value for money?", "How long does it last?", "What do other customers say?"]}
+    if endpoint == "analyze_review":
+        positive = 40 + digest % 55
+        return {"positive": positive, "negative": 100 - positive, "aspects": {"quality": 50 + digest % 50}}
+    if endpoint == "ai_search":
+        return {"productNames": [w.title() for w in words[:6]]}
+    if endpoint == "recommendations":
+        listed = re.search(r"Candidates:\n(.*)", user_text, re.DOTALL)
+        candidates = [re.sub(r"^\d+\.\s*", "", line) for line in listed.group(1).split("\n")] if listed else []
+        # Reverse the candidate order so re-ranking is visible
+        return {"productNames": candidates[::-1][:5]}
+    if endpoint == "intent_detection":
+        listed = re.search(r"AVAILABLE PRODUCTS:\n(.*?)\n\n", user_text, re.DOTALL)
+        candidates = listed.group(1).split("\n") if listed else []
+        intent = INTENT_TYPES[digest % len(INTENT_TYPES)]
+        return {
+            "type": intent,
+            "keywords": words[:5],
+            "ingredients": candidates[:4] if intent == "recipe" else [],
+            "priceRange": None,
+            "skinType": None,
+            "category": CATEGORIES[digest % len(CATEGORIES)],
+        }
+    if endpoint == "recipe_details":
+        return {
+            "name": query.title(),
+            "description": f"A simple homemade {query}",
+            "ingredients": ["2 cups Basmati Rice", "1 tbsp Soy Sauce", "1 cup Fresh Vegetables"],
+            "steps": ["Prepare the ingredients", "Cook everything together", "Serve warm"],
+            "prepTime": "30 minutes",
+            "servings": 2 + digest % 4,
+        }
+    return {}
+
+
+def parse_latency(spec: str) -> Tuple[str, List[float]]:
+    kind, _, args = spec.partition(":")
+    return kind.strip().lower(), [float(a) for a in args.split(",") if a.strip()]
+
+
+def sample_latency(endpoint: str) -> float:
+    """Sampled latency in seconds for one request."""
+    spec = os.getenv(f"STUB_LATENCY_{endpoint.upper()}", os.getenv("STUB_LATENCY", "lognormal:600,0.5"))
+    kind, args = parse_latency(spec)
+    if kind == "fixed":
+        ms = args[0]
+    elif kind == "uniform":
+        ms = rng.uniform(args[0], args[1])
+    elif kind == "normal":
+        ms = rng.gauss(args[0], args[1])
+    elif kind == "lognormal":
+        ms = args[0] * rng.lognormvariate(0, args[1])
+    else:
+        raise ValueError(f"Unknown STUB_LATENCY distribution '{kind}'")
+    return max(ms, 0.0) / 1000.0
+
+
+def count_tokens(text: str) -> int:
+    # Rough provider-style estimate: ~4 characters per token
+    return max(1, len(text) // 4)
+
+
+def completion_body(model: str, content: str, prompt_tokens: int) -> Dict[str, Any]:
+    completion_tokens = count_tokens(content)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+async def stream_chunks(model: str, content: str, latency: float):
+    """Emit the content as chat.completion.chunk SSE frames spread over `latency`."""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    pieces = [content[i:i + 8] for i in range(0, len(content), 8)] or [""]
+    # Roughly a third of the latency before the first token, the rest spread across tokens
+    await asyncio.sleep(latency * 0.3)
+    gap = latency * 0.7 / len(pieces)
+    for piece in pieces:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(gap)
+    final = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", "local/stub")
+    endpoint = detect_endpoint(messages)
+    latency = sample_latency(endpoint)
+
+    if rng.random() < float(os.getenv("STUB_ERROR_RATE", "0")):
+        await asyncio.sleep(latency)
+        status = int(os.getenv("STUB_ERROR_STATUS", "503"))
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": "Injected stub failure", "type": "stub_error", "code": status}},
+        )
+
+    content = json.dumps(build_content(endpoint, messages))
+    if body.get("stream"):
+        return StreamingResponse(stream_chunks(model, content, latency), media_type="text/event-stream")
+
+    await asyncio.sleep(latency)
+    prompt_tokens = sum(count_tokens(str(m.get("content", ""))) for m in messages)
+    return completion_body(model, content, prompt_tokens)
+
+
+@app.get("/v1/models")
+def list_models():
+    return {"object": "list", "data": [{"id": "local/stub", "object": "model", "owned_by": "local"}]}
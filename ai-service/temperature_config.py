@@ -15,6 +15,8 @@ Temperature controls the randomness of LLM responses:
 For WalSmart features:
 """
 
+from typing import Optional, Tuple
+
 # Temperature configuration for each endpoint
 TEMPERATURE_CONFIG = {
     # Precise tasks - need consistent classification
@@ -41,6 +43,7 @@ MAX_TOKENS = {
     "recommendations": 150,
     "intent_detection": 150,
     "recipe_details": 800,
+    "follow_up_questions": 150,
 }
 
 # Example: Update your product_qa endpoint
@@ -69,23 +72,34 @@ async def product_qa(request: ProductQARequest):
 """
 
 # Cost calculation helper
-def calculate_request_cost(prompt_tokens: int, completion_tokens: int) -> float:
+# USD per 1M (input, output) tokens, by model name without the provider prefix
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.150, 0.600),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+DEFAULT_PRICING_MODEL = "gpt-4o-mini"
+
+
+def model_pricing(model: Optional[str]) -> Tuple[float, float]:
+    """(input, output) USD per 1M tokens; unknown models are priced as DEFAULT_PRICING_MODEL."""
+    name = (model or DEFAULT_PRICING_MODEL).split("/")[-1]
+    if name not in MODEL_PRICING:
+        # Dated snapshots ("gpt-4o-mini-2024-07-18") price like their base model
+        name = max((m for m in MODEL_PRICING if name.startswith(m)), key=len, default=DEFAULT_PRICING_MODEL)
+    return MODEL_PRICING[name]
+
+
+def calculate_request_cost(prompt_tokens: int, completion_tokens: int, model: Optional[str] = None) -> float:
     """
-    Calculate cost for a single request
-    
-    GPT-4o-mini pricing (as of 2024):
-    - Input: $0.150 per 1M tokens
-    - Output: $0.600 per 1M tokens
+    Calculate cost for a single request, priced by the model that served it
+    (see MODEL_PRICING; GPT-4o-mini when not given)
     """
-    PRICING = {
-        "input": 0.150 / 1_000_000,
-        "output": 0.600 / 1_000_000,
-    }
-    
-    input_cost = prompt_tokens * PRICING["input"]
-    output_cost = completion_tokens * PRICING["output"]
-    
-    return input_cost + output_cost
+    input_price, output_price = model_pricing(model)
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
 
 
 # Example usage in your endpoints
@@ -93,7 +107,8 @@ def calculate_request_cost(prompt_tokens: int, completion_tokens: int) -> float:
 # After getting response
 cost = calculate_request_cost(
     resp.usage.prompt_tokens,
-    resp.usage.completion_tokens
+    resp.usage.completion_tokens,
+    model=resp.model,
 )
 print(f"Request cost: ${cost:.6f}")
 """
@@ -132,4 +147,5 @@ ENDPOINT_UPDATES = """
    - Why: Recipes can be creative and varied
 """
 
-print(ENDPOINT_UPDATES)
+if __name__ == "__main__":
+    print(ENDPOINT_UPDATES)
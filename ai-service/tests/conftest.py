@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Run from ai-service/:
+#     python -m pytest tests
+#
+# The service modules are flat files in ai-service/. Some of them touch the
+# database as soon as they are imported (catalog creates catalog_version), so
+# DATABASE_URL is pointed at a scratch file before anything imports database.py;
+# the tests never write to products.db or a DATABASE_URL from the environment.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "import.db")
+
+from database import Base  # noqa: E402
+import models  # noqa: E402,F401  (registers the tables on Base)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A fresh SQLite database with every table created."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def make_product(product_id, name, category="Groceries", price=5.0, **fields):
+    values = {
+        "id": product_id,
+        "name": name,
+        "description": "",
+        "longDescription": "",
+        "price": price,
+        "image": "",
+        "category": category,
+        "sentiment": {"positive": 80, "negative": 20, "aspects": {}},
+        "dataAiHint": "",
+        "tags": [],
+    }
+    values.update(fields)
+    return models.Product(**values)
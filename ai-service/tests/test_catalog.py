@@ -0,0 +1,106 @@
+from sqlalchemy import update
+
+from catalog import CatalogCache, bump_catalog_version, read_catalog_versions
+from models import Product
+from conftest import make_product
+
+
+def seed(session_factory, *products):
+    db = session_factory()
+    db.add_all(products)
+    db.commit()
+    db.close()
+
+
+def versions(session_factory):
+    db = session_factory()
+    try:
+        return read_catalog_versions(db)
+    finally:
+        db.close()
+
+
+def test_versions_start_at_zero(session_factory):
+    assert versions(session_factory) == (0, 0)
+
+
+def test_insert_delete_and_indexed_edits_bump_the_catalog(session_factory):
+    seed(session_factory, make_product("1", "Milk"))
+    assert versions(session_factory) == (1, 0)
+
+    db = session_factory()
+    db.get(Product, "1").price = 4.5
+    db.commit()
+    assert versions(session_factory) == (2, 0)
+
+    db.delete(db.get(Product, "1"))
+    db.commit()
+    db.close()
+    assert versions(session_factory) == (3, 0)
+
+
+def test_sentiment_only_edit_bumps_the_sentiment_counter(session_factory):
+    seed(session_factory, make_product("1", "Milk"))
+    db = session_factory()
+    db.get(Product, "1").sentiment = {"positive": 90, "negative": 10, "aspects": {}}
+    db.commit()
+    db.close()
+    assert versions(session_factory) == (1, 1)
+
+
+def test_bulk_update_and_explicit_bump(session_factory):
+    seed(session_factory, make_product("1", "Milk"))
+    db = session_factory()
+    db.execute(update(Product).values(price=Product.price * 2))
+    db.commit()
+    assert versions(session_factory) == (2, 0)
+
+    bump_catalog_version(db)
+    db.commit()
+    db.close()
+    assert versions(session_factory) == (3, 0)
+
+
+def test_cache_rebuilds_on_catalog_change_and_refreshes_on_sentiment(session_factory):
+    seed(session_factory, make_product("1", "Milk"), make_product("2", "Bread", category="Bakery"))
+    cache = CatalogCache(check_interval=0)
+    db = session_factory()
+
+    first = cache.get(db)
+    assert [p["name"] for p in first.products] == ["Milk", "Bread"]
+    assert cache.get(db) is first
+
+    db.get(Product, "2").sentiment = {"positive": 10, "negative": 90, "aspects": {}}
+    db.commit()
+    refreshed = cache.get(db)
+    assert refreshed is not first
+    assert refreshed.by_id["2"]["sentiment"]["positive"] == 10
+    # Sentiment-only: the derived indexes are carried over
+    assert refreshed.index is first.index
+    assert (cache.rebuilds, cache.refreshes) == (1, 1)
+
+    db.get(Product, "2").name = "Sourdough"
+    db.commit()
+    rebuilt = cache.get(db)
+    assert rebuilt.by_id["2"]["name"] == "Sourdough"
+    assert rebuilt.index is not refreshed.index
+    assert (cache.rebuilds, cache.refreshes) == (2, 1)
+    db.close()
+
+
+def test_snapshot_pages_in_id_order(session_factory):
+    seed(session_factory, *[make_product(f"{i:02d}", f"Item {i}", category="A" if i % 2 else "B", price=i)
+                            for i in range(1, 8)])
+    db = session_factory()
+    snapshot = CatalogCache().get(db)
+    db.close()
+
+    items, cursor = snapshot.page(limit=3)
+    assert [p["id"] for p in items] == ["01", "02", "03"]
+    items, cursor = snapshot.page(after=cursor, limit=3)
+    assert [p["id"] for p in items] == ["04", "05", "06"]
+    items, cursor = snapshot.page(after=cursor, limit=3)
+    assert ([p["id"] for p in items], cursor) == (["07"], None)
+
+    items, cursor = snapshot.page(category="A", min_price=2, max_price=6)
+    assert ([p["id"] for p in items], cursor) == (["03", "05"], None)
@@ -0,0 +1,74 @@
+import pytest
+
+from intent_engine import (
+    IntentEngine,
+    NaiveBayesIntentClassifier,
+    extract_keywords,
+    parse_price_range,
+    parse_skin_type,
+)
+
+EXAMPLES = [
+    ("how do i make sushi", "recipe"),
+    ("recipe for fried rice", "recipe"),
+    ("how to cook pasta carbonara", "recipe"),
+    ("buy milk and eggs", "grocery"),
+    ("fresh vegetables for the week", "grocery"),
+    ("organic bananas", "grocery"),
+    ("moisturizer for dry skin", "skincare"),
+    ("face wash for oily skin", "skincare"),
+    ("sunscreen for sensitive skin", "skincare"),
+]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("shoes under $50", {"min": 0, "max": 50}),
+    ("laptop over 1k", {"min": 1000, "max": 1_000_000}),
+    ("headphones between 20 and 80", {"min": 20, "max": 80}),
+    ("tv $300-$200", {"min": 200, "max": 300}),
+    ("red apples", None),
+])
+def test_parse_price_range(query, expected):
+    assert parse_price_range(query) == expected
+
+
+def test_parse_skin_type_and_keywords():
+    assert parse_skin_type("cleanser for acne") == "oily"
+    assert parse_skin_type("Serum for DRY skin") == "dry"
+    assert parse_skin_type("lip balm") is None
+    assert extract_keywords("running shoes under 50 dollars shoes") == ["running", "shoes"]
+
+
+def test_classifier_round_trip(tmp_path):
+    classifier = NaiveBayesIntentClassifier().train(EXAMPLES)
+    intent, confidence = classifier.predict("how do i make pasta")
+    assert intent == "recipe" and 0 < confidence <= 1
+
+    path = str(tmp_path / "model.json")
+    classifier.save(path)
+    assert NaiveBayesIntentClassifier.load(path).predict("how do i make pasta") == (intent, confidence)
+
+
+def test_low_confidence_escalates():
+    engine = IntentEngine(NaiveBayesIntentClassifier().train(EXAMPLES), threshold=1.01)
+    assert engine.detect("organic bananas") is None
+    assert engine.stats()["escalated"] == 1
+
+
+def test_recipes_need_known_ingredients():
+    engine = IntentEngine(NaiveBayesIntentClassifier().train(EXAMPLES), threshold=0.0)
+    assert engine.detect("how do i make sushi") is None
+    assert engine.detect("how do i make sushi", recipe_ingredients=lambda query: None) is None
+
+    result = engine.detect("how do i make sushi", recipe_ingredients=lambda query: ["Sushi Rice", "Nori"])
+    assert result["type"] == "recipe"
+    assert result["ingredients"] == ["Sushi Rice", "Nori"]
+    assert engine.stats()["local"] == 1
+
+
+def test_skincare_answer_includes_skin_type():
+    engine = IntentEngine(NaiveBayesIntentClassifier().train(EXAMPLES), threshold=0.0)
+    result = engine.detect("sunscreen for oily skin under $20")
+    assert result["type"] == "skincare"
+    assert result["skinType"] == "oily"
+    assert result["priceRange"] == {"min": 0, "max": 20}
@@ -0,0 +1,80 @@
+import asyncio
+
+from llm_cache import DEFAULT_TTLS, LLMCache, normalize_text
+
+
+def test_memory_hit_and_miss():
+    cache = LLMCache("")
+    assert cache.get("ai_search", "k") is None
+    cache.set("ai_search", "k", {"products": ["Milk"]})
+    assert cache.get("ai_search", "k") == {"products": ["Milk"]}
+    stats = cache.stats()["endpoints"]["ai_search"]
+    assert (stats["misses"], stats["memory_hits"], stats["sets"]) == (1, 1, 1)
+
+
+def test_expired_entry_is_a_miss(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_TTL_AI_SEARCH", "0")
+    cache = LLMCache("")
+    cache.set("ai_search", "k", "value")
+    assert cache.get("ai_search", "k") is None
+
+
+def test_ttl_defaults_and_override(monkeypatch):
+    cache = LLMCache("")
+    assert cache.ttl("recipe_details") == DEFAULT_TTLS["recipe_details"]
+    assert cache.ttl("unknown") == 3600
+    monkeypatch.setenv("LLM_CACHE_TTL_RECOMMENDATIONS", "60")
+    assert cache.ttl("recommendations") == 60
+    monkeypatch.setenv("LLM_CACHE_TTL_RECOMMENDATIONS", "soon")
+    assert cache.ttl("recommendations") == DEFAULT_TTLS["recommendations"]
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "cache.db")
+    LLMCache(path).set("intent_detection", "k", {"type": "grocery"})
+
+    cache = LLMCache(path)
+    assert cache.get("intent_detection", "k") == {"type": "grocery"}
+    # The disk hit is promoted to memory
+    assert cache.get("intent_detection", "k") == {"type": "grocery"}
+    stats = cache.stats()["endpoints"]["intent_detection"]
+    assert (stats["disk_hits"], stats["memory_hits"]) == (1, 1)
+
+
+def test_lru_eviction_is_counted_against_the_evicted_endpoint():
+    cache = LLMCache("", max_entries=2)
+    cache.set("ai_search", "a", 1)
+    cache.set("recommendations", "b", 2)
+    cache.get("ai_search", "a")  # "b" is now least recently used
+    cache.set("intent_detection", "c", 3)
+
+    endpoints = cache.stats()["endpoints"]
+    assert endpoints["recommendations"]["evictions"] == 1
+    assert endpoints["intent_detection"]["evictions"] == 0
+    assert cache.get("ai_search", "a") == 1
+    assert cache.get("recommendations", "b") is None
+
+
+def test_async_get_and_set(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.db"))
+
+    async def run():
+        assert await cache.aget("ai_search", "k") is None
+        await cache.aset("ai_search", "k", [1, 2])
+        return await cache.aget("ai_search", "k")
+
+    assert asyncio.run(run()) == [1, 2]
+    assert LLMCache(str(tmp_path / "cache.db")).get("ai_search", "k") == [1, 2]
+
+
+def test_disabled_cache_stores_nothing():
+    cache = LLMCache("", enabled=False)
+    cache.set("ai_search", "k", "value")
+    assert cache.get("ai_search", "k") is None
+
+
+def test_keys_depend_on_model_and_prompt_version():
+    key = LLMCache.make_key("ai_search", normalize_text("  Cheap   MILK "), "model-a", "v1")
+    assert key == LLMCache.make_key("ai_search", "cheap milk", "model-a", "v1")
+    assert key != LLMCache.make_key("ai_search", "cheap milk", "model-b", "v1")
+    assert key != LLMCache.make_key("ai_search", "cheap milk", "model-a", "v2")
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpenError, LatencyWindow, ResilientCaller
+
+
+class FakeProvider:
+    """make_call stand-in: each call pops the next outcome (an exception to raise, or a value after `delay`)."""
+
+    def __init__(self, *outcomes, delay=0.0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+
+    def __call__(self):
+        return self._call(self.outcomes.pop(0) if self.outcomes else "ok")
+
+    async def _call(self, outcome):
+        self.calls += 1
+        try:
+            delay = outcome[1] if isinstance(outcome, tuple) else self.delay
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        result = outcome[0] if isinstance(outcome, tuple) else outcome
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+
+def caller(**kwargs):
+    kwargs.setdefault("backoff_base", 0.0)
+    return ResilientCaller(**kwargs)
+
+
+def test_retries_retryable_errors():
+    provider = FakeProvider(asyncio.TimeoutError(), asyncio.TimeoutError(), "answer")
+    resilient = caller(max_retries=2)
+    assert asyncio.run(resilient.call("ai_search", provider, timeout=5)) == "answer"
+    assert provider.calls == 3
+    stats = resilient.stats()["endpoints"]["ai_search"]
+    assert (stats["failures"], stats["retries"]) == (2, 2)
+
+
+def test_gives_up_after_max_retries():
+    provider = FakeProvider(*[asyncio.TimeoutError()] * 3)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(caller(max_retries=1).call("ai_search", provider, timeout=5))
+    assert provider.calls == 2
+
+
+def test_other_errors_are_not_retried():
+    provider = FakeProvider(ValueError("bad json"))
+    resilient = caller(max_retries=2)
+    with pytest.raises(ValueError):
+        asyncio.run(resilient.call("ai_search", provider, timeout=5))
+    assert provider.calls == 1
+    assert resilient.breaker("default").consecutive_failures == 0
+
+
+def test_deadline_bounds_the_call():
+    provider = FakeProvider(delay=5.0)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(caller(max_retries=0).call("ai_search", provider, timeout=0.05))
+    assert provider.cancelled == 1
+
+
+def test_open_circuit_fails_fast():
+    provider = FakeProvider(*[asyncio.TimeoutError()] * 2)
+    resilient = caller(max_retries=0, failure_threshold=2, recovery_timeout=60)
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(resilient.call("ai_search", provider, timeout=5))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(resilient.call("ai_search", provider, timeout=5))
+    assert provider.calls == 2
+    assert resilient.stats()["breakers"]["default"]["state"] == "open"
+    assert resilient.stats()["endpoints"]["ai_search"]["shortCircuited"] == 1
+
+
+def test_half_open_breaker_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
+
+
+def test_hedge_wins_and_the_slow_primary_is_cancelled():
+    provider = FakeProvider(("primary", 5.0), ("hedge", 0.0))
+    resilient = caller(hedge_min_delay=0.01)
+    window = resilient._latency.setdefault("ai_search", LatencyWindow())
+    for _ in range(20):
+        window.add(0.01)
+
+    assert asyncio.run(resilient.call("ai_search", provider, hedge=True, timeout=5)) == "hedge"
+    assert provider.calls == 2
+    assert provider.cancelled == 1
+    stats = resilient.stats()["endpoints"]["ai_search"]
+    assert (stats["hedgesFired"], stats["hedgeWins"]) == (1, 1)
+
+
+def test_no_hedge_without_latency_history():
+    provider = FakeProvider(("primary", 0.05))
+    resilient = caller(hedge_min_delay=0.0)
+    assert asyncio.run(resilient.call("ai_search", provider, hedge=True, timeout=5)) == "primary"
+    assert provider.calls == 1
@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import text
+
+from models import Product
+from search import ensure_search_index, search_products, search_terms
+from conftest import make_product
+
+
+@pytest.fixture
+def db(engine, session_factory):
+    seed = session_factory()
+    seed.add_all([
+        make_product("1", "Basmati Rice", tags=["rice", "grain"], price=12.0),
+        make_product("2", "Soy Sauce", description="Great on fried rice", price=3.0),
+        make_product("3", "Running Shoes", category="Footwear", tags=["sport"], price=60.0),
+    ])
+    seed.commit()
+    seed.close()
+    # Created after the rows exist, so the initial backfill is covered too
+    assert ensure_search_index(engine) == "fts5"
+    db = session_factory()
+    yield db
+    db.close()
+
+
+def ids(results):
+    return [product_id for product_id, _ in results]
+
+
+def test_search_terms_are_lowercased_words():
+    assert search_terms("Soy-Sauce, 2 BOTTLES!") == ["soy", "sauce", "2", "bottles"]
+    assert search_terms("!!") == []
+
+
+def test_ranks_name_matches_first(db):
+    assert ids(search_products(db, "fts5", "rice")) == ["1", "2"]
+
+
+def test_prefix_and_stemmed_matches(db):
+    assert ids(search_products(db, "fts5", "basm")) == ["1"]
+    assert ids(search_products(db, "fts5", "running shoe")) == ["3"]
+
+
+def test_falls_back_to_any_term(db):
+    assert set(ids(search_products(db, "fts5", "rice shoes"))) == {"1", "2", "3"}
+
+
+def test_filters(db):
+    assert ids(search_products(db, "fts5", "rice", max_price=5)) == ["2"]
+    assert ids(search_products(db, "fts5", "rice", category="Footwear")) == []
+
+
+def test_writes_keep_the_index_current(db):
+    db.add(make_product("4", "Jasmine Rice"))
+    db.get(Product, "3").name = "Trail Sneakers"
+    db.delete(db.get(Product, "1"))
+    db.commit()
+
+    assert "4" in ids(search_products(db, "fts5", "jasmine"))
+    assert ids(search_products(db, "fts5", "sneakers")) == ["3"]
+    assert ids(search_products(db, "fts5", "basmati")) == []
+
+
+def test_index_survives_vacuum(db):
+    # products has a string primary key, so VACUUM may renumber its rowids
+    db.delete(db.get(Product, "1"))
+    db.commit()
+    db.close()
+    with db.get_bind().connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+
+    assert ids(search_products(db, "fts5", "soy")) == ["2"]
+    assert ids(search_products(db, "fts5", "shoes")) == ["3"]
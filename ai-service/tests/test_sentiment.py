@@ -0,0 +1,21 @@
+from sentiment import score_review, score_reviews
+
+
+def test_mixed_aspects_get_opposite_signs():
+    aspects = score_review("Great taste but poor packaging.")["aspects"]
+    assert aspects["flavor"] > 50
+    assert aspects["service"] < 50
+
+
+def test_clause_without_sentiment_words_takes_the_sentence_score():
+    assert score_review("The delivery, however, was awful.")["aspects"]["service"] < 50
+
+
+def test_negation_flips_the_score():
+    assert score_review("This is good.")["compound"] > 0
+    assert score_review("This is not good.")["compound"] < 0
+
+
+def test_batch_matches_single_reviews():
+    texts = ["Love it. Fresh and tasty!", "Broke after a week, very flimsy.", ""]
+    assert score_reviews(texts) == [score_review(text) for text in texts]
@@ -0,0 +1,61 @@
+"""
+Train the collaborative-filtering model (collaborative.py) from the cart event log.
+
+Run from ai-service/ periodically, e.g. nightly; running workers pick up the new
+model without restarting:
+    python train_collaborative.py
+    python train_collaborative.py --factors 64 --iterations 15
+
+Each cart session is a user; adds and purchases are implicit feedback.
+"""
+
+import os
+import time
+import argparse
+
+from sqlalchemy import select
+
+from collaborative import CollaborativeModel
+from database import SessionLocal
+from models import CartEvent
+
+MODEL_PATH = os.getenv("COLLABORATIVE_MODEL_PATH", "./collaborative_model")
+
+# A purchase says more about taste than an add to cart
+EVENT_WEIGHTS = {"add": 1.0, "purchase": 3.0}
+
+
+def load_interactions():
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(CartEvent.session_id, CartEvent.product_id, CartEvent.event_type)
+            .where(CartEvent.event_type.in_(list(EVENT_WEIGHTS)))
+        ).all()
+    finally:
+        db.close()
+    return [(session_id, product_id, EVENT_WEIGHTS[event_type]) for session_id, product_id, event_type in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--factors", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--reg", type=float, default=0.1)
+    parser.add_argument("--alpha", type=float, default=10.0)
+    args = parser.parse_args()
+
+    interactions = load_interactions()
+    if not interactions:
+        print("No cart events to train on")
+        return
+    started = time.perf_counter()
+    model = CollaborativeModel.train(interactions, args.factors, args.reg, args.alpha, args.iterations)
+    model.save(MODEL_PATH)
+    stats = model.stats()
+    print(f"Trained on {len(interactions)} events: {stats['users']} users, {stats['items']} items "
+          f"in {time.perf_counter() - started:.1f}s -> {MODEL_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Train the local /detect-intent classifier and write it to intent_model.json.
+
+Run from ai-service/ whenever TRAINING_DATA changes:
+    python train_intent_model.py
+"""
+
+import os
+from intent_engine import NaiveBayesIntentClassifier
+
+MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "./intent_model.json")
+
+# (query, intent) pairs; intents match the LLM prompt's type list
+TRAINING_DATA = [
+    # recipe
+    ("I want to make sushi", "recipe"),
+    ("sushi at home", "recipe"),
+    ("how to make sushi rolls", "recipe"),
+    ("ingredients for chicken curry", "recipe"),
+    ("chicken curry recipe", "recipe"),
+    ("make chicken biryani", "recipe"),
+    ("biryani ingredients", "recipe"),
+    ("vegetable fried rice", "recipe"),
+    ("how to cook fried rice", "recipe"),
+    ("recipe for pasta carbonara", "recipe"),
+    ("cook spaghetti bolognese tonight", "recipe"),
+    ("what do I need for pancakes", "recipe"),
+    ("bake a chocolate cake", "recipe"),
+    ("dinner recipe with rice", "recipe"),
+    ("make idli and dosa", "recipe"),
+    ("dosa batter recipe", "recipe"),
+    ("sambar recipe", "recipe"),
+    ("cook dal tadka", "recipe"),
+    ("paneer butter masala recipe", "recipe"),
+    ("how do I make guacamole", "recipe"),
+    ("stir fry noodles recipe", "recipe"),
+    ("make pizza at home", "recipe"),
+    ("homemade burger recipe", "recipe"),
+    ("cook a thai green curry", "recipe"),
+    ("ingredients to make tacos", "recipe"),
+    ("easy breakfast recipe", "recipe"),
+    ("salad recipe for lunch", "recipe"),
+    ("how to prepare ramen", "recipe"),
+    ("bake cookies", "recipe"),
+    ("what can I cook with chicken", "recipe"),
+    ("recipe ideas for dinner", "recipe"),
+    ("make a smoothie", "recipe"),
+    ("cook pulao", "recipe"),
+    ("prepare butter chicken", "recipe"),
+    ("i want to cook curry", "recipe"),
+    # grocery
+    ("buy fresh vegetables", "grocery"),
+    ("basmati rice", "grocery"),
+    ("jasmine rice 5 lb", "grocery"),
+    ("soy sauce", "grocery"),
+    ("rice vinegar", "grocery"),
+    ("nori seaweed sheets", "grocery"),
+    ("fresh chicken breast", "grocery"),
+    ("organic milk", "grocery"),
+    ("eggs dozen", "grocery"),
+    ("whole wheat bread", "grocery"),
+    ("garam masala spice", "grocery"),
+    ("curry leaves", "grocery"),
+    ("fresh fruits", "grocery"),
+    ("bananas and apples", "grocery"),
+    ("olive oil", "grocery"),
+    ("cooking oil under $10", "grocery"),
+    ("onions and tomatoes", "grocery"),
+    ("groceries for the week", "grocery"),
+    ("snacks and chips", "grocery"),
+    ("wasabi paste", "grocery"),
+    ("sugar and salt", "grocery"),
+    ("pantry staples", "grocery"),
+    ("lentils dal", "grocery"),
+    ("frozen vegetables", "grocery"),
+    ("coffee beans", "grocery"),
+    ("green tea", "grocery"),
+    ("idli rice", "grocery"),
+    ("flour for baking", "grocery"),
+    ("fresh produce", "grocery"),
+    ("cheap rice", "grocery"),
+    # skincare
+    ("best moisturizer for dry skin", "skincare"),
+    ("face cream for oily skin", "skincare"),
+    ("face wash for acne", "skincare"),
+    ("gentle cleanser for sensitive skin", "skincare"),
+    ("sunscreen spf 50", "skincare"),
+    ("serum for combination skin", "skincare"),
+    ("vitamin c serum", "skincare"),
+    ("anti aging night cream", "skincare"),
+    ("skincare routine for oily skin", "skincare"),
+    ("toner for pores", "skincare"),
+    ("lip balm", "skincare"),
+    ("body lotion for dry skin", "skincare"),
+    ("hydrating face mask", "skincare"),
+    ("acne spot treatment", "skincare"),
+    ("moisturizer under $20", "skincare"),
+    ("retinol cream", "skincare"),
+    ("oil free face wash", "skincare"),
+    ("skin care products", "skincare"),
+    ("eye cream for dark circles", "skincare"),
+    ("hyaluronic acid serum", "skincare"),
+    ("salicylic acid cleanser", "skincare"),
+    ("cleanser for sensitive skin", "skincare"),
+    # clothing
+    ("casual cotton t-shirt", "clothing"),
+    ("mens jeans", "clothing"),
+    ("womens summer dress", "clothing"),
+    ("running shoes", "clothing"),
+    ("sneakers size 10", "clothing"),
+    ("winter jacket", "clothing"),
+    ("hoodie for men", "clothing"),
+    ("formal shirt for office", "clothing"),
+    ("kids clothes", "clothing"),
+    ("socks pack", "clothing"),
+    ("yoga pants", "clothing"),
+    ("t-shirt under $15", "clothing"),
+    ("leather boots", "clothing"),
+    ("rain coat", "clothing"),
+    ("workout clothes", "clothing"),
+    ("cotton kurta", "clothing"),
+    ("sandals for summer", "clothing"),
+    ("shorts for the gym", "clothing"),
+    ("sweater for winter", "clothing"),
+    ("dress shoes", "clothing"),
+    ("baseball cap", "clothing"),
+    # electronics
+    ("laptop under 1000 dollars", "electronics"),
+    ("smartphone fast charger", "electronics"),
+    ("usb-c charger", "electronics"),
+    ("wireless earbuds", "electronics"),
+    ("bluetooth headphones", "electronics"),
+    ("noise cancelling headphones", "electronics"),
+    ("gaming mouse", "electronics"),
+    ("mechanical keyboard", "electronics"),
+    ("4k tv", "electronics"),
+    ("smart watch", "electronics"),
+    ("phone case", "electronics"),
+    ("power bank", "electronics"),
+    ("tablet for kids", "electronics"),
+    ("hdmi cable", "electronics"),
+    ("bluetooth speaker", "electronics"),
+    ("monitor for work", "electronics"),
+    ("charging cable for iphone", "electronics"),
+    ("gaming console", "electronics"),
+    ("camera for vlogging", "electronics"),
+    ("wireless charger", "electronics"),
+    ("laptop bag", "electronics"),
+    ("smartphone under 300", "electronics"),
+    # product (generic shopping)
+    ("gift ideas", "product"),
+    ("best sellers", "product"),
+    ("something for my mom", "product"),
+    ("home decor", "product"),
+    ("kitchen utensils", "product"),
+    ("toys for kids", "product"),
+    ("cleaning supplies", "product"),
+    ("office supplies", "product"),
+    ("water bottle", "product"),
+    ("backpack", "product"),
+    ("birthday gift", "product"),
+    ("deals today", "product"),
+    ("furniture", "product"),
+    ("pet food", "product"),
+    ("garden tools", "product"),
+    ("bedsheets", "product"),
+    ("cheap stuff", "product"),
+    ("popular products", "product"),
+    ("new arrivals", "product"),
+    ("what's on sale", "product"),
+]
+
+
+def train_intent_model(path: str = MODEL_PATH) -> NaiveBayesIntentClassifier:
+    model = NaiveBayesIntentClassifier().train(TRAINING_DATA)
+    model.save(path)
+    print(f"Trained intent model on {len(TRAINING_DATA)} examples ({len(model.labels)} intents) -> {path}")
+    return model
+
+
+if __name__ == "__main__":
+    train_intent_model()
@@ -6,6 +6,8 @@ Demonstrates various ways to update product information using SQLAlchemy ORM
 from sqlalchemy import func
 from database import SessionLocal
 from models import Product
+# Registers the hooks that bump the catalog version on product writes
+import catalog
 import json
 
 def update_single_product_by_id():
@@ -149,6 +151,8 @@ def update_using_raw_sql():
         "category": "Electronics",
         "min_price": 50
     })
+    # Raw SQL bypasses the ORM hooks, so bump the catalog version explicitly
+    catalog.bump_catalog_version(db)
     
     db.commit()
     
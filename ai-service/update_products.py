@@ -1,5 +1,7 @@
 from database import SessionLocal
 from models import Product
+# Registers the hooks that bump the catalog version on product writes
+import catalog
 
 def update_products():
     db = SessionLocal()
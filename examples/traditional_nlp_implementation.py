@@ -10,7 +10,9 @@ pip install nltk spacy scikit-learn fuzzywuzzy textblob surprise mlxtend
 python -m spacy download en_core_web_sm
 """
 
+import os
 import re
+import sys
 import json
 from typing import List, Dict, Any, Tuple
 from collections import Counter
@@ -31,11 +33,17 @@ from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import LatentDirichletAllocation
 
 # Fuzzy matching
-from fuzzywuzzy import fuzz, process
+from fuzzywuzzy import fuzz
+
+# Indexed fuzzy matcher and vectorized collaborative filtering from the ai-service
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ai-service"))
+from fuzzy import FuzzyMatcher
+from collaborative import CollaborativeModel
 
 # Recommendation algorithms
 from surprise import SVD, Dataset, Reader
 from mlxtend.frequent_patterns import apriori, association_rules
+import numpy as np
 import pandas as pd
 
 # Sentiment
@@ -132,6 +140,8 @@ class EntityExtractor:
     
     def __init__(self):
         self.nlp = nlp
+        self._matcher = None
+        self._matcher_products = None
     
     def extract_keywords(self, text: str) -> List[str]:
         """Extract important keywords using POS tagging"""
@@ -155,15 +165,18 @@ class EntityExtractor:
         """Match extracted keywords to available products using fuzzy matching"""
         keywords = self.extract_keywords(text)
         
+        # Index the product list once instead of scoring every product per keyword
+        if self._matcher is None or self._matcher_products != available_products:
+            self._matcher = FuzzyMatcher(available_products)
+            self._matcher_products = list(available_products)
+        
         matched_products = []
         
-        for keyword in keywords:
-            # Fuzzy match against product list
-            matches = process.extract(keyword, available_products, limit=3, scorer=fuzz.token_sort_ratio)
-            
-            # Add matches with similarity > 60%
+        # Same top 3 token_sort_ratio matches as process.extract, for all keywords at once;
+        # keep matches with similarity > 60%
+        for matches in self._matcher.extract_many(keywords, limit=3, score_cutoff=61):
             for match, score in matches:
-                if score > 60 and match not in matched_products:
+                if match not in matched_products:
                     matched_products.append(match)
         
         return matched_products
@@ -325,22 +338,28 @@ class RecommendationEngine:
         trainset = data.build_full_trainset()
         self.svd_model = SVD()
         self.svd_model.fit(trainset)
+
+        # Export the learned factors once; ranking a user's items is then one
+        # matrix-vector product (the global and user biases don't change the order)
+        users = [trainset.to_raw_uid(u) for u in range(trainset.n_users)]
+        items = [trainset.to_raw_iid(i) for i in range(trainset.n_items)]
+        # Items a user already bought are masked out of their recommendations
+        bought_users, bought_items = np.nonzero(user_item_matrix.loc[users, items].to_numpy() > 0)
+        self.cf_model = CollaborativeModel(
+            [str(u) for u in users],
+            [str(i) for i in items],
+            self.svd_model.pu,
+            self.svd_model.qi,
+            item_bias=self.svd_model.bi,
+            seen_indptr=np.searchsorted(bought_users, np.arange(len(users) + 1)),
+            seen_items=bought_items.astype(np.int32),
+        )
         
         print("✅ Collaborative filtering model trained")
     
     def recommend_collaborative(self, user_id: int, n_items: int = 5) -> List[str]:
-        """Recommend products using collaborative filtering"""
-        # Get predictions for all items
-        predictions = []
-        for item_id in range(100):  # Assuming 100 products
-            pred = self.svd_model.predict(user_id, item_id)
-            predictions.append((item_id, pred.est))
-        
-        # Sort by predicted rating
-        predictions.sort(key=lambda x: x[1], reverse=True)
-        
-        # Return top N
-        return [f"Product_{item_id}" for item_id, _ in predictions[:n_items]]
+        """Recommend products using collaborative filtering (all items scored at once, top N by argpartition)"""
+        return [f"Product_{item_id}" for item_id, _ in self.cf_model.recommend(str(user_id), n_items)]
     
     def recommend_content_based(self, cart_items: List[str], all_products: List[Dict]) -> List[str]:
         """
@@ -16,13 +16,20 @@ import AgenticPopup from "./components/AgenticPopup";
 import MealPlanner from "./components/MealPlanner";
 import { useCart } from "./hooks/useCart";
 // import { products } from "./data/products"; // Removed static import
-import { Product, SearchIntent, RecipeDetails } from "./types";
+import { Product, SearchIntent, RecipeDetails, RecipeIngredient } from "./types";
 import { GeminiService } from "./services/geminiService";
 
 import NotFoundState from "./components/NotFoundState";
 
+// Products per catalog page on the home grid; searches fetch the rest in pages of SEARCH_PAGE_SIZE
+const PAGE_SIZE = 40;
+const SEARCH_PAGE_SIZE = 200;
+
 function App() {
-  const [products, setProducts] = useState<Product[]>([]); // Added products state
+  // Catalog pages loaded so far, in id order; nextCursor is null once the last page is in
+  const [products, setProducts] = useState<Product[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [searchResults, setSearchResults] = useState<Product[]>([]);
   const [relatedResults, setRelatedResults] = useState<Product[]>([]);
   const [isSearching, setIsSearching] = useState(false);
@@ -57,10 +64,15 @@ function App() {
   const geminiService = GeminiService.getInstance();
 
   useEffect(() => {
-    // Fetch products on mount
+    // Fetch the first catalog page on mount
     const fetchProducts = async () => {
-      const fetchedProducts = await geminiService.getProducts();
-      setProducts(fetchedProducts);
+      try {
+        const page = await geminiService.getProductPage({ limit: PAGE_SIZE });
+        setProducts(page.items);
+        setNextCursor(page.nextCursor);
+      } catch (error) {
+        console.error("Failed to fetch products:", error);
+      }
     };
     fetchProducts();
 
@@ -78,6 +90,36 @@ function App() {
 
   const [searchHistory, setSearchHistory] = useState<string[]>([]);
 
+  const loadMoreProducts = async () => {
+    if (!nextCursor || isLoadingMore) return;
+    setIsLoadingMore(true);
+    try {
+      const page = await geminiService.getProductPage({ limit: PAGE_SIZE, after: nextCursor });
+      setProducts((prev) => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error("Failed to fetch products:", error);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
+  // Searches filter client-side, so the first one pulls in the pages not loaded yet
+  const loadFullCatalog = async (): Promise<Product[]> => {
+    let catalog = products;
+    let after = nextCursor;
+    while (after) {
+      const page = await geminiService.getProductPage({ limit: SEARCH_PAGE_SIZE, after });
+      catalog = [...catalog, ...page.items];
+      after = page.nextCursor;
+    }
+    if (catalog !== products) {
+      setProducts(catalog);
+      setNextCursor(null);
+    }
+    return catalog;
+  };
+
   const handleSearch = async (query: string) => {
     setCurrentSearchQuery(query);
     setIsSearching(true);
@@ -88,13 +130,17 @@ function App() {
     try {
       // Show loading for at least 4 seconds to display the full animation
       const searchPromise = (async () => {
-        const productNames = products.map(p => p.name);
-        const intent = await geminiService.extractSearchIntent(query, productNames);
+        // The service shortlists catalog products itself; no need to send the names
+        const [intent, catalog] = await Promise.all([
+          geminiService.extractSearchIntent(query),
+          loadFullCatalog(),
+        ]);
         setSearchIntent(intent);
 
         // Fetch recipe details if this is a recipe search
+        let details: RecipeDetails | null = null;
         if (intent.type === "recipe") {
-          const details = await geminiService.getRecipeDetails(query);
+          details = await geminiService.getRecipeDetails(query);
           setRecipeDetails(details);
           
           // Trigger Agentic Popup for recipe searches
@@ -105,7 +151,7 @@ function App() {
           setRecipeDetails(null);
         }
 
-        const { strictResults, relatedResults } = searchProducts(intent);
+        const { strictResults, relatedResults } = searchProducts(catalog, intent, details?.shoppingList);
         setSearchResults(strictResults);
         setRelatedResults(relatedResults);
 
@@ -127,9 +173,11 @@ function App() {
   };
 
   const searchProducts = (
-    intent: SearchIntent
+    catalog: Product[],
+    intent: SearchIntent,
+    shoppingList: RecipeIngredient[] = []
   ): { strictResults: Product[]; relatedResults: Product[] } => {
-    let filtered = products;
+    let filtered = catalog;
 
     // Extract price range from search intent if present
     const priceRange = intent.priceRange;
@@ -180,27 +228,14 @@ function App() {
       });
     }
 
-    // 4. By ingredients for recipes - use strict matching
-    if (intent.ingredients && intent.ingredients.length > 0) {
-      filtered = filtered.filter((product) => {
-        const productText = `${product.name} ${product.dataAiHint} ${product.tags?.join(" ") || ""}`.toLowerCase();
-        return intent.ingredients?.some((ingredient) => {
-          const ingredientLower = ingredient.toLowerCase();
-          
-          // Try exact phrase match first
-          if (productText.includes(ingredientLower)) return true;
-
-          // Strict matching: Require ALL significant words to be present
-          // This prevents "Sushi Rice" from matching "Basmati Rice" (which has "Rice" but not "Sushi")
-          const words = ingredientLower.split(" ").filter(w => w.length > 2);
-          
-          if (words.length > 0) {
-             return words.every(word => productText.includes(word));
-          }
-          
-          return false;
-        });
-      });
+    // 4. By ingredients for recipes - the service resolves each ingredient (and
+    // each line of the recipe's shopping list) to a product id
+    if ((intent.ingredients && intent.ingredients.length > 0) || shoppingList.length > 0) {
+      const ingredientIds = new Set(
+        [...(intent.productIds ?? []), ...shoppingList.map((item) => item.productId)]
+          .filter((id): id is string => id !== null)
+      );
+      filtered = filtered.filter((product) => ingredientIds.has(product.id));
     }
 
     // Sort both by relevance (sentiment score)
@@ -217,7 +252,7 @@ function App() {
 
     if (priceRange) {
       // Show same category items within price range first
-      relatedResults = products
+      relatedResults = catalog
         .filter((p) => {
           const matchesMax = priceRange.max !== undefined ? p.price <= priceRange.max : true;
           const matchesMin = priceRange.min !== undefined ? p.price >= priceRange.min : true;
@@ -228,7 +263,7 @@ function App() {
       // Then show same category items regardless of price
       relatedResults = [
         ...relatedResults,
-        ...products
+        ...catalog
           .filter(
             (p) =>
               intent.category &&
@@ -245,7 +280,7 @@ function App() {
       );
     } else {
       // Original related results logic
-      relatedResults = products
+      relatedResults = catalog
         .filter(
           (p) =>
             (intent.category &&
@@ -656,7 +691,7 @@ function App() {
                 Featured Products
               </h3>
               <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
-                {products.slice(0, 40).map((product) => (
+                {products.map((product) => (
                   <ProductCard
                     key={product.id}
                     product={product}
@@ -665,6 +700,17 @@ function App() {
                   />
                 ))}
               </div>
+              {nextCursor && (
+                <div className="mt-8 text-center">
+                  <button
+                    onClick={loadMoreProducts}
+                    disabled={isLoadingMore}
+                    className="px-6 py-2 bg-blue-600 text-white rounded-full font-medium hover:bg-blue-700 transition-colors disabled:opacity-60"
+                  >
+                    {isLoadingMore ? "Loading..." : "Load more"}
+                  </button>
+                </div>
+              )}
             </motion.div>
           )}
       </main>
@@ -30,7 +30,7 @@ const ProductDetailPage: React.FC<ProductDetailPageProps> = ({
     if (!reviewText.trim()) return;
     setIsAnalyzing(true);
     try {
-      const result = await GeminiService.getInstance().analyzeReview(reviewText, currentSentiment);
+      const result = await GeminiService.getInstance().analyzeReview(product.id, reviewText, currentSentiment);
       setCurrentSentiment(result);
       setReviewText("");
     } catch (error) {
@@ -94,10 +94,20 @@ const ProductQA: React.FC<ProductQAProps> = ({ product, onClose }) => {
       ]).filter(msg => msg.content !== "");
 
       const geminiService = GeminiService.getInstance();
-      const response = await geminiService.answerProductQuestion(
+      const response = await geminiService.streamProductQuestion(
         product.id,
         currentQuestion,
-        history
+        history,
+        (text) => {
+          // Render answer tokens as they arrive
+          setQaHistory((prev) =>
+            prev.map((item, index) =>
+              index === prev.length - 1 && item.question === currentQuestion
+                ? { ...item, answer: item.answer + text }
+                : item
+            )
+          );
+        }
       );
 
       // Update the last item in history with the AI response
@@ -1,3 +1,5 @@
+import type { Product, RecipeDetails } from "../types";
+
 // Mock Gemini AI Service - In production, this would integrate with actual Google Gemini API
 export class GeminiService {
   private static instance: GeminiService;
@@ -23,7 +25,44 @@ export class GeminiService {
     }
   }
 
+  // One page of the catalog in id order; pass the returned nextCursor as `after` for the next page.
+  // `fields` limits the columns returned (e.g. ["id", "name", "price", "image"] for a grid).
+  async getProductPage(options: {
+    category?: string;
+    minPrice?: number;
+    maxPrice?: number;
+    fields?: string[];
+    limit?: number;
+    after?: string;
+  } = {}) {
+    const params = new URLSearchParams();
+    if (options.category) params.set("category", options.category);
+    if (options.minPrice !== undefined) params.set("minPrice", String(options.minPrice));
+    if (options.maxPrice !== undefined) params.set("maxPrice", String(options.maxPrice));
+    if (options.fields?.length) params.set("fields", options.fields.join(","));
+    params.set("limit", String(options.limit ?? 24));
+    if (options.after) params.set("after", options.after);
+
+    const response = await fetch(`${this.baseUrl}/products?${params}`, {
+      headers: { "ngrok-skip-browser-warning": "true" }
+    });
+    if (!response.ok) throw new Error("Failed to fetch products");
+    return {
+      items: await response.json(),
+      nextCursor: response.headers.get("X-Next-Cursor"),
+    };
+  }
+
   async searchProducts(query: string) {
+    // Full-text search first; only fall back to the LLM when nothing matches
+    const searchResponse = await fetch(`${this.baseUrl}/search?${new URLSearchParams({ q: query })}`, {
+      headers: { "ngrok-skip-browser-warning": "true" }
+    });
+    if (searchResponse.ok) {
+      const { products: found } = await searchResponse.json();
+      if (Array.isArray(found) && found.length > 0) return found;
+    }
+
     const response = await fetch(`${this.baseUrl}/ai-search`, {
       method: "POST",
       headers: { 
@@ -33,40 +72,43 @@ export class GeminiService {
       body: JSON.stringify({ query }),
     });
     if (!response.ok) throw new Error("Failed to search products");
+    // The service resolves the suggested names to product ids (null when unmatched)
     const data = await response.json();
-    const names: string[] = Array.isArray(data?.productNames)
-      ? data.productNames
-      : [];
+    const ids: unknown[] = Array.isArray(data?.productIds) ? data.productIds : [];
     const { products } = await import("../data/products");
-    const matched = products.filter((p) =>
-      names.some((n) => p.name.toLowerCase().includes(String(n).toLowerCase()))
-    );
-    return matched;
+    const byId = new Map(products.map((p) => [p.id, p]));
+    return ids
+      .map((id) => (typeof id === "string" ? byId.get(id) : undefined))
+      .filter((p): p is Product => p !== undefined);
   }
 
-  async answerProductQuestion(productId: string, userQuestion: string, history: { role: string; content: string }[] = []) {
+  private async buildProductQABody(productId: string, userQuestion: string, history: { role: string; content: string }[]) {
     const { products } = await import("../data/products");
     const product = products.find((p) => p.id === productId);
     if (!product) throw new Error("Product not found");
-    
+
+    return JSON.stringify({
+      query: userQuestion,
+      product: {
+        name: product.name,
+        description: product.description,
+        longDescription: product.longDescription,
+        price: product.price,
+        category: product.category,
+        sentiment: product.sentiment
+      },
+      history: history
+    });
+  }
+
+  async answerProductQuestion(productId: string, userQuestion: string, history: { role: string; content: string }[] = []) {
     const response = await fetch(`${this.baseUrl}/product-qa`, {
       method: "POST",
       headers: { 
         "Content-Type": "application/json",
         "ngrok-skip-browser-warning": "true"
       },
-      body: JSON.stringify({
-        query: userQuestion,
-        product: {
-          name: product.name,
-          description: product.description,
-          longDescription: product.longDescription,
-          price: product.price,
-          category: product.category,
-          sentiment: product.sentiment
-        },
-        history: history
-      }),
+      body: await this.buildProductQABody(productId, userQuestion, history),
     });
 
     if (!response.ok) {
@@ -82,14 +124,83 @@ export class GeminiService {
     };
   }
 
-  async analyzeReview(reviewText: string, currentSentiment: any) {
+  // Streaming variant of answerProductQuestion: onToken receives answer text as it is generated
+  async streamProductQuestion(
+    productId: string,
+    userQuestion: string,
+    history: { role: string; content: string }[] = [],
+    onToken: (text: string) => void
+  ) {
+    const response = await fetch(`${this.baseUrl}/product-qa/stream`, {
+      method: "POST",
+      headers: { 
+        "Content-Type": "application/json",
+        "ngrok-skip-browser-warning": "true"
+      },
+      body: await this.buildProductQABody(productId, userQuestion, history),
+    });
+
+    if (!response.ok || !response.body) {
+      const text = await response.text();
+      throw new Error(`Product QA failed: ${text}`);
+    }
+
+    const result = {
+      answer: "",
+      confidence: 0.9,
+      followUpQuestions: [] as string[],
+      suggestedProduct: undefined as string | undefined
+    };
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // SSE frames are separated by a blank line
+      let boundary = buffer.indexOf("\n\n");
+      while (boundary !== -1) {
+        const frame = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf("\n\n");
+
+        let event = "message";
+        let data = "";
+        for (const line of frame.split("\n")) {
+          if (line.startsWith("event: ")) event = line.slice(7);
+          else if (line.startsWith("data: ")) data += line.slice(6);
+        }
+        const payload = data ? JSON.parse(data) : {};
+
+        if (event === "token") {
+          result.answer += payload.text;
+          onToken(payload.text);
+        } else if (event === "answer") {
+          result.answer = payload.answer;
+          result.confidence = payload.confidence;
+        } else if (event === "suggestedProduct") {
+          result.suggestedProduct = payload.suggestedProduct ?? undefined;
+        } else if (event === "followUpQuestions") {
+          result.followUpQuestions = payload.followUpQuestions ?? [];
+        } else if (event === "error") {
+          throw new Error(`Product QA failed: ${payload.detail}`);
+        }
+      }
+    }
+    return result;
+  }
+
+  async analyzeReview(productId: string, reviewText: string, currentSentiment: any) {
     const response = await fetch(`${this.baseUrl}/analyze-review`, {
       method: "POST",
       headers: { 
         "Content-Type": "application/json",
         "ngrok-skip-browser-warning": "true"
       },
-      body: JSON.stringify({ reviewText, currentSentiment }),
+      body: JSON.stringify({ productId, reviewText, currentSentiment }),
     });
     if (!response.ok) throw new Error("Failed to analyze review");
     return await response.json();
@@ -170,6 +281,7 @@ export class GeminiService {
         type: data.type,
         keywords: data.keywords,
         ingredients: data.ingredients,
+        productIds: data.productIds,
         priceRange: data.priceRange,
         skinType: data.skinType,
         category: data.category || "General"
@@ -184,7 +296,7 @@ export class GeminiService {
     }
   }
 
-  async getRecipeDetails(query: string) {
+  async getRecipeDetails(query: string): Promise<RecipeDetails> {
     try {
       const response = await fetch(`${this.baseUrl}/recipe-details`, {
         method: "POST",
@@ -206,7 +318,8 @@ export class GeminiService {
         steps: data.steps,
         prepTime: data.prepTime,
         servings: data.servings,
-        description: data.description
+        description: data.description,
+        shoppingList: data.shoppingList ?? []
       };
     } catch (error) {
       console.error("Recipe details fetch failed", error);
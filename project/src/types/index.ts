@@ -53,6 +53,8 @@ export interface SearchIntent {
   };
   category?: string;
   ingredients?: string[];
+  // Catalog product each ingredient resolved to (null when unmatched), aligned with ingredients
+  productIds?: (string | null)[];
   skinType?: string;
   preferences?: string[];
 }
@@ -64,6 +66,16 @@ export interface RecommendationContext {
   budget?: number;
 }
 
+export interface RecipeIngredient {
+  line: string;
+  quantity: number | null;
+  unit: string | null;
+  ingredient: string;
+  note: string | null;
+  // Catalog product the ingredient resolved to, null when unmatched
+  productId: string | null;
+}
+
 export interface RecipeDetails {
   name: string;
   ingredients: string[];
@@ -71,4 +83,6 @@ export interface RecipeDetails {
   prepTime: string;
   servings: number;
   description: string;
+  // ingredients parsed and resolved to products by the service, same order
+  shoppingList?: RecipeIngredient[];
 }
\ No newline at end of file
@@ -10,6 +10,21 @@ export async function POST(req: NextRequest) {
     );
   }
 
+  // Full-text search first; most queries never need the LLM
+  const searchResp = await fetch(
+    `http://localhost:8000/search?${new URLSearchParams({ q: query })}`
+  );
+  if (searchResp.ok) {
+    const found = await searchResp.json();
+    const foundNames = new Set<string>(
+      (found?.products ?? []).map((p: { name: string }) => p.name.toLowerCase())
+    );
+    const matched = products.filter((p) => foundNames.has(p.name.toLowerCase()));
+    if (matched.length > 0) {
+      return NextResponse.json({ products: matched });
+    }
+  }
+
   // Call Python AI search for product names/keywords
   const pyResp = await fetch("http://localhost:8000/ai-search", {
     method: "POST",
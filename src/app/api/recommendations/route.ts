@@ -10,10 +10,12 @@ export async function POST(req: NextRequest) {
     );
   }
 
-  // Build lightweight cart description to send to Python service
+  // Build lightweight cart description to send to Python service.
+  // This app's catalog is not the service's, so ids mean nothing there:
+  // send names only and let the service resolve them against its own catalog.
   const cart = products
     .filter((p) => cartProductIds.includes(p.id))
-    .map((p) => ({ id: p.id, name: p.name, category: p.category }));
+    .map((p) => ({ name: p.name, category: p.category }));
 
   const pyResp = await fetch("http://localhost:8000/recommend", {
     method: "POST",
@@ -29,6 +31,7 @@ export async function POST(req: NextRequest) {
     );
   }
 
+  // productIds in the response are service catalog ids; match on names instead
   const data = await pyResp.json();
   const names: string[] = Array.isArray(data?.productNames)
     ? data.productNames